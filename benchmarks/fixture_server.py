@@ -0,0 +1,561 @@
+# Local HTTP stand-in that replays retailer fixtures with configurable latency
+#
+# Responses are brotli/gzip-compressed when the client asks for it, as real
+# storefronts do. With tls=True the server speaks HTTPS (self-signed, see
+# tls_cert()); with http2=True it also offers HTTP/2 through ALPN, which needs
+# the h2 package.
+
+
+import functools
+import gzip
+import json
+import random
+import select
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from queue import Queue, Empty
+from string import Template
+from urllib.parse import urlparse, parse_qs, unquote_plus
+
+from config import RETAILERS, MAX_PRODUCTS_PER_RETAILER
+from core.filters import normalize_words, should_filter_out
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Inline theme script size of a typical Shopify storefront page
+PADDING_BYTES = 60_000
+SEARCH_PAGE_SIZE = 8
+DEFAULT_UPDATED_AT = "2024-06-01T09:00:00+08:00"
+LAZADA_PAGE_SIZE = 10
+
+
+@functools.lru_cache(maxsize=1)
+def tls_cert() -> str:
+    # Self-signed certificate for 127.0.0.1 (PEM file with cert and key);
+    # clients verify against the same file
+    path = Path(tempfile.mkdtemp()) / "fixture.pem"
+    key = path.with_suffix(".key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "2",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", str(key), "-out", str(path)],
+        check=True, capture_output=True,
+    )
+    path.write_text(path.read_text() + key.read_text())
+    return str(path)
+
+
+@functools.lru_cache(maxsize=1024)
+def compress(body: bytes, accept_encoding: str) -> tuple:
+    # (body, content-encoding or None) for the client's Accept-Encoding
+    accepted = {e.split(";")[0].strip() for e in accept_encoding.lower().split(",")}
+    if "br" in accepted:
+        try:
+            import brotli
+            # Quality 5 is what CDNs typically use for on-the-fly compression
+            return brotli.compress(body, quality=5), "br"
+        except ImportError:
+            pass
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=6, mtime=0), "gzip"
+    return body, None
+
+
+def _padding() -> str:
+    # Deterministic filler standing in for inline theme JavaScript
+    chunk = "window.theme=window.theme||{};theme.strings={addToCart:'Add to cart',soldOut:'Sold out'};"
+    return (chunk * (PADDING_BYTES // len(chunk) + 1))[:PADDING_BYTES]
+
+
+class FixtureStore:
+    # Fixtures for one retailer: recorded pages if present, templates otherwise
+
+    def __init__(self, retailer_dir: Path):
+        self.dir = retailer_dir
+        self.recorded = retailer_dir / "recorded"
+        self.catalog = json.loads((retailer_dir / "catalog.json").read_text(encoding="utf-8"))
+        # Marketplaces (JSON only) have no page templates
+        self.templates = {
+            name: Template((retailer_dir / f"{name}.html").read_text(encoding="utf-8"))
+            for name in ("search", "card", "product")
+            if (retailer_dir / f"{name}.html").exists()
+        }
+        self.padding = _padding()
+
+    def _fields(self, handle: str) -> dict:
+        item = self.catalog[handle]
+        title = item["title"]
+        return {
+            "handle": handle,
+            "title": title.replace("&", "&amp;").replace("<", "&lt;"),
+            "title_attr": title.replace("&", "&amp;").replace('"', "&quot;"),
+            "title_json": json.dumps(title)[1:-1],
+            "price_text": f"{item['price']:,.2f}",
+            "price_plain": f"{item['price']:.2f}",
+        }
+
+    def matching_handles(self, query: str) -> list:
+        # Catalogue handles whose title shares a word with the query
+        words = set(normalize_words(query))
+        hits = [h for h, item in self.catalog.items() if words & set(normalize_words(item["title"]))]
+        return (hits or list(self.catalog))[:SEARCH_PAGE_SIZE]
+
+    def expected_results(self, query: str, intent: str, marketplace: bool = False):
+        # Sorted [(title, price)] a correct search of this retailer returns for
+        # query, or None if unknown (recorded pages for a different keyword).
+        # Shopify search/suggest answers are cut to MAX_PRODUCTS_PER_RETAILER
+        # before filtering; marketplaces page on until that many survive.
+        if self.recorded.exists():
+            path = self.recorded / "expected.json"
+            if not path.exists():
+                return None
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data["keyword"] != query:
+                return None
+            return sorted((title, price) for title, price in data["results"])
+        if marketplace:
+            handles = [h for _, h in self._marketplace_hits(query)]
+        else:
+            handles = self.matching_handles(query)[:MAX_PRODUCTS_PER_RETAILER]
+        kept = [
+            (self.catalog[h]["title"], self.catalog[h]["price"]) for h in handles
+            if not should_filter_out(intent, query, self.catalog[h]["title"])
+        ]
+        return sorted(kept[:MAX_PRODUCTS_PER_RETAILER])
+
+    def search_page(self, query: str) -> bytes:
+        recorded = self.recorded / "search.html"
+        if recorded.exists():
+            return recorded.read_bytes()
+        cards = "\n".join(
+            self.templates["card"].safe_substitute(self._fields(h)) for h in self.matching_handles(query)
+        )
+        return self.templates["search"].safe_substitute(
+            query=query, cards=cards, padding=self.padding
+        ).encode("utf-8")
+
+    def suggest_json(self, query: str, limit: int) -> bytes:
+        # Shopify predictive search response
+        recorded = self.recorded / "suggest.json"
+        if recorded.exists():
+            return recorded.read_bytes()
+        products = []
+        for pos, h in enumerate(self.matching_handles(query)[:limit], 1):
+            item = self.catalog[h]
+            products.append({
+                "title": item["title"],
+                "handle": h,
+                "url": f"/products/{h}?_pos={pos}&_sid=f1x7ur3&_ss=r",
+                "price": f"{item['price']:.2f}",
+                "price_min": f"{item['price']:.2f}",
+                "available": True,
+                "image": f"https://cdn.shopify.com/s/files/{h}.jpg",
+            })
+        return json.dumps({"resources": {"results": {"products": products}}}).encode("utf-8")
+
+    def _marketplace_hits(self, query: str) -> list:
+        # (item id, handle) for every match; marketplaces page through all of them
+        words = set(normalize_words(query))
+        return [
+            (100000 + i, h) for i, (h, item) in enumerate(self.catalog.items())
+            if words & set(normalize_words(item["title"]))
+        ]
+
+    def lazada_json(self, base_url: str, query: str, page: int) -> bytes:
+        # Lazada catalog/?ajax=true response. The site's page size is fixed at
+        # 40; it is smaller here so that paging gets exercised
+        recorded = self.recorded / f"catalog_{page}.json"
+        if recorded.exists():
+            return recorded.read_bytes()
+        hits = self._marketplace_hits(query)
+        host = base_url.split("://", 1)[1]
+        items = []
+        for itemid, h in hits[(page - 1) * LAZADA_PAGE_SIZE:page * LAZADA_PAGE_SIZE]:
+            item = self.catalog[h]
+            items.append({
+                "name": item["title"],
+                "nid": str(itemid),
+                "itemId": str(itemid),
+                "skuId": str(itemid * 10 + 1),
+                "price": f"{item['price']:.2f}",
+                "priceShow": f"₱{item['price']:,.2f}",
+                "originalPrice": f"{item['price'] * 1.2:.2f}",
+                "itemUrl": f"//{host}/products/{h}-i{itemid}-s{itemid * 10 + 1}.html?search=1",
+                "image": f"https://img.lazcdn.com/g/p/{h}.jpg",
+                "sellerName": "Fixture Store",
+                "location": "Metro Manila",
+                "ratingScore": "4.8",
+                "review": "12",
+                "inStock": True,
+            })
+        return json.dumps({
+            "mainInfo": {"page": str(page), "pageSize": str(LAZADA_PAGE_SIZE),
+                         "totalResults": str(len(hits)), "q": query},
+            "mods": {"listItems": items},
+        }, ensure_ascii=False).encode("utf-8")
+
+    def shopee_json(self, query: str, limit: int, newest: int) -> bytes:
+        # Shopee api/v4/search/search_items response (prices x 100000)
+        recorded = self.recorded / f"search_items_{newest}.json"
+        if recorded.exists():
+            return recorded.read_bytes()
+        hits = self._marketplace_hits(query)
+        items = []
+        for itemid, h in hits[newest:newest + limit]:
+            item = self.catalog[h]
+            price = int(round(item["price"] * 100000))
+            items.append({
+                "item_basic": {
+                    "itemid": itemid,
+                    "shopid": 5000 + itemid % 7,
+                    "name": item["title"],
+                    "currency": "PHP",
+                    "price": price,
+                    "price_min": price,
+                    "price_max": price,
+                    "stock": 25,
+                    "historical_sold": 120,
+                    "shop_location": "Metro Manila",
+                    "item_rating": {"rating_star": 4.8},
+                },
+                "adsid": None,
+            })
+        return json.dumps({
+            "total_count": len(hits),
+            "nomore": newest + limit >= len(hits),
+            "items": items,
+        }, ensure_ascii=False).encode("utf-8")
+
+    def product_js(self, handle: str):
+        # Shopify /products/<handle>.js (prices in centavos)
+        recorded = self.recorded / "products" / f"{handle}.js"
+        if recorded.exists():
+            return recorded.read_bytes()
+        if handle not in self.catalog:
+            return None
+        item = self.catalog[handle]
+        cents = int(round(item["price"] * 100))
+        return json.dumps({
+            "title": item["title"],
+            "handle": handle,
+            "price": cents,
+            "available": True,
+            "variants": [{"title": "Default Title", "price": cents, "available": True}],
+        }).encode("utf-8")
+
+    def products_json(self, page: int, limit: int) -> bytes:
+        # Shopify /products.json listing page
+        handles = list(self.catalog)[(page - 1) * limit:page * limit]
+        products = []
+        for h in handles:
+            item = self.catalog[h]
+            products.append({
+                "title": item["title"],
+                "handle": h,
+                "updated_at": item.get("updated_at", DEFAULT_UPDATED_AT),
+                "variants": [{"title": "Default Title", "price": f"{item['price']:.2f}"}],
+            })
+        return json.dumps({"products": products}).encode("utf-8")
+
+    def sitemap(self, base_url: str, part: str) -> bytes:
+        # Shopify-style sitemap index plus one products sub-sitemap
+        ns = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+        if part == "index":
+            body = (f'<sitemapindex {ns}><sitemap><loc>{base_url}/sitemap_products_1.xml'
+                    f'?from=1&amp;to=9999</loc></sitemap></sitemapindex>')
+        else:
+            urls = "".join(
+                f"<url><loc>{base_url}/products/{h}</loc>"
+                f"<lastmod>{item.get('updated_at', DEFAULT_UPDATED_AT)}</lastmod></url>"
+                for h, item in self.catalog.items()
+            )
+            body = f"<urlset {ns}>{urls}</urlset>"
+        return f'<?xml version="1.0" encoding="UTF-8"?>\n{body}'.encode("utf-8")
+
+    def product_page(self, handle: str):
+        recorded = self.recorded / "products" / f"{handle}.html"
+        if recorded.exists():
+            return recorded.read_bytes()
+        if handle not in self.catalog:
+            return None
+        return self.templates["product"].safe_substitute(
+            padding=self.padding, **self._fields(handle)
+        ).encode("utf-8")
+
+
+class FixtureServer:
+    # Threaded HTTP server for one retailer's fixtures
+
+    def __init__(self, retailer: str, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 1234, tls: bool = False,
+                 http2: bool = False):
+        self.retailer = retailer
+        self.store = FixtureStore(FIXTURES_DIR / retailer.lower())
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.connections = 0
+        self.arrivals = []  # time.time() of every request, for rate-limit checks
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+        self.tls = tls or http2
+        self._ssl = None
+        if self.tls:
+            self._ssl = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self._ssl.load_cert_chain(tls_cert())
+            self._ssl.set_alpn_protocols(["h2", "http/1.1"] if http2 else ["http/1.1"])
+
+    @property
+    def base_url(self) -> str:
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://127.0.0.1:{self._httpd.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _delay(self) -> tuple:
+        # Simulated latency and whether this request should fail
+        with self._rng_lock:
+            self.requests += 1
+            self.arrivals.append(time.time())
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+        return delay, fail
+
+    def respond(self, target: str, accept_encoding: str) -> tuple:
+        # (status, headers, body) for one GET, after the simulated delay
+        delay, fail = self._delay()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return 503, [("Content-Type", "text/plain"), ("Retry-After", "0")], b"busy"
+        parsed = urlparse(target)
+        status, ctype, body = self.route(parsed.path, parse_qs(parsed.query))
+        if self.store.recorded.exists():
+            body = self._rehost(body)
+        headers = [("Content-Type", ctype)]
+        body, encoding = compress(body, accept_encoding)
+        if encoding:
+            headers.append(("Content-Encoding", encoding))
+        return status, headers, body
+
+    def _rehost(self, body: bytes) -> bytes:
+        # Point absolute links in recorded pages at this server instead of the live site
+        live = RETAILERS.get(self.retailer, {}).get("base")
+        if not live:
+            return body
+        local = self.base_url.encode()
+        body = body.replace(live.encode(), local)
+        return body.replace(b"//" + urlparse(live).netloc.encode(), b"//" + local.split(b"//", 1)[1])
+
+    def route(self, path: str, query: dict):
+        # Return (status, content_type, body) for a request path
+        if path == "/search":
+            q = unquote_plus(query.get("q", [""])[0])
+            return 200, "text/html; charset=utf-8", self.store.search_page(q)
+        if path == "/products.json":
+            page = int(query.get("page", ["1"])[0])
+            limit = int(query.get("limit", ["30"])[0])
+            return 200, "application/json", self.store.products_json(page, limit)
+        if path in ("/sitemap.xml", "/sitemap_products_1.xml"):
+            part = "index" if path == "/sitemap.xml" else "products"
+            return 200, "application/xml", self.store.sitemap(self.base_url, part)
+        if path == "/search/suggest.json":
+            q = unquote_plus(query.get("q", [""])[0])
+            limit = int(query.get("resources[limit]", ["10"])[0])
+            return 200, "application/json", self.store.suggest_json(q, limit)
+        if path == "/catalog/" and query.get("ajax"):
+            q = unquote_plus(query.get("q", [""])[0])
+            page = int(query.get("page", ["1"])[0])
+            return 200, "application/json", self.store.lazada_json(self.base_url, q, page)
+        if path == "/api/v4/search/search_items":
+            q = unquote_plus(query.get("keyword", [""])[0])
+            limit = int(query.get("limit", ["60"])[0])
+            newest = int(query.get("newest", ["0"])[0])
+            return 200, "application/json", self.store.shopee_json(q, limit, newest)
+        if path.startswith("/products/"):
+            handle = path[len("/products/"):].strip("/")
+            if handle.endswith(".js"):
+                body, ctype = self.store.product_js(handle[:-3]), "application/json"
+            else:
+                body, ctype = self.store.product_page(handle), "text/html; charset=utf-8"
+            if body is not None:
+                return 200, ctype, body
+        return 404, "text/plain", b"not found"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                # Headers and body go out as separate writes; without this,
+                # Nagle + delayed ACK adds ~40 ms to every keep-alive response
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server._rng_lock:
+                    server.connections += 1
+                self.h2 = False
+                if server._ssl is not None:
+                    # Handshake here, in the connection's own thread
+                    self.request = server._ssl.wrap_socket(self.request, server_side=True)
+                    self.h2 = self.request.selected_alpn_protocol() == "h2"
+                super().setup()
+
+            def handle(self):
+                if self.h2:
+                    H2Connection(server, self.request).serve()
+                else:
+                    super().handle()
+
+            def do_GET(self):
+                status, headers, body = server.respond(
+                    self.path, self.headers.get("Accept-Encoding", "")
+                )
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class H2Connection:
+    # Serves one HTTP/2 connection: streams are answered concurrently (each in
+    # its own thread, so simulated latency overlaps) while all socket I/O
+    # stays on the connection thread
+
+    def __init__(self, server: FixtureServer, sock):
+        import h2.config
+        import h2.connection
+
+        self.server = server
+        self.sock = sock
+        self.conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.ready = Queue()
+        self.pending = {}
+        self.wake_r, self.wake_w = socket.socketpair()
+
+    def serve(self):
+        import h2.events
+
+        self.conn.initiate_connection()
+        self.sock.sendall(self.conn.data_to_send())
+        try:
+            while True:
+                if not self.sock.pending():
+                    readable, _, _ = select.select([self.sock, self.wake_r], [], [])
+                else:
+                    readable = [self.sock]
+                if self.wake_r in readable:
+                    self.wake_r.recv(4096)
+                    self._start_responses()
+                if self.sock in readable:
+                    data = self.sock.recv(65535)
+                    if not data:
+                        return
+                    for event in self.conn.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            threading.Thread(
+                                target=self._respond, args=(event.stream_id, dict(event.headers)),
+                                daemon=True,
+                            ).start()
+                        elif isinstance(event, h2.events.StreamReset):
+                            self.pending.pop(event.stream_id, None)
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            return
+                self._flush()
+                self.sock.sendall(self.conn.data_to_send())
+        except (OSError, ssl.SSLError):
+            return
+        finally:
+            self.wake_r.close()
+            self.wake_w.close()
+
+    def _respond(self, stream_id: int, headers: dict):
+        # Worker thread: compute the response, hand it to the connection thread
+        status, extra, body = self.server.respond(
+            headers.get(":path", "/"), headers.get("accept-encoding", "")
+        )
+        self.ready.put((stream_id, status, extra, body))
+        try:
+            self.wake_w.send(b"x")
+        except OSError:
+            pass
+
+    def _start_responses(self):
+        while True:
+            try:
+                stream_id, status, extra, body = self.ready.get_nowait()
+            except Empty:
+                return
+            self.conn.send_headers(stream_id, [
+                (":status", str(status)),
+                *[(k.lower(), v) for k, v in extra],
+                ("content-length", str(len(body))),
+            ])
+            self.pending[stream_id] = memoryview(body)
+
+    def _flush(self):
+        # Send as much pending body data as flow control allows
+        for stream_id, data in list(self.pending.items()):
+            while data:
+                window = min(self.conn.local_flow_control_window(stream_id),
+                             self.conn.max_outbound_frame_size)
+                if window <= 0:
+                    break
+                self.conn.send_data(stream_id, data[:window].tobytes())
+                data = data[window:]
+            if data:
+                self.pending[stream_id] = data
+            else:
+                self.conn.end_stream(stream_id)
+                del self.pending[stream_id]
+
+
+def local_retailers(servers: dict) -> dict:
+    # RETAILERS-style config pointing each named retailer at its fixture server
+    out = {}
+    for name, srv in servers.items():
+        cfg = dict(RETAILERS[name])
+        search = urlparse(cfg["search"])
+        cfg["base"] = srv.base_url
+        cfg["search"] = f"{srv.base_url}{search.path}?{search.query}"
+        cfg["enabled"] = True
+        out[name] = cfg
+    return out
+
+
+def start_servers(names=("Ace", "PCX"), **kwargs) -> dict:
+    # Start one fixture server per retailer
+    return {name: FixtureServer(name, **kwargs).start() for name in names}
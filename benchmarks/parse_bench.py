@@ -0,0 +1,78 @@
+# Parse-stage scaling: serial parsing vs. the process pool in core.pipeline
+#
+#   python -m benchmarks.parse_bench
+#   python -m benchmarks.parse_bench --docs 2000 --workers 1 2 4 8
+#
+# The corpus is built from the fixture templates (search listings and product
+# pages, ~60 KB each), so only parsing is timed; no sockets are involved.
+
+
+import argparse
+import os
+import time
+
+from config import RETAILERS
+from core import pipeline
+from core.filters import infer_intent
+from benchmarks.fixture_server import FIXTURES_DIR, FixtureStore
+from benchmarks.run import KEYWORDS
+
+
+def build_corpus(count: int) -> list:
+    # [(html, parse_doc kwargs)] alternating listing and product pages
+    stores = {name: FixtureStore(FIXTURES_DIR / name.lower()) for name in ("Ace", "PCX")}
+    docs = []
+    i = 0
+    while len(docs) < count:
+        kw = KEYWORDS[i % len(KEYWORDS)]
+        for name, store in stores.items():
+            args = {"retailer": name, "keyword": kw, "intent": infer_intent(kw)}
+            docs.append((store.search_page(kw).decode("utf-8", "replace"), {**args, "kind": "listing"}))
+            handle = store.matching_handles(kw)[0]
+            card = {"link": f"{RETAILERS[name]['base']}/products/{handle}",
+                    "title": "", "price": None, "cur": None}
+            docs.append((store.product_page(handle).decode("utf-8", "replace"),
+                         {**args, "kind": "product", "card": card}))
+        i += 1
+    return docs[:count]
+
+
+def run_serial(docs: list) -> float:
+    pipeline._init_worker(RETAILERS)
+    t0 = time.perf_counter()
+    for html, kwargs in docs:
+        pipeline.parse_doc(html=html, **kwargs)
+    return time.perf_counter() - t0
+
+
+def run_pool(docs: list, workers: int, batch_size: int) -> float:
+    with pipeline.ParsePool(RETAILERS, workers=workers, batch_size=batch_size) as pool:
+        pool.parse(docs[:workers * batch_size])    # start and warm every worker
+        t0 = time.perf_counter()
+        pool.parse(docs)
+        return time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse-stage scaling benchmark")
+    parser.add_argument("--docs", type=int, default=1000, help="documents to parse")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--batch-size", type=int, default=pipeline.PARSE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    docs = build_corpus(args.docs)
+    mb = sum(len(html) for html, _ in docs) / 1e6
+    mode = "threads (GIL disabled)" if pipeline.gil_disabled() else "processes"
+    print(f"{len(docs)} docs, {mb:.1f} MB, pool uses {mode}")
+
+    serial = run_serial(docs)
+    print(f"{'serial':<12}{len(docs) / serial:>10.0f} docs/s")
+    for n in args.workers:
+        elapsed = run_pool(docs, n, args.batch_size)
+        print(f"{f'{n} workers':<12}{len(docs) / elapsed:>10.0f} docs/s"
+              f"{serial / elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Cache hit rate of a query log: typed keys vs. canonical keys vs. subsumption
+#
+#   python -m benchmarks.query_bench
+#   python -m benchmarks.query_bench --log my_queries.txt --latency 0.05
+#
+# The log (one query per line, as typed) is replayed against the fixture
+# servers through three caches:
+#   typed      SearchCache(): the keyword as typed, lowercased and trimmed
+#   canonical  search_cache(subsume=False): canonical query keys
+#   subsume    search_cache(): canonical keys, and narrower queries answered
+#              from a cached broader one
+# Every query that is answered from a broader query is also searched
+# directly. Reported for those: the share of served results that the direct
+# search also found, and the share of the direct search's full matches
+# (every query word in the title) that were served.
+
+
+import argparse
+import time
+
+from core import Scraper, infer_intent
+from core.query import canonical_query, search_cache
+from utils.cache import SearchCache
+from benchmarks.fixture_server import FIXTURES_DIR, start_servers, local_retailers
+
+
+QUERY_LOG = FIXTURES_DIR / "query_log.txt"
+
+
+def replay(cache, scraper, queries: list) -> dict:
+    subsumed = []
+    start = time.perf_counter()
+    for kw in queries:
+        intent = infer_intent(kw)
+        before = cache.stats["subsumed"]
+        results = cache.get(kw, intent)
+        if results is None:
+            results = scraper.search_parallel(kw, intent)
+            cache.set(kw, intent, results)
+        elif cache.stats["subsumed"] > before:
+            subsumed.append((kw, intent, results))
+    elapsed = time.perf_counter() - start
+
+    served = agreed = full = recalled = 0
+    for kw, intent, results in subsumed:
+        direct = scraper.search_parallel(kw, intent)
+        direct_links = {r["link"] for r in direct}
+        full_links = {r["link"] for r in direct if r["rel"] >= 1.0}
+        links = {r["link"] for r in results}
+        served += len(links)
+        agreed += len(links & direct_links)
+        full += len(full_links)
+        recalled += len(full_links & links)
+    return {
+        **cache.stats,
+        "seconds": elapsed,
+        "precision": agreed / served if served else None,
+        "recall": recalled / full if full else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query canonicalization cache benchmark")
+    parser.add_argument("--log", default=str(QUERY_LOG), help="query log, one query per line")
+    parser.add_argument("--latency", type=float, default=0.02, help="fixture server latency (s)")
+    args = parser.parse_args(argv)
+
+    with open(args.log, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    print(f"{len(queries)} queries, {len({q.lower().strip() for q in queries})} distinct as typed, "
+          f"{len({canonical_query(q) for q in queries})} distinct canonical")
+    print(f"{'':<12}{'hits':>6}{'subsumed':>10}{'crawls':>8}{'hit rate':>10}{'total s':>9}"
+          f"{'precision':>11}{'recall':>8}")
+
+    servers = start_servers(latency=args.latency)
+    try:
+        for label, cache in (("typed", SearchCache()),
+                             ("canonical", search_cache(subsume=False)),
+                             ("subsume", search_cache())):
+            scraper = Scraper(retailers=local_retailers(servers))
+            scraper.rate_limiter.interval = 0
+            r = replay(cache, scraper, queries)
+            rate = (r["hits"] + r["subsumed"]) / len(queries)
+            quality = "".join(f"{v:>{w}.0%}" if v is not None else f"{'—':>{w}}"
+                              for v, w in ((r["precision"], 11), (r["recall"], 8)))
+            print(f"{label:<12}{r['hits']:>6}{r['subsumed']:>10}{r['misses']:>8}{rate:>10.0%}"
+                  f"{r['seconds']:>9.2f}{quality}")
+    finally:
+        for srv in servers.values():
+            srv.stop()
+
+
+if __name__ == "__main__":
+    main()
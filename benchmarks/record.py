@@ -0,0 +1,114 @@
+# Record live retailer pages into benchmarks/fixtures/<retailer>/recorded/
+#
+#   python -m benchmarks.record plywood
+#   python -m benchmarks.record plywood Lazada Shopee   # named retailers, even if disabled
+#
+# The fixture server serves recorded pages in preference to its templates,
+# so benchmarks can replay real markup once it has been captured. Everything
+# a search of that keyword reads is captured (JSON endpoints as well as HTML,
+# so both the adapter and the fallback path replay), plus expected.json: the
+# results the live search produced, which benchmarks.run checks the replayed
+# searches against.
+
+
+import json
+import sys
+from urllib.parse import quote_plus, urlparse
+
+from config import RETAILERS, MAX_PRODUCTS_PER_RETAILER, MARKETPLACE_MAX_PAGES, MARKETPLACE_PAGE_SIZE
+from core import Scraper, infer_intent, lazada, shopee, shopify
+from benchmarks.fixture_server import FIXTURES_DIR
+
+
+def _handle(link: str) -> str:
+    return urlparse(link).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+def _save_json(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    print(f"✓ {path.parent.name}/{path.name}")
+
+
+def record_marketplace(scraper, name: str, cfg: dict, q: str, out_dir):
+    # Search JSON pages, under the names the fixture server looks for
+    for page in range(1, MARKETPLACE_MAX_PAGES + 1):
+        if cfg["adapter"] == "lazada":
+            url, headers = lazada.search_url(cfg["base"], q, page), lazada.request_headers(cfg["base"])
+            filename, parse = f"catalog_{page}.json", lazada.parse_search
+        else:
+            url = shopee.search_url(cfg["base"], q, page, MARKETPLACE_PAGE_SIZE)
+            headers = shopee.request_headers(cfg["base"])
+            filename = f"search_items_{(page - 1) * MARKETPLACE_PAGE_SIZE}.json"
+            parse = shopee.parse_search
+        data = scraper._get_json(url, retailer=name, headers=headers)
+        if data is None:
+            print(f"❌ {name}: search JSON unavailable (page {page})")
+            return
+        _save_json(out_dir / filename, data)
+        items, more = parse(data, cfg["base"])
+        if not items or not more:
+            return
+
+
+def record_shopify(scraper, name: str, cfg: dict, q: str, out_dir):
+    # Predictive search JSON and the product .js of every suggestion
+    data = scraper._get_json(shopify.suggest_url(cfg["base"], q, MAX_PRODUCTS_PER_RETAILER), retailer=name)
+    if data is None:
+        print(f"❌ {name}: suggest.json unavailable")
+        return
+    _save_json(out_dir / "suggest.json", data)
+    for item in shopify.parse_suggest(data, cfg["base"]) or []:
+        link = scraper.profiles[name].canonicalize(item["link"])
+        p_data = scraper._get_json(shopify.product_js_url(link), retailer=name)
+        if p_data is not None:
+            _save_json(out_dir / "products" / f"{_handle(link)}.js", p_data)
+
+
+def record_html(scraper, name: str, cfg: dict, q: str, out_dir):
+    html = scraper._get_html(cfg["search"].format(q=q), retailer=name)
+    if not html:
+        print(f"❌ {name}: search page unavailable")
+        return
+    (out_dir / "search.html").write_text(html, encoding="utf-8")
+
+    links = scraper.profiles[name].extract_links(html)
+    for link in links[:MAX_PRODUCTS_PER_RETAILER]:
+        p_html = scraper._get_html(link, retailer=name)
+        if p_html:
+            (out_dir / "products" / f"{_handle(link)}.html").write_text(p_html, encoding="utf-8")
+            print(f"✓ {name}: {_handle(link)}")
+
+
+def record(keyword: str, names: list = None):
+    scraper = Scraper(logger=print, retailers=RETAILERS)
+    q, intent = quote_plus(keyword), infer_intent(keyword)
+    for name, cfg in RETAILERS.items():
+        if names and name not in names:
+            continue
+        if not names and not cfg.get("enabled", True):
+            continue
+        out_dir = FIXTURES_DIR / name.lower() / "recorded"
+        (out_dir / "products").mkdir(parents=True, exist_ok=True)
+
+        if cfg.get("adapter") in ("lazada", "shopee"):
+            record_marketplace(scraper, name, cfg, q, out_dir)
+        else:
+            if cfg.get("adapter") == "shopify":
+                record_shopify(scraper, name, cfg, q, out_dir)
+            record_html(scraper, name, cfg, q, out_dir)
+
+        results = scraper._search_retailer(name, cfg, q, keyword, intent)
+        _save_json(out_dir / "expected.json", {
+            "keyword": keyword,
+            "results": [
+                [r["title"], round(r["price"], 2) if isinstance(r["price"], (int, float)) else None]
+                for r in results
+            ],
+        })
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python -m benchmarks.record <keyword> [retailer ...]")
+        sys.exit(2)
+    record(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,475 @@
+# Offline benchmark suite: replays retailer fixtures through the search engines
+#
+#   python -m benchmarks.run                      # run everything, compare to baseline
+#   python -m benchmarks.run -w single -w filters # run selected workloads
+#   python -m benchmarks.run --save-baseline      # store results as the new baseline
+#   python -m benchmarks.run --check              # exit 1 on regression (for CI)
+#
+# Timings depend on the machine, so they are only reported against the
+# baseline. --check fails on incorrect results and on the metrics that don't:
+# KiB fetched and requests sent per op.
+
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+from core import Scraper, infer_intent, relevance_score, should_filter_out
+from core.catalogue import CatalogueStore, CatalogueSync
+from core.service import SearchService, ServiceClient
+from core.quote import QuoteEngine
+from core.query import search_cache
+from utils import SearchCache, pick_best_price, calculate_price_stats
+from utils.metrics import Metrics
+from benchmarks.fixture_server import FIXTURES_DIR, start_servers, local_retailers
+from benchmarks import startup
+
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+KEYWORDS = (FIXTURES_DIR / "keywords.txt").read_text(encoding="utf-8").split("\n")
+KEYWORDS = [k for k in KEYWORDS if k]
+
+# Relative change tolerated before a metric is reported as a regression
+TOLERANCE = 0.20
+
+# Machine-independent metrics: a regression in these fails --check
+CHECKED_METRICS = ("kb_per_op", "requests_per_op")
+
+# Concurrent desktops simulated by the 'clients' workload
+CLIENTS = 8
+
+# Engines that must return exactly what a live search would. The others only
+# have to return fixture products at their fixture prices: the catalogue
+# ranks its own snapshot, and the service's cache answers narrower queries
+# with a subset of a broader one
+EXACT_ENGINES = {"scraper", "scraper_html"}
+
+
+# ENGINES
+# Each engine factory takes a RETAILERS-style dict and returns an object
+# with search_parallel(keyword, intent) -> list of result dicts.
+
+def make_scraper(retailers: dict):
+    scraper = Scraper(metrics=Metrics(), retailers=retailers)
+    scraper.rate_limiter.interval = 0
+    return scraper
+
+
+def make_scraper_html(retailers: dict):
+    # Same scraper with JSON adapters disabled (pure HTML scraping)
+    return make_scraper({
+        name: {k: v for k, v in cfg.items() if k != "adapter"} for name, cfg in retailers.items()
+    })
+
+
+class CatalogueEngine:
+    # Searches answered from a synced local snapshot
+
+    def __init__(self, retailers: dict):
+        self.retailers = retailers
+        self.store = CatalogueStore(Path(tempfile.mkdtemp()) / "catalogue.db")
+        CatalogueSync(make_scraper(retailers), self.store).sync_all()
+
+    def search_parallel(self, keyword: str, intent: str) -> list:
+        return self.store.search(keyword, intent, retailers=self.retailers)
+
+
+class ServiceEngine:
+    # Searches through a local SearchService (shared cache, in-flight dedup)
+
+    def __init__(self, retailers: dict):
+        self.service = SearchService(scraper=make_scraper(retailers))
+        self.metrics = self.service.scraper.metrics
+        loop = asyncio.new_event_loop()
+        host, port = loop.run_until_complete(self.service.start("127.0.0.1", 0))
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        self.client = ServiceClient(f"http://{host}:{port}")
+
+    def search_parallel(self, keyword: str, intent: str) -> list:
+        return self.client.search_parallel(keyword, intent)
+
+
+ENGINES = {
+    "scraper": make_scraper,
+    "scraper_html": make_scraper_html,
+    "catalogue": CatalogueEngine,
+    "service": ServiceEngine,
+}
+
+
+# WORKLOADS
+# Each workload takes a context dict and returns a list of per-op latencies.
+
+def wl_single(ctx) -> list:
+    engine = ctx["engine"]
+    out = []
+    for _ in range(ctx["repeat"]):
+        start = time.perf_counter()
+        engine.search_parallel("plywood", "materials")
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def wl_sweep(ctx) -> list:
+    engine = ctx["engine"]
+    out = []
+    for kw in KEYWORDS[:ctx["sweep_size"]]:
+        start = time.perf_counter()
+        engine.search_parallel(kw, infer_intent(kw))
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def _cached_search(engine, cache: SearchCache, kw: str) -> list:
+    intent = infer_intent(kw)
+    results = cache.get(kw, intent)
+    if results is None:
+        results = engine.search_parallel(kw, intent)
+        cache.set(kw, intent, results)
+    return results
+
+
+def wl_cache_cold(ctx) -> list:
+    ctx["cache"] = search_cache()
+    out = []
+    for kw in KEYWORDS[:ctx["cache_size"]]:
+        start = time.perf_counter()
+        _cached_search(ctx["engine"], ctx["cache"], kw)
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def warm_cache(ctx):
+    # Setup for cache_warm, run untimed: fill the cache unless cache_cold did
+    if ctx.get("cache") is None:
+        ctx["cache"] = search_cache()
+        for kw in KEYWORDS[:ctx["cache_size"]]:
+            _cached_search(ctx["engine"], ctx["cache"], kw)
+
+
+def wl_cache_warm(ctx) -> list:
+    cache = ctx["cache"]
+    out = []
+    for kw in KEYWORDS[:ctx["cache_size"]]:
+        start = time.perf_counter()
+        _cached_search(ctx["engine"], cache, kw)
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def wl_clients(ctx) -> list:
+    # CLIENTS desktops searching the same keywords at the same time
+    engine = ctx["engine"]
+
+    def client(_):
+        out = []
+        for kw in KEYWORDS[:ctx["cache_size"]]:
+            start = time.perf_counter()
+            engine.search_parallel(kw, infer_intent(kw))
+            out.append(time.perf_counter() - start)
+        return out
+
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        return [t for latencies in pool.map(client, range(CLIENTS)) for t in latencies]
+
+
+def wl_quote(ctx) -> list:
+    # Whole BOM priced concurrently; each op is one line, timed from the start
+    lines = [
+        {"line": n, "keyword": kw, "qty": 1.0, "intent": infer_intent(kw)}
+        for n, kw in enumerate(KEYWORDS[:ctx["sweep_size"]], 1)
+    ]
+    out = []
+    start = time.perf_counter()
+    QuoteEngine(ctx["engine"]).run(lines, on_line=lambda *_: out.append(time.perf_counter() - start))
+    return out
+
+
+def wl_marketplace(ctx) -> list:
+    # Keyword sweep against the Lazada/Shopee JSON adapters (one request per page)
+    servers = start_servers(("Lazada", "Shopee"), latency=ctx["latency"], jitter=ctx["jitter"])
+    try:
+        engine = make_scraper(local_retailers(servers))
+        out = []
+        for kw in KEYWORDS[:ctx["sweep_size"]]:
+            start = time.perf_counter()
+            engine.search_parallel(kw, infer_intent(kw))
+            out.append(time.perf_counter() - start)
+        return out
+    finally:
+        for srv in servers.values():
+            srv.stop()
+
+
+def _corpus_titles() -> list:
+    titles = []
+    for path in sorted(FIXTURES_DIR.glob("*/catalog.json")):
+        titles.extend(item["title"] for item in json.loads(path.read_text(encoding="utf-8")).values())
+    return titles
+
+
+def wl_filters(ctx) -> list:
+    titles = _corpus_titles()
+    out = []
+    for kw in KEYWORDS:
+        start = time.perf_counter()
+        intent = infer_intent(kw)
+        for t in titles:
+            if not should_filter_out(intent, kw, t):
+                relevance_score(kw, t)
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def wl_helpers(ctx) -> list:
+    results = [
+        {"price": (i * 37) % 5000 + 0.5 if i % 7 else None, "title": f"item {i}"}
+        for i in range(1000)
+    ]
+    out = []
+    for _ in range(200):
+        start = time.perf_counter()
+        calculate_price_stats(results)
+        pick_best_price(results)
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def wl_startup(ctx) -> list:
+    return startup.measure(ctx["repeat"])[1]
+
+
+WORKLOADS = {
+    "single": (wl_single, True),
+    "sweep": (wl_sweep, True),
+    "cache_cold": (wl_cache_cold, True),
+    "cache_warm": (wl_cache_warm, True),
+    "clients": (wl_clients, True),
+    "quote": (wl_quote, True),
+    "marketplace": (wl_marketplace, False),
+    "filters": (wl_filters, False),
+    "helpers": (wl_helpers, False),
+    "startup": (wl_startup, False),
+}
+
+# Untimed setup run before a workload is measured
+SETUP = {
+    "cache_warm": warm_cache,
+}
+
+
+# CORRECTNESS
+# A broken parser is fast too, so before anything is timed each engine's
+# answers are checked against the fixtures the servers replay.
+
+def _by_title(results: list) -> list:
+    return sorted(results, key=lambda r: r[0])
+
+
+def verify(engine, servers: dict, keywords: list, exact: bool = True,
+           marketplace: bool = False) -> list:
+    # Problems with engine's results for keywords (empty if all correct)
+    hosts = {urlparse(srv.base_url).netloc: name for name, srv in servers.items()}
+    problems = []
+    for kw in keywords:
+        intent = infer_intent(kw)
+        got = {name: [] for name in servers}
+        for r in engine.search_parallel(kw, intent):
+            name = hosts.get(urlparse(r["link"]).netloc)
+            if name is None:
+                problems.append(f"{kw!r}: result from an unknown host ({r['link']})")
+                continue
+            price = round(r["price"], 2) if isinstance(r["price"], (int, float)) else r["price"]
+            got[name].append((r["title"], price))
+        for name, srv in servers.items():
+            results = _by_title(got[name])
+            if exact:
+                expected = srv.store.expected_results(kw, intent, marketplace)
+                if expected is not None and results != _by_title(expected):
+                    problems.append(f"{name} {kw!r}: got {results}, expected {expected}")
+                continue
+            prices = {item["title"]: item["price"] for item in srv.store.catalog.values()}
+            wrong = [r for r in results if prices.get(r[0], object()) != r[1]]
+            if wrong:
+                problems.append(f"{name} {kw!r}: not in the fixture catalogue at that price: {wrong}")
+    return problems
+
+
+# MEASUREMENT
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _bytes_fetched(ctx) -> int:
+    metrics = getattr(ctx.get("engine"), "metrics", None)
+    if metrics is None:
+        return 0
+    snap = metrics.snapshot()["retailers"]
+    return sum(data["counters"].get("bytes", 0) for data in snap.values())
+
+
+def _requests_sent(ctx) -> int:
+    return sum(srv.requests for srv in ctx.get("servers", {}).values())
+
+
+def measure(fn, ctx) -> dict:
+    # Timing pass, then a separate tracemalloc pass so tracing doesn't skew latency
+    bytes_before = _bytes_fetched(ctx)
+    requests_before = _requests_sent(ctx)
+    start = time.perf_counter()
+    latencies = fn(ctx)
+    elapsed = time.perf_counter() - start
+    fetched = _bytes_fetched(ctx) - bytes_before
+    requests = _requests_sent(ctx) - requests_before
+
+    tracemalloc.start()
+    fn(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops": len(latencies),
+        "seconds": round(elapsed, 4),
+        "throughput_ops": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "peak_mem_kb": round(peak / 1024, 1),
+        "kb_per_op": round(fetched / 1024 / len(latencies), 1),
+        "requests_per_op": round(requests / len(latencies), 2),
+    }
+
+
+def compare(results: dict, baseline: dict) -> tuple:
+    # -> (regressions in CHECKED_METRICS, timing/memory differences); both
+    # human-readable. Only the first depend on the code alone.
+    regressions, slower = [], []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in CHECKED_METRICS:
+            # A floor of 0.1 keeps rounding noise on near-zero values out
+            if base.get(metric) is not None and cur[metric] > base[metric] * (1 + TOLERANCE) \
+                    and cur[metric] - base[metric] >= 0.1:
+                regressions.append(f"{key}: {metric} {cur[metric]} > baseline {base[metric]}")
+        if base.get("throughput_ops") and cur["throughput_ops"] < base["throughput_ops"] * (1 - TOLERANCE):
+            slower.append(f"{key}: throughput {cur['throughput_ops']} < baseline {base['throughput_ops']}")
+        for metric in ("p99_ms", "peak_mem_kb"):
+            if base.get(metric) and cur[metric] > base[metric] * (1 + TOLERANCE):
+                slower.append(f"{key}: {metric} {cur[metric]} > baseline {base[metric]}")
+    return regressions, slower
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PRICIO offline benchmarks")
+    parser.add_argument("-w", "--workload", action="append", choices=sorted(WORKLOADS))
+    parser.add_argument("-e", "--engine", action="append", choices=sorted(ENGINES))
+    parser.add_argument("--latency", type=float, default=0.02, help="fixture server latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.005, help="fixture server jitter (s)")
+    parser.add_argument("--repeat", type=int, default=10, help="repetitions for 'single'")
+    parser.add_argument("--sweep-size", type=int, default=100)
+    parser.add_argument("--cache-size", type=int, default=20)
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit non-zero on regression")
+    args = parser.parse_args(argv)
+
+    workloads = args.workload or list(WORKLOADS)
+    engines = args.engine or list(ENGINES)
+    servers = start_servers(latency=args.latency, jitter=args.jitter)
+    retailers = local_retailers(servers)
+
+    results = {}
+    problems = []
+    try:
+        if "marketplace" in workloads:
+            mp_servers = start_servers(("Lazada", "Shopee"))
+            try:
+                problems += [
+                    f"marketplace: {p}" for p in verify(
+                        make_scraper(local_retailers(mp_servers)), mp_servers,
+                        KEYWORDS[:args.sweep_size], marketplace=True,
+                    )
+                ]
+            finally:
+                for srv in mp_servers.values():
+                    srv.stop()
+        for engine_name in engines:
+            ctx = {
+                "engine": ENGINES[engine_name](retailers),
+                "repeat": args.repeat,
+                "sweep_size": args.sweep_size,
+                "cache_size": args.cache_size,
+                "latency": args.latency,
+                "jitter": args.jitter,
+                "servers": servers,
+            }
+            if any(WORKLOADS[wl][1] for wl in workloads):
+                problems += [
+                    f"{engine_name}: {p}" for p in verify(
+                        ctx["engine"], servers, KEYWORDS[:args.sweep_size],
+                        exact=engine_name in EXACT_ENGINES,
+                    )
+                ]
+            for wl in workloads:
+                fn, uses_engine = WORKLOADS[wl]
+                key = f"{engine_name}/{wl}" if uses_engine else wl
+                if key in results:
+                    continue
+                if wl in SETUP:
+                    SETUP[wl](ctx)
+                results[key] = measure(fn, ctx)
+                r = results[key]
+                print(
+                    f"{key:<24} {r['ops']:>5} ops  {r['throughput_ops']:>10} ops/s  "
+                    f"p50 {r['p50_ms']:>9} ms  p99 {r['p99_ms']:>9} ms  peak {r['peak_mem_kb']:>9} KiB  "
+                    f"{r['kb_per_op']:>7} KiB/op  {r['requests_per_op']:>6} req/op"
+                )
+    finally:
+        for srv in servers.values():
+            srv.stop()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    for p in problems:
+        print(f"INCORRECT {p}")
+    if problems:
+        # Wrong answers fail the run outright, and never become a baseline
+        print(f"{len(problems)} incorrect result set(s); timings are not comparable.")
+        return 1
+
+    if args.save_baseline:
+        baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return 0
+
+    if not BASELINE_PATH.exists():
+        print("No baseline stored yet (run with --save-baseline).")
+        return 0
+
+    regressions, slower = compare(results, json.loads(BASELINE_PATH.read_text(encoding="utf-8")))
+    for p in slower:
+        print(f"SLOWER {p} (timings vary by machine; not checked)")
+    for p in regressions:
+        print(f"REGRESSION {p}")
+    if not regressions:
+        print("No regressions against baseline.")
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# Interactive search latency while background work shares the scraper
+#
+#   python -m benchmarks.scheduler_bench
+#   python -m benchmarks.scheduler_bench --interval 0.1 --bulk 12 --searches 60
+#
+# One Scraper with a per-host request interval and --concurrency slots per
+# host serves a bulk sweep (--bulk
+# threads searching the keyword list over and over), watchlist-style checks
+# (--watch threads) and a user searching every --every seconds on average. Runs:
+#   idle       interactive searches alone (the floor)
+#   fifo       FifoScheduler: the same slots, first come, first served
+#   priority   RequestScheduler: interactive > watchlist > bulk per host
+# With --interval 0 only the concurrency cap queues fetches, and priority
+# still decides who gets a slot first.
+# Reported: interactive search latency (what the UI waits for) and how many
+# background searches completed per second meanwhile.
+
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import Scraper, infer_intent
+from config import HOST_CONCURRENCY
+from core.scheduler import RequestScheduler, fetch_priority
+from benchmarks.fixture_server import start_servers, local_retailers
+from benchmarks.run import KEYWORDS, _percentile
+
+
+class FifoScheduler(RequestScheduler):
+    # Baseline: slots in arrival order, whatever the priority
+
+    def rank(self) -> int:
+        return 0
+
+
+def background(scraper: Scraper, priority: str, offset: int, stop: threading.Event, done: list):
+    with fetch_priority(priority):
+        i = offset
+        while not stop.is_set():
+            kw = KEYWORDS[i % len(KEYWORDS)]
+            scraper.search_parallel(kw, infer_intent(kw))
+            done.append(time.perf_counter())
+            i += 7
+
+
+def run(limiter, servers: dict, args, load: bool) -> dict:
+    scraper = Scraper(retailers=local_retailers(servers))
+    scraper.rate_limiter = limiter
+    stop = threading.Event()
+    done = []
+    threads = (
+        [("bulk", n) for n in range(args.bulk)] + [("watchlist", n) for n in range(args.watch)]
+        if load else []
+    )
+    latencies = []
+    # Irregular gaps, like a person typing; a fixed period would lock onto the slot grid
+    rng = random.Random(5)
+    with ThreadPoolExecutor(max_workers=max(1, len(threads))) as executor:
+        for priority, n in threads:
+            executor.submit(background, scraper, priority, n, stop, done)
+        time.sleep(args.warmup if load else 0)
+        start = time.perf_counter()
+        for i in range(args.searches):
+            kw = KEYWORDS[(i * 13) % len(KEYWORDS)]
+            t0 = time.perf_counter()
+            scraper.search_parallel(kw, infer_intent(kw))
+            latencies.append(time.perf_counter() - t0)
+            time.sleep(max(0.0, rng.uniform(0.5, 1.5) * args.every - (time.perf_counter() - t0)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+    scraper.transport.close()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "background_per_s": sum(1 for t in done if start <= t <= start + elapsed) / elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Priority scheduler benchmark")
+    parser.add_argument("--searches", type=int, default=40, help="interactive searches timed")
+    parser.add_argument("--every", type=float, default=0.25, help="mean seconds between interactive searches")
+    parser.add_argument("--bulk", type=int, default=8, help="bulk sweep threads")
+    parser.add_argument("--watch", type=int, default=4, help="watchlist threads")
+    parser.add_argument("--interval", type=float, default=0.05, help="per-host request interval (s)")
+    parser.add_argument("--concurrency", type=int, default=HOST_CONCURRENCY, help="requests in flight per host")
+    parser.add_argument("--latency", type=float, default=0.02, help="fixture server latency (s)")
+    parser.add_argument("--warmup", type=float, default=1.0, help="background head start (s)")
+    args = parser.parse_args(argv)
+
+    print(f"{args.searches} interactive searches, {args.bulk} bulk + {args.watch} watchlist threads, "
+          f"one request per host every {args.interval * 1000:.0f} ms, {args.concurrency} at a time")
+    print(f"{'':<12}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'background/s':>14}")
+    for label, limiter_class, load in (("idle", RequestScheduler, False),
+                                        ("fifo", FifoScheduler, True),
+                                        ("priority", RequestScheduler, True)):
+        servers = start_servers(latency=args.latency)
+        try:
+            r = run(limiter_class(args.interval, args.concurrency), servers, args, load)
+        finally:
+            for srv in servers.values():
+                srv.stop()
+        print(f"{label:<12}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}"
+              f"{r['background_per_s']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Reload cost of a stored product set: JSON vs. SQLite vs. columnar snapshot
+#
+#   python -m benchmarks.snapshot_bench
+#   python -m benchmarks.snapshot_bench --rows 200000
+#
+# Each format is loaded from disk and fed to the price statistics, the way a
+# restarted app or a CLI run would. The columnar file is also timed for the
+# stats-only path (price column straight from the mapping, no rows built).
+
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from core.catalogue import CatalogueStore
+from utils.columnar import ColumnarSnapshot, write_snapshot
+from utils.helpers import build_result, calculate_price_stats
+
+
+def build_rows(count: int) -> list:
+    rng = random.Random(7)
+    stores = ("acehardware.ph", "pcx.com.ph", "wilcon.com.ph")
+    return [
+        build_result(
+            f"Product {i} marine plywood {rng.choice(('1/4', '1/2', '3/4'))} inch",
+            round(rng.uniform(50, 5000), 2) if i % 9 else None,
+            "PHP",
+            f"https://{stores[i % len(stores)]}/products/product-{i}",
+            0.0,
+            i % 3 != 2,
+        )
+        for i in range(count)
+    ]
+
+
+def timed(fn) -> tuple:
+    t0 = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - t0, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot reload benchmark")
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    rows = build_rows(args.rows)
+    tmp = Path(tempfile.mkdtemp())
+    json_path = tmp / "results.json"
+    json_path.write_text(json.dumps(rows), encoding="utf-8")
+    store = CatalogueStore(tmp / "catalogue.db")
+    store.upsert("bench", [{**r, "updated_ts": None} for r in rows])
+    col_path = write_snapshot(tmp / "results.col", rows)
+
+    def from_json():
+        return calculate_price_stats(json.loads(json_path.read_text(encoding="utf-8")))
+
+    def from_sqlite():
+        with store._connect() as db:
+            prices = db.execute("SELECT price FROM products").fetchall()
+        return calculate_price_stats([{"price": p} for (p,) in prices])
+
+    def from_columns():
+        with ColumnarSnapshot(col_path) as snapshot:
+            return snapshot.price_stats()
+
+    def from_columns_rows():
+        with ColumnarSnapshot(col_path) as snapshot:
+            return calculate_price_stats(snapshot.results())
+
+    print(f"{args.rows} rows; json {json_path.stat().st_size / 1e6:.1f} MB, "
+          f"columnar {col_path.stat().st_size / 1e6:.1f} MB")
+    expected = calculate_price_stats(rows)
+    for label, fn in (("json load + stats", from_json),
+                      ("sqlite prices + stats", from_sqlite),
+                      ("columnar rows + stats", from_columns_rows),
+                      ("columnar price column", from_columns)):
+        best = min(timed(fn)[0] for _ in range(3))
+        assert fn() == expected, label
+        print(f"{label:<24}{best * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
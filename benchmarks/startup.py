@@ -0,0 +1,50 @@
+# Time-to-first-window measurement for the desktop app
+#
+#   python -m benchmarks.startup
+#
+# Each sample runs in a fresh interpreter. Without a display (CI, SSH) only the
+# import of the UI package is timed, which is what dominates startup anyway.
+
+
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SNIPPET = """
+import time
+t0 = time.perf_counter()
+import tkinter
+from ui import PRICIOApp
+mode = "import"
+try:
+    app = PRICIOApp()
+    app.update()
+    mode = "window"
+    app.destroy()
+except tkinter.TclError:
+    pass
+print(mode, time.perf_counter() - t0)
+"""
+
+
+def sample() -> tuple:
+    # (mode, seconds) for one cold start
+    out = subprocess.run(
+        [sys.executable, "-c", SNIPPET], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return out[-2], float(out[-1])
+
+
+def measure(runs: int = 10) -> tuple:
+    samples = [sample() for _ in range(runs)]
+    return samples[0][0], [s for _, s in samples]
+
+
+if __name__ == "__main__":
+    mode, times = measure()
+    print(f"time-to-first-{mode}: median {statistics.median(times) * 1000:.1f} ms, "
+          f"max {max(times) * 1000:.1f} ms over {len(times)} runs")
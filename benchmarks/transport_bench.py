@@ -0,0 +1,104 @@
+# Fetch-layer comparison: HTTP/1.1 keep-alive pools vs. HTTP/2 multiplexing
+#
+#   python -m benchmarks.transport_bench
+#   python -m benchmarks.transport_bench --keywords 20 --latency 0.05
+#
+# Every transport searches the same keywords against HTTPS fixture servers
+# (self-signed, compressed responses, HTTP/2 offered through ALPN). Reported
+# per keyword: compressed bytes on the wire, new connections, TLS handshakes
+# and search latency. Each transport starts from a cold connection pool.
+# "html" rows disable the JSON adapters, so listing and product pages
+# (~60 KB each before compression) are fetched instead.
+
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import Scraper, infer_intent
+from core.transport import make_transport, accept_encoding
+from utils.metrics import Metrics
+from benchmarks.fixture_server import tls_cert, start_servers, local_retailers
+from benchmarks.run import KEYWORDS, _percentile, make_scraper_html
+
+
+# (label, transport name, keyword searches run concurrently)
+RUNS = [
+    ("requests", "requests", 1),
+    ("httpx-h2", "httpx", 1),
+    ("requests x4", "requests", 4),
+    ("httpx-h2 x4", "httpx", 4),
+]
+
+
+def run(transport: str, concurrency: int, retailers: dict, keywords: list, html: bool) -> dict:
+    if html:
+        retailers = make_scraper_html(retailers).retailers
+    metrics = Metrics()
+    scraper = Scraper(metrics=metrics, retailers=retailers,
+                      transport=make_transport(transport, verify=tls_cert()))
+    scraper.rate_limiter.interval = 0
+
+    def search(kw):
+        t0 = time.perf_counter()
+        scraper.search_parallel(kw, infer_intent(kw))
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(search, keywords))
+    elapsed = time.perf_counter() - start
+    scraper.transport.close()
+
+    totals = {}
+    for data in metrics.snapshot()["retailers"].values():
+        for name, value in data["counters"].items():
+            totals[name] = totals.get(name, 0) + value
+    n = len(keywords)
+    return {
+        "requests": totals.get("requests", 0) / n,
+        "wire_kb": totals.get("wire_bytes", 0) / 1024 / n,
+        "body_kb": totals.get("bytes", 0) / 1024 / n,
+        "connections": totals.get("connections", 0) / n,
+        "handshakes": totals.get("tls_handshakes", 0) / n,
+        "http2": totals.get("http2_requests", 0) / max(1, totals.get("requests", 0)),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "seconds": elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP transport benchmark")
+    parser.add_argument("--keywords", type=int, default=len(KEYWORDS))
+    parser.add_argument("--latency", type=float, default=0.02, help="fixture server latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.005, help="fixture server jitter (s)")
+    parser.add_argument("--transport", action="append", help="only runs for this transport")
+    args = parser.parse_args(argv)
+
+    keywords = [KEYWORDS[i % len(KEYWORDS)] for i in range(args.keywords)]
+    print(f"{len(keywords)} keywords, Accept-Encoding: {accept_encoding()}")
+    print(f"{'':<20}{'req/kw':>8}{'wire KiB':>10}{'body KiB':>10}{'conns':>8}{'TLS':>7}"
+          f"{'h2':>6}{'p50 ms':>9}{'p99 ms':>9}{'total s':>9}")
+    for mode in ("json", "html"):
+        for label, transport, concurrency in RUNS:
+            if args.transport and transport not in args.transport:
+                continue
+            label = f"{mode} {label}"
+            servers = start_servers(latency=args.latency, jitter=args.jitter, http2=True)
+            try:
+                r = run(transport, concurrency, local_retailers(servers), keywords, mode == "html")
+            except ImportError as e:
+                print(f"{label:<20}skipped: {e}")
+                continue
+            finally:
+                for srv in servers.values():
+                    srv.stop()
+            print(f"{label:<20}{r['requests']:>8.1f}{r['wire_kb']:>10.1f}{r['body_kb']:>10.1f}"
+                  f"{r['connections']:>8.2f}{r['handshakes']:>7.2f}{r['http2']:>6.0%}"
+                  f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['seconds']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Crawl work queue: throughput vs. worker processes under one shared rate limit
+#
+#   python -m benchmarks.workqueue_bench
+#   python -m benchmarks.workqueue_bench --keywords 60 --interval 0.1 --processes 1 2 4 8
+#
+# Each run enqueues the same keywords into a fresh SQLite queue and drains it
+# with N worker processes against local fixture servers. All workers share
+# one per-host budget (one request per --interval), so throughput grows with
+# workers only until that budget is used up. The fixture servers record when
+# requests arrive; the busiest WINDOW intervals of any host must not hold
+# more than WINDOW + 1 requests, however many workers run. (Single gaps can
+# come out a few ms short of the interval: slots are spaced where requests
+# are sent, and thread wake-up jitter moves the arrival.)
+
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from core.workqueue import open_queue, run_worker
+from benchmarks.fixture_server import start_servers, local_retailers
+from benchmarks.run import KEYWORDS
+
+
+# Sliding window for the rate check, in intervals
+WINDOW = 10
+
+
+def peak_requests(arrivals: list, window: float) -> int:
+    # Most requests that arrived within any `window` seconds
+    arrivals = sorted(arrivals)
+    peak, first = 0, 0
+    for last, ts in enumerate(arrivals):
+        while ts - arrivals[first] >= window:
+            first += 1
+        peak = max(peak, last - first + 1)
+    return peak
+
+
+def run(processes: int, threads: int, keywords: list, interval: float, latency: float) -> dict:
+    servers = start_servers(latency=latency)
+    queue_path = Path(tempfile.mkdtemp()) / "workqueue.db"
+    queue = open_queue(queue_path)
+    queue.enqueue([("keyword", kw, "") for kw in keywords])
+    retailers = local_retailers(servers)
+    kwargs = dict(retailers=retailers, threads=threads, interval=interval)
+    try:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(run_worker, str(queue_path), **kwargs) for _ in range(processes)]
+            stats = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+    finally:
+        for srv in servers.values():
+            srv.stop()
+
+    gaps = []
+    for srv in servers.values():
+        arrivals = sorted(srv.arrivals)
+        gaps += [b - a for a, b in zip(arrivals, arrivals[1:])]
+    peak = max(peak_requests(srv.arrivals, WINDOW * interval) for srv in servers.values())
+    counts = queue.counts()
+    done = len(queue.results("keyword"))   # products found are stored as done tasks too
+    return {
+        "done": done,
+        "failed": counts["failed"],
+        "retries": sum(s["failed"] for s in stats),
+        "requests": sum(srv.requests for srv in servers.values()),
+        "seconds": elapsed,
+        "tasks_per_s": done / elapsed,
+        "min_gap_ms": min(gaps) * 1000 if gaps else float("nan"),
+        "peak": peak,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl work queue benchmark")
+    parser.add_argument("--keywords", type=int, default=len(KEYWORDS))
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=2, help="tasks per worker process")
+    parser.add_argument("--interval", type=float, default=0.02, help="shared per-host request interval (s)")
+    parser.add_argument("--latency", type=float, default=0.2, help="fixture server latency (s)")
+    args = parser.parse_args(argv)
+
+    # Repeats get a suffix so the queue does not deduplicate them away
+    keywords = [KEYWORDS[i % len(KEYWORDS)] + (f" {i // len(KEYWORDS)}" if i >= len(KEYWORDS) else "")
+                for i in range(args.keywords)]
+    print(f"{len(keywords)} keyword tasks, {args.threads} threads/process, "
+          f"one request per host every {args.interval * 1000:.0f} ms")
+    print(f"{'processes':<12}{'done':>6}{'failed':>8}{'requests':>10}{'total s':>9}"
+          f"{'tasks/s':>9}{'min gap ms':>12}{f'peak/{WINDOW}':>10}")
+    ok = True
+    for n in args.processes:
+        r = run(n, args.threads, keywords, args.interval, args.latency)
+        within = args.interval <= 0 or r["peak"] <= WINDOW + 1
+        ok &= within and r["done"] == len(keywords)
+        print(f"{n:<12}{r['done']:>6}{r['failed']:>8}{r['requests']:>10}{r['seconds']:>9.2f}"
+              f"{r['tasks_per_s']:>9.1f}{r['min_gap_ms']:>12.1f}{r['peak']:>10}{'' if within else '  RATE LIMIT EXCEEDED'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
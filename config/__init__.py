@@ -4,9 +4,43 @@
 from .retailers import (
     RETAILERS,
     REQUEST_DELAY_SEC,
+    HOST_CONCURRENCY,
     MAX_PRODUCTS_PER_RETAILER,
     CACHE_TTL_SEC,
     TIMEOUT_SEC,
+    HTTP_TRANSPORT,
+    MARKETPLACE_PAGE_SIZE,
+    MARKETPLACE_MAX_PAGES,
+    TIMEOUT_MIN_SEC,
+    TIMEOUT_P95_MULTIPLIER,
+    LATENCY_WINDOW,
+    LATENCY_MIN_SAMPLES,
+    MAX_RETRIES,
+    RETRY_BACKOFF_SEC,
+    RETRY_AFTER_MAX_SEC,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_COOLDOWN_SEC,
+    CATALOGUE_PAGE_SIZE,
+    CATALOGUE_MAX_PAGES,
+    CATALOGUE_MAX_RESULTS,
+    CATALOGUE_MAX_AGE_SEC,
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_WORKERS,
+    SERVICE_POOL_SIZE,
+    WORKQUEUE_THREADS,
+    WORKQUEUE_LEASE_SEC,
+    WORKQUEUE_MAX_ATTEMPTS,
+    WORKQUEUE_RETRY_SEC,
+    QUOTE_WORKERS,
+    QUOTE_MIN_RELEVANCE,
+    QUOTE_RELEVANCE_SLACK,
+    WATCH_INTERVAL_SEC,
+    WATCH_WORKERS,
+    QUERY_UNITS,
+    QUERY_SYNONYMS,
+    QUERY_SUBSUME_MIN_RELEVANCE,
+    QUERY_SUBSUME_MIN_RESULTS,
     ELECTRONICS_TOKENS,
     MATERIALS_TOKENS,
 )
@@ -14,9 +48,43 @@ from .retailers import (
 __all__ = [
     'RETAILERS',
     'REQUEST_DELAY_SEC',
+    'HOST_CONCURRENCY',
     'MAX_PRODUCTS_PER_RETAILER',
     'CACHE_TTL_SEC',
     'TIMEOUT_SEC',
+    'HTTP_TRANSPORT',
+    'MARKETPLACE_PAGE_SIZE',
+    'MARKETPLACE_MAX_PAGES',
+    'TIMEOUT_MIN_SEC',
+    'TIMEOUT_P95_MULTIPLIER',
+    'LATENCY_WINDOW',
+    'LATENCY_MIN_SAMPLES',
+    'MAX_RETRIES',
+    'RETRY_BACKOFF_SEC',
+    'RETRY_AFTER_MAX_SEC',
+    'CIRCUIT_FAILURE_THRESHOLD',
+    'CIRCUIT_COOLDOWN_SEC',
+    'CATALOGUE_PAGE_SIZE',
+    'CATALOGUE_MAX_PAGES',
+    'CATALOGUE_MAX_RESULTS',
+    'CATALOGUE_MAX_AGE_SEC',
+    'SERVICE_HOST',
+    'SERVICE_PORT',
+    'SERVICE_WORKERS',
+    'SERVICE_POOL_SIZE',
+    'WORKQUEUE_THREADS',
+    'WORKQUEUE_LEASE_SEC',
+    'WORKQUEUE_MAX_ATTEMPTS',
+    'WORKQUEUE_RETRY_SEC',
+    'QUOTE_WORKERS',
+    'QUOTE_MIN_RELEVANCE',
+    'QUOTE_RELEVANCE_SLACK',
+    'WATCH_INTERVAL_SEC',
+    'WATCH_WORKERS',
+    'QUERY_UNITS',
+    'QUERY_SYNONYMS',
+    'QUERY_SUBSUME_MIN_RELEVANCE',
+    'QUERY_SUBSUME_MIN_RESULTS',
     'ELECTRONICS_TOKENS',
     'MATERIALS_TOKENS',
 ]
@@ -2,6 +2,39 @@
 # Retailer configurations and constants
 
 
+# EXTRACTION PROFILES
+# Compiled once by core.profiles; see that module for the full schema.
+
+SHOPIFY_PROFILE = {
+    "title": ["og_title", "title_tag"],
+    "price": ["og_price", "json_ld", "currency_symbol"],
+    "canonical": {
+        "drop_query": True,  # ?variant=... points at the same product
+        "rewrite": [[r"^/collections/[^/]+(?=/products/)", ""]],
+    },
+    # Card classes used by the common Shopify themes (Dawn, Debut, Impulse, ...)
+    "cards": {
+        "start": r'class="(?:[^"]*\s)?(?:grid-product|product-card|card-wrapper|product-item|grid__item)(?=["\s])',
+        "title": ["card_title", "img_alt"],
+        "price": [{"regex": r'class="[^"]*(?:money|price-item)[^"]*"[^>]*>\s*(?:₱|PHP)?\s*([\d,]+(?:\.\d+)?)'},
+                  "currency_symbol"],
+    },
+}
+
+MAGENTO_PROFILE = {
+    "links": r'<a\b(?=[^>]*class="[^"]*product-item-link)[^>]*href="([^"]+)"',
+    "title": ["og_title", {"regex": r'<span[^>]+itemprop="name"[^>]*>(.*?)</span>'}, "title_tag"],
+    "price": [{"regex": r'data-price-amount="([\d.]+)"'}, "json_ld", "currency_symbol"],
+    "pagination": {"param": "p", "pages": 1},
+    "canonical": {"drop_query": True},
+    "cards": {
+        "start": r'<li[^>]+class="[^"]*\bproduct-item(?=["\s])',
+        "title": [{"regex": r'class="[^"]*product-item-link[^"]*"[^>]*>(.*?)</a>'}],
+        "price": [{"regex": r'data-price-amount="([\d.]+)"'}, "currency_symbol"],
+    },
+}
+
+
 # RETAILER CONFIGURATIONS
 
 RETAILERS = {
@@ -11,20 +44,24 @@ RETAILERS = {
         "product_hint": r"/products/[^/?]+(\?|$)",
         "trusted_score": 90,
         "enabled": True,
+        "adapter": "shopify",  # suggest.json / products/<handle>.js, HTML fallback
+        "profile": {**SHOPIFY_PROFILE, "title_strip": r"\s*[–|-]\s*ACE Hardware.*$"},
     },
     "Wilcon": {
         "base": "https://www.wilcon.com.ph",
         "search": "https://www.wilcon.com.ph/catalogsearch/result/?q={q}",
         "product_hint": r"\.html$|/product",
         "trusted_score": 92,
-        "enabled": False,  # DISABLED - URL patterns not compatible
+        "enabled": False,  # DISABLED - Magento profile not yet verified against the live site
+        "profile": MAGENTO_PROFILE,
     },
     "Handyman": {
         "base": "https://www.handyman.com.ph",
         "search": "https://www.handyman.com.ph/catalogsearch/result/?q={q}",
         "product_hint": r"\.html$|/product",
         "trusted_score": 88,
-        "enabled": False,  # DISABLED - URL patterns not compatible
+        "enabled": False,  # DISABLED - Magento profile not yet verified against the live site
+        "profile": MAGENTO_PROFILE,
     },
     "PCX": {
         "base": "https://pcx.com.ph",
@@ -32,20 +69,27 @@ RETAILERS = {
         "product_hint": r"/products/[^/?]+(\?|$)",
         "trusted_score": 95,
         "enabled": True,  # WORKING
+        "adapter": "shopify",  # suggest.json / products/<handle>.js, HTML fallback
+        "profile": {**SHOPIFY_PROFILE, "title_strip": r"\s*\|\s*PCX.*$"},
     },
     "Lazada": {
         "base": "https://www.lazada.com.ph",
         "search": "https://www.lazada.com.ph/catalog/?q={q}",
         "product_hint": r"-i\d+",
         "trusted_score": 80,
-        "enabled": False,  # DISABLED - needs javascript rendering
+        "enabled": False,  # DISABLED - JSON adapter not yet verified against the live site
+        "adapter": "lazada",  # catalog/?ajax=true JSON; pages are JS-rendered
+        "html_fallback": False,
+        "profile": {"canonical": {"drop_query": True}},  # ?search=1 tracking
     },
     "Shopee": {
         "base": "https://shopee.ph",
         "search": "https://shopee.ph/search?keyword={q}",
         "product_hint": r"-i\.\d+\.\d+",
         "trusted_score": 82,
-        "enabled": False,  # DISABLED - needs javascript rendering
+        "enabled": False,  # DISABLED - JSON adapter not yet verified against the live site
+        "adapter": "shopee",  # api/v4/search/search_items; pages are JS-rendered
+        "html_fallback": False,
     },
 }
 
@@ -53,9 +97,107 @@ RETAILERS = {
 # Scraping settings
 
 REQUEST_DELAY_SEC = 0.2
+HOST_CONCURRENCY = 4              # Requests in flight per retailer host (core.scheduler)
 MAX_PRODUCTS_PER_RETAILER = 5
 CACHE_TTL_SEC = 10 * 60
 TIMEOUT_SEC = 10
+HTTP_TRANSPORT = "requests"       # or "httpx" for HTTP/2 (pip install "httpx[http2,brotli]")
+MARKETPLACE_PAGE_SIZE = 30        # Listing items requested per marketplace JSON page
+MARKETPLACE_MAX_PAGES = 3         # Pages read until MAX_PRODUCTS_PER_RETAILER pass the filters
+
+
+# Adaptive timeouts, retries and circuit breaker
+
+TIMEOUT_MIN_SEC = 3               # Floor for the adaptive (p95-based) timeout
+TIMEOUT_P95_MULTIPLIER = 3.0      # Adaptive timeout = p95 latency x multiplier
+LATENCY_WINDOW = 50               # Latency samples kept per host
+LATENCY_MIN_SAMPLES = 5           # Samples needed before adapting the timeout
+MAX_RETRIES = 2                   # Extra attempts for transient failures (429/503)
+RETRY_BACKOFF_SEC = 0.5           # Base backoff, doubled per attempt plus jitter
+RETRY_AFTER_MAX_SEC = 10          # Cap on server-provided Retry-After
+CIRCUIT_FAILURE_THRESHOLD = 3     # Consecutive failures before a host is skipped
+CIRCUIT_COOLDOWN_SEC = 60         # How long a tripped host is skipped
+
+
+# Catalogue snapshot (python main.py sync)
+
+CATALOGUE_PAGE_SIZE = 250         # Products per /products.json page (Shopify max)
+CATALOGUE_MAX_PAGES = 200         # Safety cap on pages per retailer
+CATALOGUE_MAX_RESULTS = 20        # Results returned by a local catalogue search
+CATALOGUE_MAX_AGE_SEC = 24 * 60 * 60  # Snapshot older than this is considered stale
+
+
+# Shared search service (python main.py serve)
+
+SERVICE_HOST = "127.0.0.1"        # Use 0.0.0.0 to accept clients from the office LAN
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 8               # Searches crawled concurrently
+SERVICE_POOL_SIZE = 32            # Keep-alive connections kept per retailer host
+
+
+# Crawl work queue (python main.py enqueue / worker)
+
+WORKQUEUE_THREADS = 4             # Tasks run concurrently inside one worker process
+WORKQUEUE_LEASE_SEC = 5 * 60      # A task not finished by then is handed to another worker
+WORKQUEUE_MAX_ATTEMPTS = 3        # Tries before a task is marked failed
+WORKQUEUE_RETRY_SEC = 30          # Backoff before a retry, doubled per attempt
+
+
+# Bulk quotes (BOM pricing)
+
+QUOTE_WORKERS = 16                # BOM lines searched concurrently
+QUOTE_MIN_RELEVANCE = 0.5         # Results matching less of the keyword are never quoted
+QUOTE_RELEVANCE_SLACK = 0.25      # Cheapest result within this much of the best relevance wins
+
+
+# Watchlist (python main.py watch)
+
+WATCH_INTERVAL_SEC = 6 * 60 * 60  # Default time between checks of one watch
+WATCH_WORKERS = 8                 # Watches checked concurrently
+
+
+# Query canonicalization (cache keys, see core/query.py)
+
+# Unit spellings -> canonical unit; a number followed by a unit becomes one token ("12mm")
+QUERY_UNITS = {
+    "mm": "mm", "millimeter": "mm", "millimeters": "mm", "millimetre": "mm", "millimetres": "mm",
+    "cm": "cm", "centimeter": "cm", "centimeters": "cm", "centimetre": "cm", "centimetres": "cm",
+    "m": "m", "meter": "m", "meters": "m", "metre": "m", "metres": "m", "mtr": "m", "mtrs": "m",
+    "in": "in", "inch": "in", "inches": "in",
+    "ft": "ft", "foot": "ft", "feet": "ft",
+    "kg": "kg", "kgs": "kg", "kilo": "kg", "kilos": "kg", "kilogram": "kg", "kilograms": "kg",
+    "g": "g", "gram": "g", "grams": "g",
+    "l": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l", "ltr": "l",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml",
+    "gal": "gal", "gallon": "gal", "gallons": "gal",
+    "gb": "gb", "tb": "tb",
+    "w": "w", "watt": "w", "watts": "w",
+}
+
+# Words or phrases -> the canonical word(s) they are cached under. Only
+# replacements that mean the same in every category: "memory" (memory card,
+# memory foam) and "ply" (3-ply mask) would merge unrelated searches.
+QUERY_SYNONYMS = {
+    "plyboard": "plywood",
+    "galvanized": "gi",
+    "galvanised": "gi",
+    "concrete hollow block": "chb",
+    "hollow block": "chb",
+    "graphics card": "gpu",
+    "video card": "gpu",
+    "power supply": "psu",
+    "solid state drive": "ssd",
+    "hard drive": "hdd",
+    "hard disk": "hdd",
+    "nails": "nail",
+    "screws": "screw",
+    "bolts": "bolt",
+    "tiles": "tile",
+    "pipes": "pipe",
+}
+
+QUERY_SUBSUME_MIN_RELEVANCE = 1.0  # Share of a narrower query's words a broader query's result must contain
+QUERY_SUBSUME_MIN_RESULTS = 3      # Matches needed when the broader search hit MAX_PRODUCTS_PER_RETAILER
 
 
 # Category token sets
@@ -1,6 +1,14 @@
 # Core functionality module
 
-from .scraper import Scraper
 from .filters import infer_intent, relevance_score, should_filter_out
 
 __all__ = ['Scraper', 'infer_intent', 'relevance_score', 'should_filter_out']
+
+
+def __getattr__(name):
+    # Import the scraper (and with it requests) only when first used,
+    # so the UI can show its window before the network stack loads
+    if name == 'Scraper':
+        from .scraper import Scraper
+        return Scraper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,399 @@
+# Local catalogue snapshot: full sync, incremental deltas and offline search
+#
+# The first sync of a Shopify retailer pages through /products.json (250
+# products per request). Later syncs read the sitemap, compare each product's
+# <lastmod> against the stored value and fetch only new or changed products;
+# products that disappeared from the sitemap are dropped. Retailers without
+# the Shopify adapter are synced from the sitemap and their product pages.
+#
+# Products are only dropped after a complete listing: a sitemap or
+# products.json page that fails to download, or a stopped sync, keeps what is
+# stored and leaves the retailer unmarked, so the next sync runs again.
+
+
+import re
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from config import (
+    RETAILERS,
+    CATALOGUE_PAGE_SIZE,
+    CATALOGUE_MAX_PAGES,
+    CATALOGUE_MAX_RESULTS,
+    CATALOGUE_MAX_AGE_SEC,
+)
+from core import shopify
+from core.filters import normalize_words, should_filter_out, relevance_score
+from core.scheduler import fetch_priority
+from utils.helpers import build_result, store_name
+
+
+DEFAULT_DB_PATH = Path("data") / "catalogue.db"
+DEFAULT_SNAPSHOT_PATH = Path("data") / "catalogue.col"
+
+# Columnar export (utils.columnar): result columns plus the retailer and timestamps
+SNAPSHOT_COLUMNS = {
+    "retailer": "str",
+    "title": "str",
+    "store": "str",
+    "price": "f8",
+    "cur": "str",
+    "link": "str",
+    "updated_ts": "f8",
+    "synced_ts": "f8",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    retailer   TEXT NOT NULL,
+    link       TEXT NOT NULL PRIMARY KEY,
+    title      TEXT NOT NULL,
+    price      REAL,
+    cur        TEXT,
+    updated_ts REAL,
+    synced_ts  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_retailer ON products (retailer);
+CREATE TABLE IF NOT EXISTS sync_state (
+    retailer   TEXT NOT NULL PRIMARY KEY,
+    synced_ts  REAL NOT NULL,
+    method     TEXT NOT NULL
+);
+"""
+
+_SITEMAP_NS = re.compile(r"^\{[^}]*\}")
+
+
+def parse_timestamp(value):
+    # ISO-8601 (Shopify updated_at / sitemap lastmod) -> epoch seconds
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_sitemap(xml_text: str) -> tuple:
+    # -> (child sitemap URLs, [(url, lastmod)])
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError:
+        return [], []
+    children, urls = [], []
+    for node in root:
+        tag = _SITEMAP_NS.sub("", node.tag)
+        fields = {_SITEMAP_NS.sub("", c.tag): (c.text or "").strip() for c in node}
+        if not fields.get("loc"):
+            continue
+        if tag == "sitemap":
+            children.append(fields["loc"])
+        elif tag == "url":
+            urls.append((fields["loc"], fields.get("lastmod")))
+    return children, urls
+
+
+def fetch_product(scraper, name: str, link: str):
+    # One product's title/price: Shopify .js when available, else the page.
+    # -> {"link", "title", "price", "cur"} or None
+    if scraper.retailers[name].get("adapter") == "shopify":
+        data = scraper._get_json(shopify.product_js_url(link), retailer=name)
+        if data is not None:
+            title, price = shopify.parse_product_js(data)
+            if title:
+                return {"link": link, "title": title, "price": price, "cur": "PHP"}
+    html = scraper._get_html(link, retailer=name)
+    if not html:
+        return None
+    title = scraper._extract_title(html, name)
+    if not title:
+        return None
+    price, cur = scraper._extract_price(html, name)
+    return {"link": link, "title": title, "price": price, "cur": cur}
+
+
+class CatalogueStore:
+    # SQLite-backed product snapshot shared by all retailers
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the store thread-safe
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def updated_map(self, retailer: str) -> dict:
+        # {link: updated_ts} for one retailer
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT link, updated_ts FROM products WHERE retailer = ?", (retailer,)
+            ).fetchall()
+        return dict(rows)
+
+    def upsert(self, retailer: str, records: list):
+        # records: [{"link", "title", "price", "cur", "updated_ts"}]
+        now = time.time()
+        with self._connect() as db:
+            db.executemany(
+                "INSERT INTO products (retailer, link, title, price, cur, updated_ts, synced_ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET title = excluded.title, price = excluded.price, "
+                "cur = excluded.cur, updated_ts = excluded.updated_ts, synced_ts = excluded.synced_ts",
+                [
+                    (retailer, r["link"], r["title"], r["price"], r.get("cur") or "PHP",
+                     r.get("updated_ts"), now)
+                    for r in records
+                ],
+            )
+
+    def delete(self, links: list):
+        with self._connect() as db:
+            db.executemany("DELETE FROM products WHERE link = ?", [(link,) for link in links])
+
+    def mark_synced(self, retailer: str, method: str):
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO sync_state (retailer, synced_ts, method) VALUES (?, ?, ?) "
+                "ON CONFLICT(retailer) DO UPDATE SET synced_ts = excluded.synced_ts, method = excluded.method",
+                (retailer, time.time(), method),
+            )
+
+    def last_synced(self, retailer: str):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT synced_ts FROM sync_state WHERE retailer = ?", (retailer,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, retailer: str, max_age_sec: float = CATALOGUE_MAX_AGE_SEC) -> bool:
+        ts = self.last_synced(retailer)
+        return ts is not None and time.time() - ts < max_age_sec
+
+    def count(self, retailer: str = None) -> int:
+        with self._connect() as db:
+            if retailer:
+                return db.execute(
+                    "SELECT COUNT(*) FROM products WHERE retailer = ?", (retailer,)
+                ).fetchone()[0]
+            return db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def search(self, keyword: str, intent: str, retailers: dict = None,
+               limit: int = CATALOGUE_MAX_RESULTS) -> list:
+        # Answer a keyword search from the snapshot, in the scraper's result format
+        retailers = retailers if retailers is not None else RETAILERS
+        words = normalize_words(keyword)
+        if not words:
+            return []
+
+        # Coarse SQL prefilter (any keyword word), exact scoring in Python
+        where = " OR ".join("LOWER(title) LIKE ?" for _ in words)
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT retailer, link, title, price, cur FROM products WHERE {where}",
+                [f"%{w}%" for w in words],
+            ).fetchall()
+
+        results = []
+        for retailer, link, title, price, cur in rows:
+            cfg = retailers.get(retailer)
+            if cfg is None or not cfg.get("enabled", True):
+                continue
+            if should_filter_out(intent, keyword, title):
+                continue
+            rel = relevance_score(keyword, title)
+            if rel <= 0:
+                continue
+            results.append(build_result(title, price, cur, link, rel, cfg["trusted_score"] >= 85))
+        results.sort(key=lambda r: -r["rel"])
+        return results[:limit]
+
+    def search_parallel(self, keyword: str, intent: str) -> list:
+        # Same call shape as Scraper.search_parallel
+        return self.search(keyword, intent)
+
+    def export_snapshot(self, path: Path = DEFAULT_SNAPSHOT_PATH) -> int:
+        # Write every product to a memory-mappable columnar file; returns the row count
+        from utils.columnar import write_snapshot
+
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = [dict(r) for r in db.execute(
+                "SELECT retailer, title, price, cur, link, updated_ts, synced_ts "
+                "FROM products ORDER BY retailer, link"
+            )]
+        for r in rows:
+            r["store"] = store_name(r["link"])
+        write_snapshot(path, rows, SNAPSHOT_COLUMNS, meta={"source": str(self.path),
+                                                          "exported_ts": time.time()})
+        return len(rows)
+
+
+class CatalogueSync:
+    # Pulls retailer catalogues into a CatalogueStore through a Scraper
+
+    def __init__(self, scraper, store: CatalogueStore):
+        self.scraper = scraper
+        self.store = store
+
+    def log(self, message):
+        self.scraper.log(message)
+
+    def sync_all(self, full: bool = False) -> dict:
+        # Sync every enabled retailer; returns {retailer: stats}
+        stats = {}
+        with fetch_priority("bulk"):
+            for name, cfg in self.scraper.retailers.items():
+                if not cfg.get("enabled", True) or self.scraper.stop_flag:
+                    continue
+                stats[name] = self.sync(name, full=full)
+        return stats
+
+    def sync(self, name: str, full: bool = False) -> dict:
+        cfg = self.scraper.retailers[name]
+        first_run = self.store.last_synced(name) is None
+        if cfg.get("adapter") == "shopify" and (full or first_run):
+            stats = self._sync_products_json(name, cfg)
+            if stats is not None:
+                return self._mark(name, "products.json", stats)
+            self.log(f"  {name}: products.json unavailable, using sitemap")
+        stats = self._sync_sitemap(name, cfg)
+        if stats is not None:
+            return self._mark(name, "sitemap", stats)
+        self.log(f"❌ {name}: catalogue sync failed")
+        return {"added": 0, "changed": 0, "removed": 0, "unchanged": 0, "failed": True}
+
+    def _mark(self, name: str, method: str, stats: dict) -> dict:
+        # Record a complete sync; a partial one stays due
+        if stats.get("partial"):
+            self.log(f"⚠️ {name}: partial sync, nothing removed")
+        else:
+            self.store.mark_synced(name, method)
+        return stats
+
+    def _sync_products_json(self, name: str, cfg: dict):
+        # Full sync from /products.json pages
+        known = self.store.updated_map(name)
+        profile = self.scraper.profiles[name]
+        seen = set()
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+
+        for page in range(1, CATALOGUE_MAX_PAGES + 1):
+            if self.scraper.stop_flag:
+                return dict(stats, partial=True)
+            data = self.scraper._get_json(
+                shopify.products_page_url(cfg["base"], page, CATALOGUE_PAGE_SIZE), retailer=name
+            )
+            if data is None:
+                # Partial listing: keep products we didn't get to see
+                return None if page == 1 else dict(stats, partial=True)
+            records = shopify.parse_products_page(data, cfg["base"])
+            if not records:
+                break
+
+            changed = []
+            for r in records:
+                r["link"] = profile.canonicalize(r["link"])
+                r["updated_ts"] = parse_timestamp(r.pop("updated_at"))
+                seen.add(r["link"])
+                self._classify(r, known, stats, changed)
+            self.store.upsert(name, changed)
+            self.log(f"✓ {name}: products.json page {page} ({len(records)} products)")
+            if len(records) < CATALOGUE_PAGE_SIZE:
+                break
+
+        return self._finish(name, known, seen, stats)
+
+    def _sync_sitemap(self, name: str, cfg: dict):
+        # Incremental sync driven by sitemap <lastmod>
+        profile = self.scraper.profiles[name]
+        entries = self._sitemap_products(name, cfg)
+        if entries is None:
+            return None
+
+        known = self.store.updated_map(name)
+        seen = set()
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        batch = []
+        for link, lastmod in entries:
+            if self.scraper.stop_flag:
+                break
+            link = profile.canonicalize(link)
+            if link in seen:
+                continue
+            seen.add(link)
+            updated_ts = parse_timestamp(lastmod)
+            if link in known and updated_ts is not None and known[link] is not None \
+                    and updated_ts <= known[link]:
+                stats["unchanged"] += 1
+                continue
+
+            record = self._fetch_product(name, cfg, link)
+            if record is None:
+                continue
+            record["updated_ts"] = updated_ts
+            self._classify(record, known, stats, batch)
+            if len(batch) >= 100:
+                self.store.upsert(name, batch)
+                batch = []
+        self.store.upsert(name, batch)
+
+        if self.scraper.stop_flag:
+            return dict(stats, partial=True)
+        return self._finish(name, known, seen, stats)
+
+    def _sitemap_products(self, name: str, cfg: dict):
+        # [(product URL, lastmod)] from sitemap.xml (following product sub-sitemaps);
+        # None unless every sitemap was read
+        profile = self.scraper.profiles[name]
+        xml_text = self.scraper._get_html(f"{cfg['base']}/sitemap.xml", retailer=name)
+        if not xml_text:
+            return None
+        children, urls = parse_sitemap(xml_text)
+        product_children = [c for c in children if "product" in c.lower()] or children
+        for child in product_children:
+            child_xml = self.scraper._get_html(child, retailer=name)
+            if not child_xml:
+                self.log(f"❌ {name}: {child} unavailable")
+                return None
+            urls.extend(parse_sitemap(child_xml)[1])
+        return [(u, m) for u, m in urls if profile.product_re.search(profile.canonicalize(u))]
+
+    def _fetch_product(self, name: str, cfg: dict, link: str):
+        return fetch_product(self.scraper, name, link)
+
+    def _classify(self, record: dict, known: dict, stats: dict, changed: list):
+        # Count a fetched record and queue it for writing if new or changed
+        link = record["link"]
+        if link not in known:
+            stats["added"] += 1
+        elif record.get("updated_ts") is None or known[link] is None \
+                or record["updated_ts"] > known[link]:
+            stats["changed"] += 1
+        else:
+            stats["unchanged"] += 1
+            return
+        changed.append(record)
+
+    def _finish(self, name: str, known: dict, seen: set, stats: dict) -> dict:
+        # Drop products no longer listed by the retailer
+        removed = [link for link in known if link not in seen]
+        self.store.delete(removed)
+        stats["removed"] = len(removed)
+        self.log(
+            f"✅ {name}: +{stats['added']} ~{stats['changed']} -{stats['removed']} "
+            f"={stats['unchanged']} products"
+        )
+        return stats
@@ -0,0 +1,52 @@
+# Lazada catalog JSON (the XHR behind its search page)
+
+
+from urllib.parse import urljoin
+
+
+def search_url(base: str, q: str, page: int) -> str:
+    # ajax=true returns the listing as JSON; q must already be URL-encoded
+    return f"{base}/catalog/?ajax=true&isFirstRequest=true&page={page}&q={q}"
+
+
+def request_headers(base: str) -> dict:
+    # Without these the endpoint tends to answer with the HTML shell or a captcha
+    return {"Referer": f"{base}/", "X-Requested-With": "XMLHttpRequest"}
+
+
+def _price(value):
+    # "1245.00", or "₱1,245.00" in priceShow
+    if value in (None, ""):
+        return None
+    try:
+        return float(str(value).replace("₱", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def parse_search(data: dict, base: str) -> tuple:
+    # Catalog response -> ([{"title", "price", "link"}], more pages available);
+    # items is None when the payload isn't a catalog response (captcha, error)
+    try:
+        items = data["mods"]["listItems"]
+    except (KeyError, TypeError):
+        return None, False
+    out = []
+    for item in items or []:
+        if not isinstance(item, dict) or not item.get("itemUrl"):
+            continue
+        price = _price(item.get("price"))
+        if price is None:
+            price = _price(item.get("priceShow"))
+        out.append({
+            "title": (item.get("name") or "").strip(),
+            "price": price,
+            # Protocol-relative: //www.lazada.com.ph/products/<slug>-i<id>-s<sku>.html?...
+            "link": urljoin(base, item["itemUrl"]),
+        })
+    info = data.get("mainInfo") or {}
+    try:
+        more = int(info["page"]) * int(info["pageSize"]) < int(info["totalResults"])
+    except (KeyError, TypeError, ValueError):
+        more = bool(out)
+    return out, more
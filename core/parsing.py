@@ -0,0 +1,93 @@
+# From fetched search and product pages to result dicts
+#
+# Shared by Scraper, which parses in its fetch threads, and core.pipeline,
+# which parses in worker processes, so both read the same cards, fall back
+# the same way and filter/score identically. `metrics` is optional because
+# parse workers have no collector to report to.
+
+
+from contextlib import nullcontext
+
+from config import MAX_PRODUCTS_PER_RETAILER
+from core.filters import should_filter_out, relevance_score
+from utils.helpers import build_result
+
+
+class _NoMetrics:
+    # Stand-in for utils.metrics.Metrics that records nothing
+
+    def span(self, stage: str, retailer: str = "all"):
+        return nullcontext()
+
+    def incr(self, counter: str, n: int = 1, retailer: str = "all"):
+        pass
+
+
+NO_METRICS = _NoMetrics()
+
+
+def listing_cards(profile, html: str, name: str = "all", metrics=NO_METRICS) -> list:
+    # Product cards on a search page; bare links when the profile's cards don't match
+    with metrics.span("extract_cards", name):
+        cards = profile.extract_cards(html)
+    if cards:
+        return cards
+    with metrics.span("extract_links", name):
+        return [
+            {"link": link, "title": "", "price": None, "cur": None}
+            for link in profile.extract_links(html)
+        ]
+
+
+def merge_cards(cards: list, page_cards: list) -> list:
+    # cards plus the page's cards not seen yet (by link), capped at MAX_PRODUCTS_PER_RETAILER
+    seen = {c["link"] for c in cards}
+    merged = list(cards)
+    for card in page_cards:
+        if card["link"] not in seen:
+            seen.add(card["link"])
+            merged.append(card)
+    return merged[:MAX_PRODUCTS_PER_RETAILER]
+
+
+def is_complete(card: dict) -> bool:
+    # The listing showed both title and price: no product page needed
+    return bool(card["title"]) and card["price"] is not None
+
+
+def make_result(name: str, cfg: dict, keyword: str, intent: str,
+                title: str, price, cur, link: str, metrics=NO_METRICS):
+    # Filter, score and build the standard result dict (None if filtered out).
+    # `price` may be a callable returning (price, currency) to defer parsing.
+    title = title or f"{keyword} ({name})"
+
+    with metrics.span("filter", name):
+        filtered = should_filter_out(intent, keyword, title)
+    if filtered:
+        metrics.incr("filtered_out", retailer=name)
+        return None
+
+    if callable(price):
+        with metrics.span("parse_price", name):
+            price, cur = price()
+
+    with metrics.span("score", name):
+        rel = relevance_score(keyword, title)
+
+    return build_result(title, price, cur, link, rel, cfg["trusted_score"] >= 85)
+
+
+def product_result(name: str, cfg: dict, profile, keyword: str, intent: str,
+                   card: dict, html: str, metrics=NO_METRICS):
+    # Result for a listing card completed from its product page (None if filtered out)
+    title = card["title"]
+    if not title:
+        with metrics.span("parse_title", name):
+            title = profile.extract_title(html)
+
+    # Parse price lazily: skip it entirely for filtered-out products
+    if card["price"] is not None:
+        price, cur = card["price"], card["cur"]
+    else:
+        price, cur = (lambda: profile.extract_price(html)), None
+    return make_result(name, cfg, keyword, intent, title, price, cur, card["link"], metrics)
@@ -0,0 +1,246 @@
+# Bulk search pipeline: threaded fetching, process-pool parsing
+#
+# In a batch sweep the regex extraction and filtering would otherwise run in
+# the same threads as the I/O and be serialized by the GIL. Here fetch threads
+# only download; pages are handed in batches to a ProcessPoolExecutor whose
+# workers hold pre-compiled profiles. On a free-threaded (no-GIL) build a
+# thread pool is used instead.
+#
+# Every search reads what Scraper.search_parallel would: JSON adapters first
+# (they are cheap to parse and stay in the fetch threads), then as many search
+# result pages as the profile allows until MAX_PRODUCTS_PER_RETAILER cards are
+# found, then product pages for incomplete cards. Parsing goes through
+# core.parsing, the same code the scraper runs inline.
+
+
+import sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from urllib.parse import quote_plus
+
+from config import MAX_PRODUCTS_PER_RETAILER
+from core.filters import infer_intent
+from core.parsing import listing_cards, merge_cards, is_complete, make_result, product_result
+from core.profiles import compile_profiles
+from core.scheduler import fetch_priority, submit
+
+
+PARSE_BATCH_SIZE = 16
+FETCH_WORKERS = 12
+
+# Per-worker state, set by _init_worker
+_PROFILES = {}
+_RETAILERS = {}
+
+
+def gil_disabled() -> bool:
+    # True on a free-threaded CPython build running without the GIL
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_enabled is not None and not is_enabled()
+
+
+def _init_worker(retailers: dict):
+    # Compile profiles once per worker process
+    global _PROFILES, _RETAILERS
+    _RETAILERS = retailers
+    _PROFILES = compile_profiles(retailers)
+
+
+def parse_doc(retailer: str, kind: str, html: str, keyword: str, intent: str, card: dict = None):
+    # Parse one page: a listing -> its cards; a product page -> result dict or None
+    profile = _PROFILES[retailer]
+    if kind == "listing":
+        return listing_cards(profile, html)
+    return product_result(retailer, _RETAILERS[retailer], profile, keyword, intent, card, html)
+
+
+def _parse_batch(docs: list) -> list:
+    # Worker entry point: docs are (html, parse_doc kwargs)
+    return [parse_doc(html=html, **kwargs) for html, kwargs in docs]
+
+
+class ParsePool:
+    # Parses batches of pages in worker processes (or threads without a GIL).
+    # Pages travel as plain str arguments: one pickle per batch, no extra copies.
+
+    def __init__(self, retailers: dict, workers: int = None, batch_size: int = PARSE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.threaded = gil_disabled()
+        if self.threaded:
+            _init_worker(retailers)
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(retailers,)
+            )
+
+    def submit(self, docs: list):
+        # docs: [(html, parse_doc kwargs)] -> Future of parse_doc results
+        return self.executor.submit(_parse_batch, docs)
+
+    def parse(self, docs: list) -> list:
+        # Parse docs in batches; results in input order
+        futures = [
+            self.submit(docs[i:i + self.batch_size]) for i in range(0, len(docs), self.batch_size)
+        ]
+        out = []
+        for f in futures:
+            out.extend(f.result())
+        return out
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _RetailerSearch:
+    # One keyword at one retailer while it moves through the stages
+
+    __slots__ = ("index", "name", "keyword", "intent", "urls", "page", "cards", "results")
+
+    def __init__(self, index: int, name: str, keyword: str, intent: str, urls: list):
+        self.index = index  # position of the search in BulkPipeline.run()'s input
+        self.name = name
+        self.keyword = keyword
+        self.intent = intent
+        self.urls = urls
+        self.page = 0
+        self.cards = []
+        self.results = None
+
+
+class BulkPipeline:
+    # Runs many keyword searches: fetch threads feed batched parse workers
+
+    def __init__(self, scraper, workers: int = None, batch_size: int = PARSE_BATCH_SIZE):
+        self.scraper = scraper
+        self.retailers = {
+            name: cfg for name, cfg in scraper.retailers.items() if cfg.get("enabled", True)
+        }
+        self.pool = ParsePool(self.retailers, workers=workers, batch_size=batch_size)
+        self.batch_size = batch_size
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search_many(self, keywords: list, intent: str = None) -> dict:
+        # {keyword: results} for every keyword across all enabled retailers
+        searches = [(kw, intent or infer_intent(kw)) for kw in keywords]
+        return dict(zip(keywords, self.run(searches)))
+
+    def run(self, searches: list) -> list:
+        # [(keyword, intent)] -> one result list per search, in order
+        scraper = self.scraper
+        states = [
+            _RetailerSearch(n, name, kw, kw_intent, scraper.profiles[name].search_urls(quote_plus(kw)))
+            for n, (kw, kw_intent) in enumerate(searches) for name in self.retailers
+        ]
+
+        with fetch_priority("bulk"), ThreadPoolExecutor(max_workers=FETCH_WORKERS) as fetchers:
+            # Stage 1: JSON adapters; None means the retailer wants HTML scraping
+            adapters = {
+                submit(fetchers, scraper._search_adapter, s.name, self.retailers[s.name],
+                       quote_plus(s.keyword), s.keyword, s.intent): s
+                for s in states if self.retailers[s.name].get("adapter")
+            }
+            for f in as_completed(adapters):
+                adapters[f].results = self._result_of(f, adapters[f])
+
+            # Stage 2: search result pages, one page per round until enough cards
+            listing = [s for s in states if s.results is None]
+            while listing:
+                jobs = [(s.urls[s.page], s, {"retailer": s.name, "kind": "listing",
+                                             "keyword": s.keyword, "intent": s.intent})
+                        for s in listing]
+                for s, cards in self._fetch_and_parse(fetchers, jobs):
+                    s.page += 1
+                    if cards is None:
+                        if s.page == 1:
+                            scraper.log(f"❌ {s.name}: Failed to get search page")
+                            s.results = []
+                        s.urls = []
+                        continue
+                    s.cards = merge_cards(s.cards, cards)
+                listing = [s for s in listing if s.results is None and s.page < len(s.urls)
+                           and len(s.cards) < MAX_PRODUCTS_PER_RETAILER]
+
+            # Stage 3: product pages for cards the listing couldn't complete
+            jobs = []
+            for s in states:
+                if s.results is not None:
+                    continue
+                complete = sum(1 for c in s.cards if is_complete(c))
+                scraper.metrics.incr("listing_complete", complete, retailer=s.name)
+                s.results = [None] * len(s.cards)
+                for i, card in enumerate(s.cards):
+                    if is_complete(card):
+                        s.results[i] = make_result(
+                            s.name, self.retailers[s.name], s.keyword, s.intent,
+                            card["title"], card["price"], card["cur"], card["link"], scraper.metrics,
+                        )
+                    else:
+                        jobs.append((card["link"], (s, i), {
+                            "retailer": s.name, "kind": "product", "keyword": s.keyword,
+                            "intent": s.intent, "card": card,
+                        }))
+            for (s, i), result in self._fetch_and_parse(fetchers, jobs):
+                s.results[i] = result
+
+        out = [[] for _ in searches]
+        for s in states:
+            results = [r for r in s.results if r]
+            scraper.metrics.incr("products", len(results), retailer=s.name)
+            out[s.index].extend(results)
+        return out
+
+    def _result_of(self, future, state: _RetailerSearch):
+        try:
+            return future.result()
+        except Exception as e:
+            self.scraper.log(f"❌ {state.name}: Error - {e}")
+            return []
+
+    def _fetch_and_parse(self, fetchers, jobs: list) -> list:
+        # jobs: [(url, tag, parse_doc kwargs)] -> [(tag, parsed)], parsed None if the
+        # fetch failed. Bodies are parsed in batches as they arrive.
+        done = []
+        parse_futures = []
+        batch = []
+
+        def fetch(url, retailer):
+            if self.scraper.stop_flag:
+                return ""
+            return self.scraper._get_html(url, retailer=retailer)
+
+        def flush():
+            parse_futures.append((self.pool.submit([(html, kw) for html, _, kw in batch]),
+                                  [tag for _, tag, _ in batch]))
+
+        fetch_futures = {submit(fetchers, fetch, url, kw["retailer"]): (tag, kw)
+                         for url, tag, kw in jobs}
+        for f in as_completed(fetch_futures):
+            tag, kwargs = fetch_futures[f]
+            html = f.result()
+            if not html:
+                done.append((tag, None))
+                continue
+            batch.append((html, tag, kwargs))
+            if len(batch) >= self.batch_size:
+                flush()
+                batch = []
+        if batch:
+            flush()
+
+        for pf, tags in parse_futures:
+            done.extend(zip(tags, pf.result()))
+        return done
@@ -0,0 +1,331 @@
+# Per-retailer extraction profiles, compiled once into regex matchers
+#
+# A profile is declared in config.RETAILERS[name]["profile"]:
+#
+#   "profile": {
+#       "links": r'...',            # optional regex whose group 1 is a product href
+#       "scope": r'...',            # optional regex; link search starts at its first match
+#       "title": ["og_title", "title_tag"],     # strategies tried in order
+#       "title_strip": r"\s*[–|]\s*Shop.*$",    # removed from extracted titles
+#       "price": ["og_price", "json_ld", {"regex": r'data-price="([\d.]+)"'}],
+#       "pagination": {"param": "page", "pages": 2},
+#       "canonical": {"drop_query": True, "rewrite": [[r"^/collections/[^/]+", ""]]},
+#       "cards": {                  # product cards on search/listing pages
+#           "start": r'class="product-card"',   # marks the start of each card
+#           "title": ["card_title", "img_alt"],
+#           "price": ["currency_symbol"],
+#       },
+#   }
+#
+# Strategies are names from TITLE_STRATEGIES / PRICE_STRATEGIES or {"regex": ...}
+# with the value in group 1. Anything omitted falls back to DEFAULT_PROFILE.
+
+
+import html as html_parser
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit, urlencode, parse_qsl
+
+
+DEFAULT_PROFILE = {
+    "links": None,
+    "scope": None,
+    "title": ["title_tag", "og_title"],
+    "title_strip": None,
+    "price": ["json_ld", "og_price", "currency_symbol"],
+    "pagination": {"param": "page", "pages": 1},
+    "canonical": {"drop_query": False, "rewrite": []},
+    "cards": None,
+}
+
+# Cards never span more than this many characters past their start marker
+CARD_MAX_CHARS = 6000
+
+HREF_RE = re.compile(r'href=["\']([^"\']+)["\']', re.I)
+TITLE_TAG_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+OG_TITLE_RE = re.compile(r'property=["\']og:title["\']\s+content=["\']([^"\']+)["\']', re.I)
+H1_RE = re.compile(r"<h1[^>]*>(.*?)</h1>", re.I | re.S)
+TAG_RE = re.compile(r"<.*?>", re.S)
+SPACE_RE = re.compile(r"\s+")
+JSON_LD_RE = re.compile(
+    r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.I | re.S
+)
+LD_PRICE_RE = re.compile(r'"price"\s*:\s*"?(?P<p>[\d,.]+)"?', re.I)
+LD_CURRENCY_RE = re.compile(r'"priceCurrency"\s*:\s*"([A-Z]{3})"')
+OG_PRICE_RE = re.compile(r'(?:product|og):price:amount["\']\s+content=["\']([\d,.]+)["\']', re.I)
+SYMBOL_PRICE_RE = re.compile(r"(₱|PHP)\s*([\d,]+(?:\.\d+)?)", re.I)
+CARD_TITLE_RE = re.compile(
+    r'class=["\'][^"\']*(?:title|heading|name)[^"\']*["\'][^>]*>(.*?)</(?:div|h\d|a|span|p)>', re.I | re.S
+)
+IMG_ALT_RE = re.compile(r'<img[^>]+alt=["\']([^"\']+)["\']', re.I)
+# og:/product: meta tags; starts with a literal so whole-page scans stay cheap
+PRICE_META_RE = re.compile(r"<meta\b[^>]*(?:og:|price)[^>]*>", re.I)
+
+
+def _clean_text(raw: str) -> str:
+    # Strip tags, collapse whitespace and decode HTML entities
+    return html_parser.unescape(SPACE_RE.sub(" ", TAG_RE.sub(" ", raw)).strip())
+
+
+def _to_float(raw: str):
+    try:
+        return float(raw.replace(",", ""))
+    except ValueError:
+        return None
+
+
+# TITLE STRATEGIES: html -> str or ""
+
+def _title_tag(html: str) -> str:
+    m = TITLE_TAG_RE.search(html)
+    return _clean_text(m.group(1)) if m else ""
+
+
+def _og_title(html: str) -> str:
+    m = OG_TITLE_RE.search(html)
+    return html_parser.unescape(m.group(1).strip()) if m else ""
+
+
+def _h1(html: str) -> str:
+    m = H1_RE.search(html)
+    return _clean_text(m.group(1)) if m else ""
+
+
+def _card_title(html: str) -> str:
+    # First element whose class mentions title/heading/name (listing cards)
+    for m in CARD_TITLE_RE.finditer(html):
+        text = _clean_text(m.group(1))
+        if text:
+            return text
+    return ""
+
+
+def _img_alt(html: str) -> str:
+    m = IMG_ALT_RE.search(html)
+    return html_parser.unescape(m.group(1).strip()) if m else ""
+
+
+TITLE_STRATEGIES = {
+    "title_tag": _title_tag,
+    "og_title": _og_title,
+    "h1": _h1,
+    "card_title": _card_title,
+    "img_alt": _img_alt,
+}
+
+
+# PRICE STRATEGIES: html -> (price, currency) or (None, None)
+
+def _json_ld(html: str) -> tuple:
+    for block in JSON_LD_RE.findall(html):
+        m = LD_PRICE_RE.search(block)
+        if m:
+            price = _to_float(m.group("p"))
+            if price is not None:
+                c = LD_CURRENCY_RE.search(block)
+                return price, c.group(1) if c else "PHP"
+    return None, None
+
+
+def _og_price(html: str) -> tuple:
+    m = OG_PRICE_RE.search(html)
+    price = _to_float(m.group(1)) if m else None
+    return (price, "PHP") if price is not None else (None, None)
+
+
+def _currency_symbol(html: str) -> tuple:
+    m = SYMBOL_PRICE_RE.search(html)
+    price = _to_float(m.group(2)) if m else None
+    return (price, "PHP") if price is not None else (None, None)
+
+
+PRICE_STRATEGIES = {
+    "json_ld": _json_ld,
+    "og_price": _og_price,
+    "currency_symbol": _currency_symbol,
+}
+
+
+def _regex_title(pattern: str):
+    rx = re.compile(pattern, re.I | re.S)
+
+    def extract(html: str) -> str:
+        m = rx.search(html)
+        return _clean_text(m.group(1)) if m else ""
+    return extract
+
+
+def _regex_price(pattern: str):
+    rx = re.compile(pattern, re.I | re.S)
+
+    def extract(html: str) -> tuple:
+        m = rx.search(html)
+        price = _to_float(m.group(1)) if m else None
+        return (price, "PHP") if price is not None else (None, None)
+    extract.regex = rx
+    return extract
+
+
+def _compile_strategies(specs: list, registry: dict, regex_factory) -> list:
+    out = []
+    for spec in specs:
+        if isinstance(spec, dict):
+            out.append(regex_factory(spec["regex"]))
+        elif spec in registry:
+            out.append(registry[spec])
+        else:
+            raise ValueError(f"Unknown extraction strategy: {spec!r}")
+    return out
+
+
+class RetailerProfile:
+    # Compiled extraction profile for one retailer
+
+    def __init__(self, cfg: dict):
+        spec = {**DEFAULT_PROFILE, **cfg.get("profile", {})}
+        self.base = cfg["base"]
+        self.search = cfg["search"]
+        self.product_re = re.compile(cfg["product_hint"], re.I)
+        self.links_re = re.compile(spec["links"], re.I | re.S) if spec["links"] else HREF_RE
+        self.scope_re = re.compile(spec["scope"], re.I) if spec["scope"] else None
+        self.title_strip_re = re.compile(spec["title_strip"], re.I) if spec["title_strip"] else None
+        self.title_fns = _compile_strategies(spec["title"], TITLE_STRATEGIES, _regex_title)
+        self.price_fns = _compile_strategies(spec["price"], PRICE_STRATEGIES, _regex_price)
+        self.page_param = spec["pagination"].get("param", "page")
+        self.pages = max(1, spec["pagination"].get("pages", 1))
+        canonical = spec["canonical"]
+        self.drop_query = canonical.get("drop_query", False)
+        self.rewrites = [(re.compile(p), r) for p, r in canonical.get("rewrite", [])]
+        cards = spec["cards"]
+        self.has_cards = bool(cards)
+        if cards:
+            self.card_start_re = re.compile(cards["start"], re.I)
+            self.card_title_fns = _compile_strategies(
+                cards.get("title", ["card_title", "img_alt"]), TITLE_STRATEGIES, _regex_title
+            )
+            self.card_price_fns = _compile_strategies(
+                cards.get("price", ["currency_symbol"]), PRICE_STRATEGIES, _regex_price
+            )
+
+    def search_urls(self, q: str) -> list:
+        # Search page URLs, first page first
+        first = self.search.format(q=q)
+        if self.pages == 1:
+            return [first]
+        parts = urlsplit(first)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        urls = [first]
+        for page in range(2, self.pages + 1):
+            paged = urlencode(query + [(self.page_param, str(page))])
+            urls.append(urlunsplit(parts._replace(query=paged)))
+        return urls
+
+    def canonicalize(self, url: str) -> str:
+        # Normalise a product URL so variants/collection paths dedupe
+        parts = urlsplit(url)
+        path = parts.path
+        for rx, repl in self.rewrites:
+            path = rx.sub(repl, path)
+        query = "" if self.drop_query else parts.query
+        return urlunsplit((parts.scheme, parts.netloc, path, query, ""))
+
+    def _scoped(self, html: str) -> str:
+        if self.scope_re:
+            m = self.scope_re.search(html)
+            if m:
+                return html[m.start():]
+        return html
+
+    def _product_urls(self, html: str):
+        # Canonical product URLs in page order (may repeat)
+        for h in self.links_re.findall(html):
+            h = h.strip()
+            if not h or h[0] == "#" or h.startswith(("javascript:", "mailto:")):
+                continue
+            url = self.canonicalize(urljoin(self.base, h))
+            if self.product_re.search(url):
+                yield url
+
+    def extract_links(self, html: str) -> list:
+        # Canonical, de-duplicated product URLs in page order
+        seen = set()
+        out = []
+        for url in self._product_urls(self._scoped(html)):
+            if url not in seen:
+                seen.add(url)
+                out.append(url)
+        return out
+
+    def extract_cards(self, html: str) -> list:
+        # Product cards on a listing page -> [{"link", "title", "price", "cur"}].
+        # Title/price are ""/None when the card doesn't show them.
+        if not self.has_cards:
+            return []
+        html = self._scoped(html)
+        starts = [m.start() for m in self.card_start_re.finditer(html)]
+        if not starts:
+            return []
+        starts.append(len(html))
+
+        cards = []
+        seen = set()
+        begin = starts[0]
+        for nxt in starts[1:]:
+            fragment = html[begin:min(nxt, begin + CARD_MAX_CHARS)]
+            link = next(self._product_urls(fragment), None)
+            if link is None and nxt - begin < CARD_MAX_CHARS:
+                # Wrapper element without its own link: its card continues
+                # into the nested marker that follows
+                continue
+            begin = nxt
+            if link is None or link in seen:
+                continue
+            seen.add(link)
+            price, cur = self._first_price(self.card_price_fns, fragment)
+            cards.append({
+                "link": link,
+                "title": self._first_title(self.card_title_fns, fragment),
+                "price": price,
+                "cur": cur,
+            })
+        return cards
+
+    def _first_title(self, fns: list, html: str) -> str:
+        for fn in fns:
+            title = fn(html)
+            if title:
+                if self.title_strip_re:
+                    title = self.title_strip_re.sub("", title).strip()
+                return title
+        return ""
+
+    def _first_price(self, fns: list, html: str) -> tuple:
+        for fn in fns:
+            price, cur = fn(html)
+            if price is not None:
+                return price, cur
+        return None, None
+
+    def extract_title(self, html: str) -> str:
+        return self._first_title(self.title_fns, html)
+
+    def price_region(self, html: str) -> str:
+        # The parts of a product page that title/price extraction reads:
+        # JSON-LD, og:/price meta tags and any custom price regex matches.
+        # Pages without them fall back to the <title> and currency amounts.
+        # Hashing this instead of the whole page ignores session tokens, ads, etc.
+        parts = JSON_LD_RE.findall(html) + PRICE_META_RE.findall(html)
+        for fn in self.price_fns:
+            rx = getattr(fn, "regex", None)
+            if rx is not None:
+                parts += [m.group(0) for m in rx.finditer(html)]
+        if not parts:
+            parts = TITLE_TAG_RE.findall(html) + ["".join(m) for m in SYMBOL_PRICE_RE.findall(html)]
+        return "\n".join(parts)
+
+    def extract_price(self, html: str) -> tuple:
+        return self._first_price(self.price_fns, html)
+
+
+def compile_profiles(retailers: dict) -> dict:
+    # Compile every retailer's profile (done once per Scraper)
+    return {name: RetailerProfile(cfg) for name, cfg in retailers.items()}
@@ -0,0 +1,114 @@
+# Query canonicalization for cache keys
+#
+# "2x4 lumber", "Lumber  2x4" and "lumber, 2x4" are the same search, so they
+# should share one cache entry. A query is reduced to canonical tokens:
+#   - lowercase, punctuation dropped (core.filters.normalize_words), but
+#     fractions and decimals such as 1/2 or 2.5 kept whole
+#   - inch/foot marks and unit spellings from QUERY_UNITS unified, and a
+#     number joined to its unit: "12 mm", "12mm" and "12 millimeters" -> "12mm"
+#   - words and phrases from QUERY_SYNONYMS replaced by their canonical form
+#   - duplicates removed and tokens sorted
+#
+# Only cache keys are canonical; retailers are still searched with the
+# keyword as typed. A query whose tokens include every token of a cached
+# query is narrower ("marine plywood 1/2" vs. "plywood") and can be answered
+# by filtering the broader query's results (narrow_results). search_cache()
+# builds a utils.cache.SearchCache that uses both.
+
+
+import re
+from collections import Counter
+from functools import lru_cache
+
+from config import (
+    MAX_PRODUCTS_PER_RETAILER,
+    QUERY_SUBSUME_MIN_RELEVANCE,
+    QUERY_SUBSUME_MIN_RESULTS,
+    QUERY_SYNONYMS,
+    QUERY_UNITS,
+)
+from core.filters import normalize_words, relevance_score, should_filter_out
+from utils.cache import SearchCache, subsumes
+
+
+_NUMBER = r"\d+(?:[./]\d+)*"
+_COMPOUND_NUMBER = re.compile(r"(\d+(?:[./]\d+)+)")  # split() keeps the separators
+_NUMBER_UNIT = re.compile(rf"({_NUMBER})([a-z]+)")
+_INCH_MARK = re.compile(r'(?<=\d)\s*(?:"|\'\'|”|″)')
+_FOOT_MARK = re.compile(r"(?<=\d)\s*(?:'|’|′)")
+_SYNONYMS = re.compile(
+    r"(?<!\S)(" + "|".join(re.escape(p) for p in sorted(QUERY_SYNONYMS, key=len, reverse=True)) + r")(?!\S)"
+) if QUERY_SYNONYMS else None
+
+
+def query_words(keyword: str) -> list[str]:
+    # Words in typed order, with compound numbers (1/2, 2.5) kept whole
+    text = _FOOT_MARK.sub(" ft ", _INCH_MARK.sub(" in ", keyword.lower()))
+    words = []
+    for i, part in enumerate(_COMPOUND_NUMBER.split(text)):
+        words += [part] if i % 2 else normalize_words(part)
+    return words
+
+
+def _join_units(words: list[str]) -> list[str]:
+    # "12", "millimeters" -> "12mm"; "12millimeter" -> "12mm"; "inch" -> "in"
+    out = []
+    for word in words:
+        unit = QUERY_UNITS.get(word)
+        if unit and out and re.fullmatch(_NUMBER, out[-1]):
+            out[-1] += unit
+            continue
+        m = _NUMBER_UNIT.fullmatch(word)
+        if m and m.group(2) in QUERY_UNITS:
+            word = m.group(1) + QUERY_UNITS[m.group(2)]
+        out.append(unit or word)
+    return out
+
+
+def canonical_tokens(keyword: str) -> tuple:
+    # Sorted, de-duplicated canonical tokens of a query
+    text = " ".join(_join_units(query_words(keyword)))
+    if _SYNONYMS is not None:
+        text = _SYNONYMS.sub(lambda m: QUERY_SYNONYMS[m.group(1)], text)
+    return tuple(sorted(set(text.split())))
+
+
+@lru_cache(maxsize=4096)
+def canonical_query(keyword: str) -> str:
+    # Cache key form of a query: "Lumber  2x4" -> "2x4 lumber". Memoized:
+    # every cache lookup canonicalizes, and the same queries come back often
+    return " ".join(canonical_tokens(keyword))
+
+
+def truncated(results: list, limit: int = MAX_PRODUCTS_PER_RETAILER) -> bool:
+    # True if some store's results were cut off at the per-retailer limit
+    per_store = Counter(r.get("store") for r in results)
+    return any(n >= limit for n in per_store.values())
+
+
+def narrow_results(keyword: str, intent: str, results: list,
+                   min_relevance: float = QUERY_SUBSUME_MIN_RELEVANCE,
+                   min_results: int = QUERY_SUBSUME_MIN_RESULTS):
+    # Results of a broader query that also answer `keyword`, re-scored for it.
+    # Titles are matched in canonical form (so "12 mm" in a title matches a
+    # "12mm" query). None if nothing matches, or if the broader search was
+    # cut off at MAX_PRODUCTS_PER_RETAILER and fewer than min_results match:
+    # the products this query wants may be past the cut.
+    canonical = canonical_query(keyword)
+    out = []
+    for r in results:
+        title = r["title"]
+        if should_filter_out(intent, keyword, title):
+            continue
+        if relevance_score(canonical, canonical_query(title)) < min_relevance:
+            continue
+        out.append({**r, "rel": relevance_score(keyword, title)})
+    if not out or (len(out) < min_results and truncated(results)):
+        return None
+    return out
+
+
+def search_cache(**kwargs) -> SearchCache:
+    # SearchCache keyed by canonical query, answering narrower queries from
+    # broader ones (kwargs: ttl_sec, subsume)
+    return SearchCache(canonical=canonical_query, narrow=narrow_results, **kwargs)
@@ -0,0 +1,232 @@
+# Bulk quotes: price a whole bill of materials (BOM) at once
+#
+# A BOM is a CSV with a header row (keyword, qty and optionally intent) or a
+# JSON list of {"keyword": ..., "qty": ...} objects. Every line is searched
+# concurrently through one shared SearchCache; repeated keywords are searched
+# once. Lines are reported as they finish so callers can stream progress.
+# Lines not searched because the quote was cancelled are reported as skipped,
+# not as unpriced.
+
+
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from config import QUOTE_WORKERS, QUOTE_MIN_RELEVANCE, QUOTE_RELEVANCE_SLACK
+from core.filters import infer_intent, relevance_score
+from core.query import search_cache
+from core.scheduler import fetch_priority, submit
+from utils.cache import SearchCache
+from utils.helpers import pick_best_price
+
+
+INTENTS = ("materials", "electronics")
+
+
+def _parse_line(n: int, raw: dict) -> dict:
+    keyword = str(raw.get("keyword") or "").strip()
+    if not keyword:
+        raise ValueError(f"BOM line {n}: keyword is missing")
+    qty = raw.get("qty")
+    try:
+        qty = float(qty) if qty not in (None, "") else 1.0
+    except (TypeError, ValueError):
+        raise ValueError(f"BOM line {n}: qty {qty!r} is not a number")
+    if qty <= 0:
+        raise ValueError(f"BOM line {n}: qty must be positive")
+    intent = str(raw.get("intent") or "").strip().lower() or infer_intent(keyword)
+    if intent not in INTENTS:
+        raise ValueError(f"BOM line {n}: intent must be one of {', '.join(INTENTS)}")
+    return {"line": n, "keyword": keyword, "qty": qty, "intent": intent}
+
+
+def load_bom(path) -> list:
+    # BOM file -> [{"line", "keyword", "qty", "intent"}]
+    path = Path(path)
+    text = path.read_text(encoding="utf-8-sig")
+    if path.suffix.lower() == ".json":
+        data = json.loads(text)
+        rows = data.get("items", []) if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("BOM JSON must be a list of line items")
+        rows = list(enumerate(rows, 1))
+    else:
+        reader = csv.DictReader(text.splitlines())
+        if not reader.fieldnames or "keyword" not in [f.strip().lower() for f in reader.fieldnames]:
+            raise ValueError("BOM CSV needs a header row with a 'keyword' column")
+        # Line numbers as shown in a spreadsheet; the reader skips empty lines
+        rows = [
+            (reader.line_num, {(k or "").strip().lower(): v for k, v in row.items()})
+            for row in reader
+        ]
+
+    lines = []
+    for n, raw in rows:
+        if not isinstance(raw, dict):
+            raise ValueError(f"BOM line {n}: expected an object")
+        if not any(str(v or "").strip() for v in raw.values()):
+            continue  # blank row
+        lines.append(_parse_line(n, raw))
+    return lines
+
+
+def best_match(keyword: str, results: list):
+    # Cheapest result among the most relevant priced ones (None if nothing fits)
+    scored = [
+        (relevance_score(keyword, r["title"]), r)
+        for r in results if isinstance(r["price"], (int, float))
+    ]
+    scored = [(rel, r) for rel, r in scored if rel >= QUOTE_MIN_RELEVANCE]
+    if not scored:
+        return None
+    top = max(rel for rel, _ in scored)
+    return pick_best_price([r for rel, r in scored if rel >= top - QUOTE_RELEVANCE_SLACK])
+
+
+def price_line(line: dict, results: list) -> dict:
+    # Priced BOM line: overall best match plus the best match at each store.
+    # The overall match applies the relevance slack across all stores, so a
+    # cheap accessory at one store doesn't beat the real product at another.
+    by_store = {}
+    for r in results:
+        by_store.setdefault(r["store"], []).append(r)
+    store_matches = {}
+    for store, store_results in by_store.items():
+        m = best_match(line["keyword"], store_results)
+        if m:
+            store_matches[store] = m
+    match = best_match(line["keyword"], results)
+    return {
+        **line,
+        "match": match,
+        "subtotal": match["price"] * line["qty"] if match else None,
+        "stores": store_matches,
+    }
+
+
+def skipped_line(line: dict) -> dict:
+    # BOM line that was never searched (quote cancelled)
+    return {**line, "match": None, "subtotal": None, "stores": {}, "skipped": True}
+
+
+def summarize(priced: list) -> dict:
+    # Totals per retailer and for the cheapest split across retailers
+    priced = sorted(priced, key=lambda p: p["line"])
+    stores = sorted({s for p in priced for s in p["stores"]})
+    retailers = {}
+    for store in stores:
+        covered = [p for p in priced if store in p["stores"]]
+        retailers[store] = {
+            "total": sum(p["stores"][store]["price"] * p["qty"] for p in covered),
+            "lines": len(covered),
+            "missing": [p["line"] for p in priced if store not in p["stores"]],
+        }
+
+    split = {}
+    for p in priced:
+        if p["match"]:
+            split[p["match"]["store"]] = split.get(p["match"]["store"], 0.0) + p["subtotal"]
+    return {
+        "lines": priced,
+        "retailers": retailers,
+        "split": {"total": sum(split.values()), "by_store": split},
+        "unpriced": [p["line"] for p in priced if not p["match"] and not p.get("skipped")],
+        "skipped": [p["line"] for p in priced if p.get("skipped")],
+    }
+
+
+class QuoteEngine:
+    # Prices BOM lines concurrently with any searcher exposing search_parallel
+
+    def __init__(self, searcher, cache: SearchCache = None, workers: int = QUOTE_WORKERS,
+                 logger=None):
+        self.searcher = searcher
+        self.cache = cache if cache is not None else search_cache()
+        self.workers = workers
+        self.logger = logger
+        self.cancelled = False
+
+    def log(self, message):
+        if self.logger:
+            self.logger(message)
+
+    def cancel(self):
+        # Lines not yet started are skipped; running searches finish
+        self.cancelled = True
+
+    def _search(self, keyword: str, intent: str):
+        # Results for one keyword; None if the quote was cancelled before it started
+        if self.cancelled:
+            return None
+        cached = self.cache.get(keyword, intent)
+        if cached is not None:
+            return cached
+        results = self.searcher.search_parallel(keyword, intent)
+        if results:
+            self.cache.set(keyword, intent, results)
+        return results
+
+    def run(self, lines: list, on_line=None) -> dict:
+        # Price every line; on_line(priced_line, done, total) is called as each finishes
+        groups = {}
+        for line in lines:
+            groups.setdefault((self.cache.canonical(line["keyword"]), line["intent"]), []).append(line)
+
+        priced = []
+        done = 0
+        # A BOM is batch traffic: interactive searches go first
+        with fetch_priority("bulk"), ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                submit(executor, self._search, group[0]["keyword"], group[0]["intent"]): group
+                for group in groups.values()
+            }
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    self.log(f"❌ {futures[future][0]['keyword']}: {e}")
+                    results = []
+                for line in futures[future]:
+                    p = skipped_line(line) if results is None else price_line(line, results)
+                    priced.append(p)
+                    done += 1
+                    if on_line:
+                        on_line(p, done, len(lines))
+        return summarize(priced)
+
+
+def write_quote_csv(quote: dict, path):
+    # One row per BOM line with the chosen product, then the totals
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["line", "keyword", "qty", "title", "store", "unit_price", "subtotal", "link"])
+        for p in quote["lines"]:
+            m = p["match"] or {}
+            w.writerow([
+                p["line"], p["keyword"], f"{p['qty']:g}", m.get("title", ""), m.get("store", ""),
+                f"{m['price']:.2f}" if m else "", f"{p['subtotal']:.2f}" if m else "", m.get("link", ""),
+            ])
+        w.writerow([])
+        for store, r in quote["retailers"].items():
+            w.writerow(["", f"{store} total", "", "", store, "", f"{r['total']:.2f}",
+                        f"{len(r['missing'])} line(s) missing"])
+        w.writerow(["", "cheapest split", "", "", "", "", f"{quote['split']['total']:.2f}", ""])
+
+
+def format_quote(quote: dict) -> str:
+    # Plain-text totals for the quote panel / terminal
+    lines = []
+    for store, r in quote["retailers"].items():
+        missing = f" ({len(r['missing'])} line(s) not found)" if r["missing"] else " (all lines)"
+        lines.append(f"{store}: PHP {r['total']:,.2f}{missing}")
+    lines.append(f"Cheapest split: PHP {quote['split']['total']:,.2f}")
+    for store, subtotal in quote["split"]["by_store"].items():
+        lines.append(f"  - {store}: PHP {subtotal:,.2f}")
+    if quote["unpriced"]:
+        lines.append(f"Unpriced lines: {', '.join(str(n) for n in quote['unpriced'])}")
+    if quote["skipped"]:
+        lines.append(f"Skipped lines (cancelled): {', '.join(str(n) for n in quote['skipped'])}")
+    return "\n".join(lines)
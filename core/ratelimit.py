@@ -0,0 +1,65 @@
+# Per-host request spacing shared by worker processes
+
+
+import sqlite3
+import threading
+import time
+
+from config import REQUEST_DELAY_SEC
+
+
+class SharedRateLimiter:
+    # Keeps at least `interval` seconds between request starts to the same
+    # host. Slots live in a SQLite file, so every worker process using the
+    # same file (see core.workqueue) shares one budget per host. Slots use
+    # wall-clock time, which all processes on a machine agree on. Priority is
+    # not decided here: each process's RequestScheduler (core.scheduler)
+    # orders its own fetches and hands them over as `shared`.
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS rate_slots (host TEXT PRIMARY KEY, next_ts REAL NOT NULL)"
+
+    def __init__(self, path, interval: float = REQUEST_DELAY_SEC, intervals: dict = None):
+        # intervals: per-host overrides of the default spacing
+        self.path = str(path)
+        self.interval = interval
+        self.intervals = intervals or {}
+        self._local = threading.local()
+        self._db().execute(self.SCHEMA)
+
+    def _db(self):
+        # One long-lived connection per thread (reserve() runs before every
+        # request), in autocommit mode with explicit transactions
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def reserve(self, host: str) -> float:
+        interval = self.intervals.get(host, self.interval)
+        if interval <= 0:
+            return 0.0
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = db.execute("SELECT next_ts FROM rate_slots WHERE host = ?", (host,)).fetchone()
+            slot = max(now, row[0] if row else 0.0)
+            db.execute(
+                "INSERT INTO rate_slots (host, next_ts) VALUES (?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET next_ts = excluded.next_ts",
+                (host, slot + interval),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return slot - now
+
+    def wait(self, host: str) -> float:
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
@@ -0,0 +1,141 @@
+# Per-host latency tracking, adaptive timeouts and circuit breaking
+
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+from config import (
+    TIMEOUT_SEC,
+    TIMEOUT_MIN_SEC,
+    TIMEOUT_P95_MULTIPLIER,
+    LATENCY_WINDOW,
+    LATENCY_MIN_SAMPLES,
+    RETRY_BACKOFF_SEC,
+    RETRY_AFTER_MAX_SEC,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_COOLDOWN_SEC,
+)
+
+
+# Status codes worth retrying for idempotent GETs
+RETRYABLE_STATUS = {429, 503}
+
+
+class LatencyTracker:
+    # Rolling per-host latency window used to derive adaptive timeouts
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, host: str, seconds: float):
+        # Record a successful request latency for host
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def p95(self, host: str):
+        # 95th percentile latency for host, or None if too few samples
+        with self._lock:
+            samples = sorted(self._samples.get(host, ()))
+        if len(samples) < LATENCY_MIN_SAMPLES:
+            return None
+        idx = min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))
+        return samples[idx]
+
+    def timeout_for(self, host: str) -> float:
+        # Adaptive timeout: p95 x multiplier, clamped to [TIMEOUT_MIN_SEC, TIMEOUT_SEC]
+        p95 = self.p95(host)
+        if p95 is None:
+            return TIMEOUT_SEC
+        return max(TIMEOUT_MIN_SEC, min(TIMEOUT_SEC, p95 * TIMEOUT_P95_MULTIPLIER))
+
+
+class CircuitBreaker:
+    # Skips hosts that keep failing until a cool-down period has passed.
+    # After the cool-down the host is half-open: one caller gets through as a
+    # probe and the rest are still skipped until it reports. Success closes
+    # the circuit, failure re-opens it. A probe that never reports (stopped,
+    # or answered with a 404) is written off after another cool-down.
+
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 cooldown_sec: float = CIRCUIT_COOLDOWN_SEC):
+        self.threshold = threshold
+        self.cooldown_sec = cooldown_sec
+        self._failures = {}
+        self._opened_at = {}
+        self._probe_at = {}  # host -> when its half-open probe was let through
+        self._lock = threading.Lock()
+
+    def _skipping(self, host: str, now: float) -> bool:
+        # Cooling down, or a half-open probe is still out (lock held)
+        opened = self._opened_at.get(host)
+        if opened is None:
+            return False
+        if now - opened < self.cooldown_sec:
+            return True
+        probe = self._probe_at.get(host)
+        return probe is not None and now - probe < self.cooldown_sec
+
+    def allow(self, host: str) -> bool:
+        # True if requests to host may proceed (closed, or this caller is the probe)
+        with self._lock:
+            now = time.monotonic()
+            if self._skipping(host, now):
+                return False
+            if host in self._opened_at:
+                self._probe_at[host] = now
+            return True
+
+    def is_open(self, host: str) -> bool:
+        # True if host is currently being skipped
+        with self._lock:
+            return self._skipping(host, time.monotonic())
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._probe_at.pop(host, None)
+
+    def record_failure(self, host: str):
+        with self._lock:
+            if host in self._probe_at:
+                # Failed probe: straight back to open
+                del self._probe_at[host]
+                self._failures[host] = self.threshold
+                self._opened_at[host] = time.monotonic()
+                return
+            n = self._failures.get(host, 0) + 1
+            self._failures[host] = n
+            if n >= self.threshold:
+                self._opened_at[host] = time.monotonic()
+
+
+def retry_delay(attempt: int, retry_after=None) -> float:
+    # Seconds to wait before retry number `attempt` (0-based)
+    delay = parse_retry_after(retry_after)
+    if delay is not None:
+        return min(delay, RETRY_AFTER_MAX_SEC)
+    base = RETRY_BACKOFF_SEC * (2 ** attempt)
+    return base + random.uniform(0, base)
+
+
+def parse_retry_after(value):
+    # Parse a Retry-After header (seconds or HTTP date) into seconds
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, dt.timestamp() - time.time())
@@ -0,0 +1,152 @@
+# Priority-aware request scheduling under Scraper._fetch
+#
+# Every fetch asks for a slot on its host. A host has HOST_CONCURRENCY slots,
+# and slots start `interval` apart. Fetches waiting for a busy host are not
+# served first come, first served: they queue by priority class
+# (interactive > watchlist > bulk) and take the next free slot in that
+# order, so an interactive search overtakes every queued watchlist check and
+# sweep fetch (they keep their order within their class). This holds with
+# no interval too: the concurrency cap alone keeps a backlog queued here
+# rather than in the connection pool. Each host has its own queue: a backlog
+# on one retailer never delays requests to another.
+#
+# A budget shared with other processes (core.ratelimit.SharedRateLimiter,
+# used by crawl workers) is plugged in as `shared`: a fetch takes its turn
+# here, then its shared slot.
+#
+# The class comes from the calling context:
+#
+#     with fetch_priority("bulk"):
+#         scraper.search_parallel(keyword, intent)
+#
+# Work handed to a thread pool keeps it when submitted with submit().
+# Fetches nobody labelled count as interactive. Priority is strict: bulk
+# work waits for as long as interactive fetches keep a host busy, which for
+# people typing searches is never long.
+
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from config import HOST_CONCURRENCY, REQUEST_DELAY_SEC
+
+
+PRIORITIES = ("interactive", "watchlist", "bulk")
+
+_priority = contextvars.ContextVar("fetch_priority", default=PRIORITIES[0])
+
+
+@contextmanager
+def fetch_priority(name: str):
+    # Run fetches made in this block (and in threads started with submit()) at `name`
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r} (choose from {', '.join(PRIORITIES)})")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def submit(executor, fn, *args, **kwargs):
+    # executor.submit() that carries the caller's priority into the worker thread
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class _HostQueue:
+    def __init__(self, lock):
+        self.cond = threading.Condition(lock)
+        self.waiting = []   # heap of (priority rank, arrival number)
+        self.active = 0     # fetches holding a slot
+        self.next_ts = 0.0  # monotonic time the next slot may start
+
+
+class RequestScheduler:
+    # Per-host slots for Scraper._fetch, handed out by priority:
+    #
+    #     with scheduler.slot(host) as waited:
+    #         ...request...
+    #
+    # concurrency <= 0 means no cap; interval <= 0 no spacing.
+
+    def __init__(self, interval: float = REQUEST_DELAY_SEC, concurrency: int = HOST_CONCURRENCY,
+                 shared=None):
+        self.interval = interval
+        self.concurrency = concurrency
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._arrivals = itertools.count()
+
+    def rank(self) -> int:
+        # Queue position class of the calling fetch (lower goes first)
+        return PRIORITIES.index(current_priority())
+
+    @contextmanager
+    def slot(self, host: str):
+        # Hold one of host's slots for the block; yields the time waited
+        waited = self.acquire(host)
+        try:
+            if self.shared is not None:
+                waited += self.shared.wait(host)
+            yield waited
+        finally:
+            self.release(host)
+
+    def acquire(self, host: str) -> float:
+        # Block until this fetch's turn on host; returns the time waited.
+        # Every acquire() must be paired with a release().
+        entry = (self.rank(), next(self._arrivals))
+        start = time.monotonic()
+        with self._lock:
+            queue = self._hosts.get(host)
+            if queue is None:
+                queue = self._hosts[host] = _HostQueue(self._lock)
+            heapq.heappush(queue.waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    first = queue.waiting[0] == entry
+                    free = self.concurrency <= 0 or queue.active < self.concurrency
+                    if first and free and now >= queue.next_ts:
+                        queue.active += 1
+                        if self.interval > 0:
+                            # Space from this start: a fetch that waited for a
+                            # free slot must not start right after the last one
+                            queue.next_ts = max(queue.next_ts, now) + self.interval
+                        return now - start
+                    # The head sleeps until the slot's start time (or until a
+                    # slot is released), the rest until the head leaves (a
+                    # newly arrived higher-priority fetch becomes the head)
+                    queue.cond.wait(queue.next_ts - now if first and free else None)
+            finally:
+                # Leave the queue whether served or interrupted
+                if queue.waiting[0] == entry:
+                    heapq.heappop(queue.waiting)
+                else:
+                    queue.waiting.remove(entry)
+                    heapq.heapify(queue.waiting)
+                queue.cond.notify_all()
+
+    def release(self, host: str):
+        with self._lock:
+            queue = self._hosts[host]
+            queue.active -= 1
+            queue.cond.notify_all()
+
+    def queued(self) -> dict:
+        # {host: {priority: waiting fetches}} for hosts with a queue
+        with self._lock:
+            return {
+                host: {PRIORITIES[rank]: sum(1 for r, _ in q.waiting if r == rank)
+                       for rank in sorted({r for r, _ in q.waiting})}
+                for host, q in self._hosts.items() if q.waiting
+            }
@@ -2,31 +2,35 @@
 # Web scraping functionality
 
 
-import re
+import json
 import time
-import requests
-from urllib.parse import urljoin, urlparse, quote_plus
+from urllib.parse import urlparse, quote_plus
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from config import RETAILERS, REQUEST_DELAY_SEC, MAX_PRODUCTS_PER_RETAILER, TIMEOUT_SEC
-from core.filters import should_filter_out, relevance_score
+from config import RETAILERS, MAX_PRODUCTS_PER_RETAILER, MAX_RETRIES, MARKETPLACE_MAX_PAGES, MARKETPLACE_PAGE_SIZE
+from core import shopify, lazada, shopee
+from core.parsing import listing_cards, merge_cards, is_complete, make_result, product_result
+from core.profiles import compile_profiles
+from core.scheduler import RequestScheduler, submit
+from core.resilience import LatencyTracker, CircuitBreaker, RETRYABLE_STATUS, retry_delay
+from core.transport import make_transport
+from utils.metrics import METRICS
 
 
 class Scraper:
     # Web scraper for Philippine retailers
     
-    def __init__(self, logger=None):
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            ),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-        })
+    def __init__(self, logger=None, metrics=None, retailers=None, transport=None):
+        # transport: name from core.transport.TRANSPORTS or a transport instance
+        self.transport = make_transport(transport)
         self.logger = logger
         self.stop_flag = False
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker()
+        self.metrics = metrics or METRICS
+        self.retailers = retailers if retailers is not None else RETAILERS
+        self.rate_limiter = RequestScheduler()
+        self.profiles = compile_profiles(self.retailers)
     
     def log(self, message):
         # Log message if logger is available
@@ -43,12 +47,16 @@ class Scraper:
         all_results = []
         
         # Search all retailers in parallel
-        with ThreadPoolExecutor(max_workers=6) as executor:
+        with self.metrics.span("search"), ThreadPoolExecutor(max_workers=6) as executor:
             futures = {}
-            for name, cfg in RETAILERS.items():
+            for name, cfg in self.retailers.items():
                 if not cfg.get("enabled", True):
                     continue
-                future = executor.submit(self._search_retailer, name, cfg, q, keyword, intent)
+                if self.breaker.is_open(self._host(cfg["base"])):
+                    self.log(f"⏭️ {name}: Skipped (circuit open, retailer failing)")
+                    continue
+                # submit() keeps the caller's fetch priority (core.scheduler)
+                future = submit(executor, self._search_retailer, name, cfg, q, keyword, intent)
                 futures[future] = name
             
             for future in as_completed(futures):
@@ -67,153 +75,253 @@ class Scraper:
         # Search a single retailer (called in parallel)
         self.log(f"\n--- Checking {name} ---")
         
-        search_url = cfg["search"].format(q=q)
-        base = cfg["base"]
-        hint_re = re.compile(cfg["product_hint"], re.I)
-        
-        html = self._get_html(search_url)
-        if not html:
-            self.log(f"❌ {name}: Failed to get search page")
+        # Structured endpoints first, HTML scraping as the fallback
+        results = self._search_adapter(name, cfg, q, keyword, intent)
+        if results is None:
+            results = self._search_html(name, cfg, q, keyword, intent)
+            self.log(f"✅ {name}: Added {len(results)} products")
+        self.metrics.incr("products", len(results), retailer=name)
+        return results
+    
+    def _search_adapter(self, name: str, cfg: dict, q: str, keyword: str, intent: str):
+        # Results from the retailer's JSON adapter; None when HTML should be scraped instead
+        adapter = cfg.get("adapter")
+        if not adapter:
+            return None
+        results = getattr(self, f"_search_{adapter}")(name, cfg, q, keyword, intent)
+        if results is not None:
+            self.log(f"✅ {name}: Added {len(results)} products ({adapter})")
+            return results
+        if not cfg.get("html_fallback", True):
+            self.log(f"❌ {name}: {adapter} endpoint unavailable")
             return []
+        self.log(f"  {name}: {adapter} endpoint unavailable, falling back to HTML")
+        return None
+    
+    def _search_shopify(self, name: str, cfg: dict, q: str, keyword: str, intent: str):
+        # Shopify predictive search JSON; None if the endpoint isn't usable
+        profile = self.profiles[name]
+        data = self._get_json(
+            shopify.suggest_url(cfg["base"], q, MAX_PRODUCTS_PER_RETAILER), retailer=name
+        )
+        if data is None:
+            return None
         
-        self.log(f"✓ {name}: Got search page ({len(html)} chars)")
-        
-        links = self._extract_links(html, base)
-        product_links = [u for u in links if hint_re.search(u)]
-        product_links = self._unique(product_links)[:MAX_PRODUCTS_PER_RETAILER]
-        
-        self.log(f"  Found {len(product_links)} product links")
+        with self.metrics.span("parse_json", name):
+            items = shopify.parse_suggest(data, cfg["base"])
+        if items is None:
+            return None
+        self.log(f"✓ {name}: Got {len(items)} products from suggest.json")
         
         results = []
-        seen = set()
-        
-        for link in product_links:
-            if self.stop_flag or link in seen:
-                continue
-            seen.add(link)
-            
-            p_html = self._get_html(link)
-            if not p_html:
-                continue
+        for item in items[:MAX_PRODUCTS_PER_RETAILER]:
+            if self.stop_flag:
+                break
+            link = profile.canonicalize(item["link"])
+            title, price = item["title"], item["price"]
             
-            title = self._extract_title(p_html) or f"{keyword} ({name})"
+            if not title or price is None:
+                # Incomplete suggestion: one small product JSON instead of the page
+                p_data = self._get_json(shopify.product_js_url(link), retailer=name)
+                if p_data is not None:
+                    with self.metrics.span("parse_json", name):
+                        p_title, p_price = shopify.parse_product_js(p_data)
+                    title = title or p_title
+                    price = price if price is not None else p_price
             
-            if should_filter_out(intent, keyword, title):
-                continue
+            result = self._make_result(name, cfg, keyword, intent, title, price, "PHP", link)
+            if result:
+                results.append(result)
+        return results
+    
+    def _search_lazada(self, name: str, cfg: dict, q: str, keyword: str, intent: str):
+        # Lazada catalog JSON; None if the endpoint isn't usable
+        return self._search_json_pages(
+            name, cfg, keyword, intent,
+            lambda page: lazada.search_url(cfg["base"], q, page),
+            lazada.parse_search, lazada.request_headers(cfg["base"]),
+        )
+    
+    def _search_shopee(self, name: str, cfg: dict, q: str, keyword: str, intent: str):
+        # Shopee search API; None if the endpoint isn't usable
+        return self._search_json_pages(
+            name, cfg, keyword, intent,
+            lambda page: shopee.search_url(cfg["base"], q, page, MARKETPLACE_PAGE_SIZE),
+            shopee.parse_search, shopee.request_headers(cfg["base"]),
+        )
+    
+    def _search_json_pages(self, name: str, cfg: dict, keyword: str, intent: str,
+                           page_url, parse, headers: dict):
+        # Marketplace listings carry title, price and link, so no product pages
+        # are fetched. Listings mix in accessories and ads, so pages are read
+        # until enough results survive the filters (or MARKETPLACE_MAX_PAGES).
+        profile = self.profiles[name]
+        results = []
+        seen = set()
+        for page in range(1, MARKETPLACE_MAX_PAGES + 1):
+            if self.stop_flag:
+                break
+            data = self._get_json(page_url(page), retailer=name, headers=headers)
+            items, more = None, False
+            if data is not None:
+                with self.metrics.span("parse_json", name):
+                    items, more = parse(data, cfg["base"])
+            if items is None:
+                if page == 1:
+                    return None
+                break
+            self.log(f"✓ {name}: Got {len(items)} products from page {page}")
             
-            price, cur = self._extract_price(p_html)
-            rec = cfg["trusted_score"] >= 85
-            store = self._domain_name(link)
-            rel = relevance_score(keyword, title)
+            for item in items:
+                link = profile.canonicalize(item["link"])
+                if link in seen or not item["title"]:
+                    continue
+                seen.add(link)
+                result = self._make_result(
+                    name, cfg, keyword, intent, item["title"], item["price"], "PHP", link
+                )
+                if result:
+                    results.append(result)
+            if len(results) >= MAX_PRODUCTS_PER_RETAILER or not more:
+                break
+        return results[:MAX_PRODUCTS_PER_RETAILER]
+    
+    def _search_html(self, name: str, cfg: dict, q: str, keyword: str, intent: str) -> list:
+        # Read product cards (title/price/link) off the search page(s); product
+        # pages are fetched only for cards that don't show both title and price
+        profile = self.profiles[name]
+        
+        cards = []
+        for page, search_url in enumerate(profile.search_urls(q), 1):
+            html = self._get_html(search_url, retailer=name)
+            if not html:
+                if page == 1:
+                    self.log(f"❌ {name}: Failed to get search page")
+                    return []
+                break
             
-            results.append({
-                "title": title[:140],
-                "store": store,
-                "rec": rec,
-                "price": price,
-                "price_disp": f"{price:,.2f}" if isinstance(price, (int, float)) else "—",
-                "cur": cur or "—",
-                "rel": rel,
-                "link": link
-            })
+            self.log(f"✓ {name}: Got search page {page} ({len(html)} chars)")
+            cards = merge_cards(cards, listing_cards(profile, html, name, self.metrics))
+            if len(cards) >= MAX_PRODUCTS_PER_RETAILER:
+                break
+        
+        complete = sum(1 for c in cards if is_complete(c))
+        self.log(f"  Found {len(cards)} products ({complete} complete on listing)")
+        self.metrics.incr("listing_complete", complete, retailer=name)
+        
+        results = []
+        host = self._host(cfg["base"])
+        for card in cards:
+            if self.stop_flag:
+                break
             
-            time.sleep(REQUEST_DELAY_SEC)
+            if is_complete(card):
+                result = self._make_result(
+                    name, cfg, keyword, intent, card["title"], card["price"], card["cur"], card["link"]
+                )
+            else:
+                if self.breaker.is_open(host):
+                    self.log(f"⏭️ {name}: Circuit opened, skipping remaining products")
+                    break
+                p_html = self._get_html(card["link"], retailer=name)
+                if not p_html:
+                    continue
+                result = product_result(name, cfg, profile, keyword, intent, card, p_html, self.metrics)
+            if result:
+                results.append(result)
         
-        self.log(f"✅ {name}: Added {len(results)} products")
         return results
     
-    def _get_html(self, url: str) -> str:
-        # Fetch HTML from URL
-        try:
-            r = self.session.get(url, timeout=TIMEOUT_SEC)
-            if r.status_code != 200:
-                return ""
-            return r.text
-        except Exception:
-            return ""
+    def _make_result(self, name: str, cfg: dict, keyword: str, intent: str,
+                     title: str, price, cur, link: str):
+        # Filter, score and build the standard result dict (None if filtered out)
+        return make_result(name, cfg, keyword, intent, title, price, cur, link, self.metrics)
     
-    def _extract_links(self, html: str, base: str) -> list:
-        # Extract all links from HTML
-        hrefs = re.findall(r'href=["\']([^"\']+)["\']', html, flags=re.I)
-        out = []
-        for h in hrefs:
-            h = h.strip()
-            if not h:
-                continue
-            if h.startswith("#") or h.startswith("javascript:") or h.startswith("mailto:"):
-                continue
-            out.append(urljoin(base, h))
-        return out
+    def _get_html(self, url: str, retailer: str = None) -> str:
+        # Fetch HTML from URL ("" on any failure)
+        return self._fetch(url, retailer)
     
-    def _unique(self, items: list) -> list:
-        # Remove duplicates while preserving order
-        seen = set()
-        out = []
-        for x in items:
-            if x not in seen:
-                seen.add(x)
-                out.append(x)
-        return out
-    
-    def _extract_title(self, html: str) -> str:
-        # Extract product title from HTML
-        # Try <title> tag
-        m = re.search(r"<title[^>]*>(.*?)</title>", html, flags=re.I | re.S)
-        if m:
-            t = re.sub(r"\s+", " ", re.sub(r"<.*?>", " ", m.group(1))).strip()
-            import html as html_parser
-            t = html_parser.unescape(t)  # Decode HTML entities
-            return t
+    def _get_json(self, url: str, retailer: str = None, headers: dict = None):
+        # Fetch and decode a JSON endpoint (None on any failure)
+        body = self._fetch(url, retailer, accept="application/json", headers=headers)
+        if not body:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+    
+    def _fetch(self, url: str, retailer: str = None, accept: str = None,
+               headers: dict = None) -> str:
+        # GET with adaptive timeout, retries and circuit breaking
+        host = self._host(url)
+        label = retailer or host
+        if not self.breaker.allow(host):
+            self.metrics.incr("circuit_skips", retailer=label)
+            return ""
+        if accept:
+            headers = {**(headers or {}), "Accept": accept}
         
-        # Try og:title
-        m = re.search(r'property=["\']og:title["\']\s+content=["\']([^"\']+)["\']', html, flags=re.I)
-        if m:
-            import html as html_parser
-            t = m.group(1).strip()
-            t = html_parser.unescape(t)  # Decode HTML entities
-            return t
+        for attempt in range(MAX_RETRIES + 1):
+            # The slot (core.scheduler) is held for the request itself, not
+            # for a retry's backoff
+            with self.rate_limiter.slot(host) as waited:
+                if waited:
+                    self.metrics.observe("rate_limit_wait", waited, label)
+                if self.stop_flag:
+                    return ""
+                start = time.monotonic()
+                self.metrics.incr("requests", retailer=label)
+                try:
+                    # The transport returns once headers arrive, so TTFB (which also
+                    # covers DNS/connect on a fresh connection) and body download
+                    # can be timed separately
+                    r = self.transport.get(url, headers=headers, timeout=self.latency.timeout_for(host))
+                    ttfb = time.monotonic() - start
+                    self.metrics.observe("http_ttfb", ttfb, label)
+                    with self.metrics.span("http_download", label):
+                        body = r.read()
+                except self.transport.errors:
+                    # Timeouts/connection errors are not retried: a slow host
+                    # would otherwise multiply its cost per product link
+                    self.metrics.incr("errors", retailer=label)
+                    self.breaker.record_failure(host)
+                    return ""
+            self.metrics.incr("bytes", len(body), retailer=label)
+            self.metrics.incr("wire_bytes", r.wire_bytes, retailer=label)
+            if r.connections:
+                self.metrics.incr("connections", r.connections, retailer=label)
+            if r.tls_handshakes:
+                self.metrics.incr("tls_handshakes", r.tls_handshakes, retailer=label)
+            if r.http_version == "HTTP/2":
+                self.metrics.incr("http2_requests", retailer=label)
+            
+            if r.status_code == 200:
+                self.latency.record(host, time.monotonic() - start)
+                self.breaker.record_success(host)
+                return r.text
+            
+            self.metrics.incr(f"http_{r.status_code}", retailer=label)
+            if r.status_code in RETRYABLE_STATUS and attempt < MAX_RETRIES:
+                delay = retry_delay(attempt, r.headers.get("Retry-After"))
+                self.log(f"  ↻ {host}: HTTP {r.status_code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            
+            if r.status_code in RETRYABLE_STATUS or r.status_code >= 500:
+                self.breaker.record_failure(host)
+            return ""
         
         return ""
     
-    def _extract_price(self, html: str) -> tuple:
-        # Extract price from HTML, returns (price, currency)
-        # Try JSON-LD structured data
-        blocks = re.findall(
-            r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
-            html, flags=re.I | re.S
-        )
-        for b in blocks:
-            m = re.search(r'"price"\s*:\s*"?(?P<p>[\d,.]+)"?', b, flags=re.I)
-            if m:
-                try:
-                    price = float(m.group("p").replace(",", ""))
-                    c = re.search(r'"priceCurrency"\s*:\s*"([A-Z]{3})"', b)
-                    cur = c.group(1) if c else "PHP"
-                    return price, cur
-                except Exception:
-                    pass
-        
-        # Try OpenGraph meta tag
-        m = re.search(r'product:price:amount"\s+content="([\d,.]+)"', html, flags=re.I)
-        if m:
-            try:
-                return float(m.group(1).replace(",", "")), "PHP"
-            except Exception:
-                pass
-        
-        # Try currency symbol pattern
-        m = re.search(r"(₱|PHP)\s*([\d,]+(?:\.\d+)?)", html, flags=re.I)
-        if m:
-            try:
-                return float(m.group(2).replace(",", "")), "PHP"
-            except Exception:
-                pass
-        
-        return None, None
+    def _extract_title(self, html: str, name: str) -> str:
+        # Extract product title using the retailer's profile
+        return self.profiles[name].extract_title(html)
     
-    def _domain_name(self, url: str) -> str:
-        # Extract domain name from URL
-        try:
-            return urlparse(url).netloc.lower().replace("www.", "") or "unknown"
-        except Exception:
-            return "unknown"
+    def _extract_price(self, html: str, name: str) -> tuple:
+        # Extract price using the retailer's profile, returns (price, currency)
+        return self.profiles[name].extract_price(html)
+    
+    def _host(self, url: str) -> str:
+        # Host key used for latency tracking and circuit breaking
+        return urlparse(url).netloc.lower()
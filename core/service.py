@@ -0,0 +1,244 @@
+# Shared search service: one cache, rate limiter and connection pool for every client
+#
+#   python main.py serve                      # listen on SERVICE_HOST:SERVICE_PORT
+#   python main.py --service http://host:8765 # desktop app using the service
+#
+#   GET /search?keyword=plywood&intent=materials&sort=price_asc
+#   GET /stats
+#
+# The HTTP layer is asyncio; searches run on the shared Scraper in a thread
+# pool. Identical searches that arrive while one is already crawling wait for
+# that crawl instead of starting their own.
+
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+
+from config import SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS, SERVICE_POOL_SIZE, TIMEOUT_SEC
+from core.filters import infer_intent
+from core.query import search_cache
+from utils.cache import SearchCache
+from utils.helpers import SORT_MODES, sort_results
+
+
+INTENTS = ("materials", "electronics")
+MAX_REQUEST_LINE = 8192
+MAX_HEADERS = 100
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+class SearchService:
+    # Search backend shared by all clients of one server
+
+    def __init__(self, scraper=None, cache: SearchCache = None, workers: int = SERVICE_WORKERS,
+                 logger=None):
+        if scraper is None:
+            from core.scraper import Scraper
+            scraper = Scraper()
+        scraper.transport.set_pool_size(SERVICE_POOL_SIZE)
+        self.scraper = scraper
+        self.cache = cache or search_cache()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.logger = logger
+        self.inflight = {}
+        self.started = time.time()
+        self.counts = {"requests": 0, "searches": 0, "cache_hits": 0, "coalesced": 0, "errors": 0}
+        self._server = None
+
+    def log(self, message):
+        if self.logger:
+            self.logger(message)
+
+    async def search(self, keyword: str, intent: str) -> tuple:
+        # (results, source) where source is "cache", "shared" or "crawl"
+        cached = self.cache.get(keyword, intent)
+        if cached is not None:
+            self.counts["cache_hits"] += 1
+            return cached, "cache"
+
+        key = (self.cache.canonical(keyword), intent)
+        pending = self.inflight.get(key)
+        if pending is not None:
+            self.counts["coalesced"] += 1
+            return await asyncio.shield(pending), "shared"
+
+        self.counts["searches"] += 1
+        loop = asyncio.get_running_loop()
+        pending = loop.run_in_executor(self.executor, self.scraper.search_parallel, keyword, intent)
+        self.inflight[key] = pending
+        pending.add_done_callback(lambda f: self._crawl_done(key, keyword, intent, f))
+        # Shielded like the coalesced waiters: if this client disconnects, the
+        # crawl still finishes for the others and its results are still cached
+        return await asyncio.shield(pending), "crawl"
+
+    def _crawl_done(self, key: tuple, keyword: str, intent: str, future):
+        # Runs when the crawl finishes, whether or not anyone is still waiting
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        results = future.result()
+        if results:
+            self.cache.set(keyword, intent, results)
+
+    def stats(self) -> dict:
+        return {
+            "uptime_sec": round(time.time() - self.started, 1),
+            "cache_entries": len(self.cache.cache),
+            "inflight": len(self.inflight),
+            **self.counts,
+            "metrics": self.scraper.metrics.snapshot(),
+        }
+
+    # HTTP
+
+    async def handle(self, path: str, query: dict) -> tuple:
+        # Route one GET request -> (status, payload)
+        if path == "/stats":
+            return 200, self.stats()
+        if path != "/search":
+            return 404, {"error": f"unknown path {path}"}
+
+        keyword = query.get("keyword", [""])[0].strip()
+        if not keyword:
+            return 400, {"error": "keyword is required"}
+        intent = query.get("intent", [""])[0] or infer_intent(keyword)
+        if intent not in INTENTS:
+            return 400, {"error": f"intent must be one of {', '.join(INTENTS)}"}
+        sort = query.get("sort", ["relevance"])[0]
+        if sort not in SORT_MODES:
+            return 400, {"error": f"sort must be one of {', '.join(SORT_MODES)}"}
+
+        start = time.monotonic()
+        results, source = await self.search(keyword, intent)
+        results = list(results)
+        sort_results(results, SORT_MODES[sort])
+        self.log(f"{keyword!r} ({intent}): {len(results)} results from {source} "
+                 f"in {time.monotonic() - start:.2f}s")
+        return 200, {"keyword": keyword, "intent": intent, "source": source, "results": results}
+
+    async def _serve_client(self, reader, writer):
+        # HTTP/1.1 with keep-alive; GET only
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                if len(request_line) > MAX_REQUEST_LINE:
+                    await self._respond(writer, 400, {"error": "request line too long"}, False)
+                    break
+                headers = {}
+                for _ in range(MAX_HEADERS + 1):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                else:
+                    # The rest of the header block would be read as the next request
+                    await self._respond(writer, 400, {"error": "too many headers"}, False)
+                    break
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, False)
+                    break
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                self.counts["requests"] += 1
+                if method != "GET":
+                    status, payload = 405, {"error": "only GET is supported"}
+                else:
+                    url = urlsplit(target)
+                    try:
+                        status, payload = await self.handle(url.path, parse_qs(url.query))
+                    except Exception as e:
+                        self.counts["errors"] += 1
+                        self.log(f"❌ {target}: {e}")
+                        status, payload = 500, {"error": str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status: int, payload: dict, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self, host: str = SERVICE_HOST, port: int = SERVICE_PORT):
+        self._server = await asyncio.start_server(self._serve_client, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self, host: str = SERVICE_HOST, port: int = SERVICE_PORT):
+        host, port = await self.start(host, port)
+        self.log(f"PRICIO service listening on http://{host}:{port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self.executor.shutdown(wait=False)
+
+
+class ServiceClient:
+    # Drop-in for Scraper in the desktop app: searches go to a shared service
+
+    def __init__(self, base_url: str, logger=None):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.logger = logger
+        self.stop_flag = False
+
+    def log(self, message):
+        if self.logger:
+            self.logger(message)
+
+    def set_stop_flag(self, value: bool):
+        # The shared crawl keeps running for other clients; this one just stops waiting
+        self.stop_flag = value
+
+    def search_parallel(self, keyword: str, intent: str) -> list:
+        # Searches can queue behind other clients' crawls, so allow for a few of them
+        r = self.session.get(
+            f"{self.base_url}/search",
+            params={"keyword": keyword, "intent": intent},
+            timeout=TIMEOUT_SEC * 6,
+        )
+        if r.status_code != 200:
+            # Error bodies are JSON from the service, but not from a proxy in front of it
+            try:
+                error = r.json().get("error")
+            except (ValueError, AttributeError):
+                error = None
+            raise RuntimeError(f"Search service: {error or f'HTTP {r.status_code}'}")
+        data = r.json()
+        self.log(f"🌐 {len(data['results'])} results from service ({data['source']})")
+        return data["results"]
+
+    def stats(self) -> dict:
+        return self.session.get(f"{self.base_url}/stats", timeout=TIMEOUT_SEC).json()
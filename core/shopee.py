@@ -0,0 +1,47 @@
+# Shopee search API (the XHR behind its search page)
+
+
+import re
+
+
+# Prices in the API are integers in 1/100000 of the currency unit
+PRICE_SCALE = 100000
+
+
+def search_url(base: str, q: str, page: int, limit: int) -> str:
+    # Offset-based paging through `newest`; q must already be URL-encoded
+    return (
+        f"{base}/api/v4/search/search_items?by=relevancy&keyword={q}"
+        f"&limit={limit}&newest={(page - 1) * limit}&order=desc"
+        f"&page_type=search&scenario=PAGE_GLOBAL_SEARCH&version=2"
+    )
+
+
+def request_headers(base: str) -> dict:
+    return {"Referer": f"{base}/search", "X-API-SOURCE": "pc", "X-Shopee-Language": "en"}
+
+
+def product_link(base: str, name: str, shopid, itemid) -> str:
+    # Same form as the site's own links: /<slug>-i.<shopid>.<itemid>
+    slug = re.sub(r"[^\w]+", "-", name).strip("-") or "product"
+    return f"{base}/{slug}-i.{shopid}.{itemid}"
+
+
+def parse_search(data: dict, base: str) -> tuple:
+    # search_items response -> ([{"title", "price", "link"}], more pages available);
+    # items is None when the payload isn't a search response (anti-bot error)
+    if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+        return None, False
+    out = []
+    for entry in data["items"]:
+        item = entry.get("item_basic") if isinstance(entry, dict) else None
+        if not isinstance(item, dict) or not item.get("itemid") or not item.get("shopid"):
+            continue
+        name = (item.get("name") or "").strip()
+        raw = item.get("price") or item.get("price_min")
+        out.append({
+            "title": name,
+            "price": raw / PRICE_SCALE if isinstance(raw, (int, float)) and raw > 0 else None,
+            "link": product_link(base, name, item["shopid"], item["itemid"]),
+        })
+    return out, bool(out) and not data.get("nomore", False)
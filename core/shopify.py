@@ -0,0 +1,86 @@
+# Shopify storefront JSON endpoints (predictive search and product .js)
+
+
+from urllib.parse import urljoin
+
+
+def suggest_url(base: str, q: str, limit: int) -> str:
+    # Predictive search endpoint; q must already be URL-encoded
+    return (
+        f"{base}/search/suggest.json?q={q}"
+        f"&resources[type]=product&resources[limit]={limit}"
+        f"&resources[options][unavailable_products]=last"
+    )
+
+
+def product_js_url(link: str) -> str:
+    # Product JSON for a canonical /products/<handle> URL
+    return link.rstrip("/") + ".js"
+
+
+def products_page_url(base: str, page: int, limit: int) -> str:
+    # Public catalogue listing used for full syncs
+    return f"{base}/products.json?limit={limit}&page={page}"
+
+
+def _price(value):
+    # Suggest prices are decimal strings ("1,245.00" on some themes)
+    if value in (None, ""):
+        return None
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def parse_suggest(data: dict, base: str):
+    # Predictive search response -> [{"title", "price", "link"}]; None when the
+    # payload isn't a predictive search response (theme without it, error page)
+    try:
+        products = data["resources"]["results"]["products"]
+    except (KeyError, TypeError):
+        return None
+    if not isinstance(products, list):
+        return None
+    out = []
+    for p in products:
+        if not isinstance(p, dict) or not p.get("url"):
+            continue
+        out.append({
+            "title": (p.get("title") or "").strip(),
+            "price": _price(p.get("price") or p.get("price_min")),
+            "link": urljoin(base, p["url"]),
+        })
+    return out
+
+
+def parse_product_js(data: dict) -> tuple:
+    # /products/<handle>.js -> (title, price); prices there are in centavos
+    if not isinstance(data, dict):
+        return "", None
+    cents = data.get("price")
+    if cents is None:
+        variants = data.get("variants") or []
+        cents = variants[0].get("price") if variants else None
+    price = cents / 100 if isinstance(cents, (int, float)) else None
+    return (data.get("title") or "").strip(), price
+
+
+def parse_products_page(data: dict, base: str) -> list:
+    # /products.json page -> [{"link", "title", "price", "cur", "updated_at"}]
+    if not isinstance(data, dict):
+        return []
+    out = []
+    for p in data.get("products") or []:
+        if not isinstance(p, dict) or not p.get("handle"):
+            continue
+        variants = p.get("variants") or []
+        prices = [v for v in (_price(v.get("price")) for v in variants) if v is not None]
+        out.append({
+            "link": f"{base}/products/{p['handle']}",
+            "title": (p.get("title") or "").strip(),
+            "price": min(prices) if prices else None,
+            "cur": "PHP",
+            "updated_at": p.get("updated_at"),
+        })
+    return out
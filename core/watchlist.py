@@ -0,0 +1,356 @@
+# Watchlist: pinned products and keyword searches re-checked on a schedule
+#
+# Every check hashes only the part of the response that pricing depends on
+# (the product page's JSON-LD/price block, the Shopify product JSON's title
+# and price, or the first page of a keyword search at every retailer). When
+# the hash matches the previous check, parsing, scoring and history writes
+# are skipped, and for keyword watches so is the search itself. A real
+# price change is stored as an alert and appended to data/price_history.csv.
+
+
+import csv
+import hashlib
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse, quote_plus
+
+from config import (
+    RETAILERS, WATCH_INTERVAL_SEC, WATCH_WORKERS, MAX_PRODUCTS_PER_RETAILER, MARKETPLACE_PAGE_SIZE,
+)
+from core import shopify, lazada, shopee
+from core.filters import infer_intent
+from core.parsing import listing_cards
+from core.scheduler import fetch_priority, submit
+from utils.helpers import calculate_price_stats, init_history_file
+
+
+DEFAULT_DB_PATH = Path("data") / "watchlist.db"
+DEFAULT_HISTORY_PATH = Path("data") / "price_history.csv"
+
+# Differences below this are rounding, not a price change
+PRICE_EPSILON = 0.005
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watches (
+    id           INTEGER PRIMARY KEY,
+    kind         TEXT NOT NULL,          -- 'product' or 'keyword'
+    target       TEXT NOT NULL,          -- product link or search keyword
+    intent       TEXT NOT NULL DEFAULT '',
+    interval_sec REAL NOT NULL,
+    added_ts     REAL NOT NULL,
+    checked_ts   REAL,
+    next_ts      REAL NOT NULL,
+    content_hash TEXT,
+    title        TEXT,
+    price        REAL,
+    UNIQUE (kind, target, intent)
+);
+CREATE INDEX IF NOT EXISTS watches_due ON watches (next_ts);
+CREATE TABLE IF NOT EXISTS alerts (
+    id        INTEGER PRIMARY KEY,
+    watch_id  INTEGER NOT NULL,
+    ts        REAL NOT NULL,
+    title     TEXT,
+    link      TEXT,
+    old_price REAL NOT NULL,
+    new_price REAL NOT NULL,
+    seen      INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def content_hash(region: str) -> str:
+    return hashlib.blake2b(region.encode("utf-8", "replace"), digest_size=16).hexdigest()
+
+
+def retailer_for(link: str, retailers: dict = None):
+    # Name of the configured retailer serving this link (None if unknown)
+    host = urlparse(link).netloc.lower().replace("www.", "")
+    for name, cfg in (retailers if retailers is not None else RETAILERS).items():
+        if urlparse(cfg["base"]).netloc.lower().replace("www.", "") == host:
+            return name
+    return None
+
+
+def price_changed(old, new) -> bool:
+    return old is not None and new is not None and abs(new - old) >= PRICE_EPSILON
+
+
+class WatchStore:
+    # SQLite-backed watches and alerts
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the store thread-safe
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def add(self, kind: str, target: str, intent: str = "",
+            interval_sec: float = WATCH_INTERVAL_SEC) -> int:
+        # Add a watch (or update its interval); due immediately. Returns its id.
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO watches (kind, target, intent, interval_sec, added_ts, next_ts) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(kind, target, intent) DO UPDATE SET interval_sec = excluded.interval_sec",
+                (kind, target, intent, interval_sec, now, now),
+            )
+            return db.execute(
+                "SELECT id FROM watches WHERE kind = ? AND target = ? AND intent = ?",
+                (kind, target, intent),
+            ).fetchone()[0]
+
+    def remove(self, watch_id: int) -> bool:
+        with self._connect() as db:
+            db.execute("DELETE FROM alerts WHERE watch_id = ?", (watch_id,))
+            return db.execute("DELETE FROM watches WHERE id = ?", (watch_id,)).rowcount > 0
+
+    def watches(self) -> list:
+        with self._connect() as db:
+            return [dict(r) for r in db.execute("SELECT * FROM watches ORDER BY id")]
+
+    def due(self, now: float = None, limit: int = None) -> list:
+        now = time.time() if now is None else now
+        sql = "SELECT * FROM watches WHERE next_ts <= ? ORDER BY next_ts"
+        params = [now]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as db:
+            return [dict(r) for r in db.execute(sql, params)]
+
+    def next_due(self):
+        with self._connect() as db:
+            return db.execute("SELECT MIN(next_ts) FROM watches").fetchone()[0]
+
+    def touch(self, watches: list, now: float):
+        # Unchanged or failed checks: only reschedule (one transaction for all)
+        with self._connect() as db:
+            db.executemany(
+                "UPDATE watches SET checked_ts = ?, next_ts = ? WHERE id = ?",
+                [(now, now + w["interval_sec"], w["id"]) for w in watches],
+            )
+
+    def update(self, watch: dict, now: float, digest: str, title: str, price):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE watches SET checked_ts = ?, next_ts = ?, content_hash = ?, title = ?, "
+                "price = ? WHERE id = ?",
+                (now, now + watch["interval_sec"], digest, title, price, watch["id"]),
+            )
+
+    def add_alert(self, watch: dict, now: float, title: str, link: str, old_price, new_price):
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO alerts (watch_id, ts, title, link, old_price, new_price) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (watch["id"], now, title, link, old_price, new_price),
+            )
+
+    def alerts(self, unseen_only: bool = False, mark_seen: bool = False) -> list:
+        sql = "SELECT * FROM alerts" + (" WHERE seen = 0" if unseen_only else "") + " ORDER BY ts"
+        with self._connect() as db:
+            rows = [dict(r) for r in db.execute(sql)]
+            if mark_seen and rows:
+                db.executemany("UPDATE alerts SET seen = 1 WHERE id = ?", [(r["id"],) for r in rows])
+        return rows
+
+
+class WatchChecker:
+    # Re-checks due watches through a Scraper
+
+    def __init__(self, scraper, store: WatchStore, history_path: Path = DEFAULT_HISTORY_PATH,
+                 workers: int = WATCH_WORKERS):
+        self.scraper = scraper
+        self.store = store
+        self.history_path = Path(history_path)
+        self.workers = workers
+
+    def log(self, message):
+        self.scraper.log(message)
+
+    def check_due(self, now: float = None, force: bool = False) -> dict:
+        # Check every due watch (all of them with force); returns outcome counts
+        watches = self.store.watches() if force else self.store.due(now)
+        stats = {"checked": 0, "unchanged": 0, "updated": 0, "alerts": 0, "failed": 0}
+        history = []
+        untouched = []
+        # Watch fetches yield to interactive searches sharing the scraper
+        with fetch_priority("watchlist"), ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {submit(executor, self.check, w): w for w in watches}
+            for future in as_completed(futures):
+                try:
+                    outcome, row = future.result()
+                except Exception as e:
+                    self.log(f"❌ watch {futures[future]['id']}: {e}")
+                    outcome, row = "failed", None
+                stats["checked"] += 1
+                stats[outcome] += 1
+                if outcome in ("unchanged", "failed"):
+                    untouched.append(futures[future])
+                if row:
+                    history.append(row)
+        self.store.touch(untouched, time.time())
+        self._append_history(history)
+        return stats
+
+    def check(self, watch: dict) -> tuple:
+        # -> (outcome, history row or None); outcome is unchanged/updated/alerts/failed.
+        # Unchanged and failed watches are left for the caller to reschedule
+        # in bulk (failed ones retry at the next interval, not immediately).
+        if watch["kind"] == "keyword":
+            fetched = self._fetch_keyword(watch)
+        else:
+            fetched = self._fetch_product(watch)
+        if fetched is None:
+            return "failed", None
+
+        digest, parse = fetched
+        if digest == watch["content_hash"]:
+            return "unchanged", None
+        now = time.time()
+
+        title, price, row = parse()
+        # A page that stops showing a price keeps the last known one
+        self.store.update(watch, now, digest, title, price if price is not None else watch["price"])
+        if not price_changed(watch["price"], price):
+            return "updated", row if watch["price"] is None else None
+
+        link = watch["target"] if watch["kind"] == "product" else ""
+        self.store.add_alert(watch, now, title, link, watch["price"], price)
+        arrow = "⬇️" if price < watch["price"] else "⬆️"
+        self.log(f"{arrow} {title or watch['target']}: {watch['price']:,.2f} → {price:,.2f}")
+        return "alerts", row
+
+    def _fetch_product(self, watch: dict):
+        # -> (hash, parse) for a product link; None if it couldn't be fetched
+        link = watch["target"]
+        name = retailer_for(link, self.scraper.retailers)
+        if name is None:
+            raise ValueError(f"{link} is not on a configured retailer")
+
+        if self.scraper.retailers[name].get("adapter") == "shopify":
+            data = self.scraper._get_json(shopify.product_js_url(link), retailer=name)
+            if data is not None:
+                title, price = shopify.parse_product_js(data)
+                digest = content_hash(json.dumps([title, price]))
+                return digest, lambda: (title, price, self._row(link, price, 1))
+
+        html = self.scraper._get_html(link, retailer=name)
+        if not html:
+            return None
+        digest = content_hash(self.scraper.profiles[name].price_region(html))
+
+        def parse():
+            title = self.scraper._extract_title(html, name)
+            price, _ = self.scraper._extract_price(html, name)
+            return title, price, self._row(link, price, 1)
+        return digest, parse
+
+    def _fetch_keyword(self, watch: dict):
+        # -> (hash, parse) for a keyword search; the tracked price is the median.
+        # The first listing page of every retailer is hashed before searching:
+        # if it shows the same prices as last time, the search is skipped.
+        keyword = watch["target"]
+        intent = watch["intent"] or infer_intent(keyword)
+        regions = self._listing_regions(quote_plus(keyword))
+        digest = None
+        if regions is not None:
+            digest = content_hash(json.dumps(regions, sort_keys=True))
+            if digest == watch["content_hash"]:
+                return digest, None
+
+        results = self.scraper.search_parallel(keyword, intent)
+        if not results:
+            return None
+        if digest is None:
+            digest = content_hash(json.dumps(sorted((r["link"], r["price"]) for r in results)))
+
+        def parse():
+            stats = calculate_price_stats(results)
+            return keyword, stats["median"], self._row(keyword, stats["median"], stats["count"])
+        return digest, parse
+
+    def _listing_regions(self, q: str):
+        # {retailer: products on its first listing page} for the retailers
+        # search_parallel would search; None if any of them can't tell
+        scraper = self.scraper
+        names = [
+            name for name, cfg in scraper.retailers.items()
+            if cfg.get("enabled", True) and not scraper.breaker.is_open(scraper._host(cfg["base"]))
+        ]
+        if not names:
+            return None
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            futures = {name: submit(executor, self._listing_region, name, q) for name in names}
+            regions = {name: f.result() for name, f in futures.items()}
+        return None if None in regions.values() else regions
+
+    def _listing_region(self, name: str, q: str):
+        # The (link, title, price) of every product on the first page the
+        # search reads (adapter JSON or search HTML). None if it failed, or if
+        # some products show no price there: theirs come from product pages,
+        # which aren't hashed.
+        scraper = self.scraper
+        cfg = scraper.retailers[name]
+        items = None
+        if cfg.get("adapter"):
+            items = self._adapter_listing(name, cfg, q)
+            if items is None and not cfg.get("html_fallback", True):
+                return None
+        if items is None:
+            profile = scraper.profiles[name]
+            html = scraper._get_html(profile.search_urls(q)[0], retailer=name)
+            if not html:
+                return None
+            items = listing_cards(profile, html)
+        if not all(item["title"] and item["price"] is not None for item in items):
+            return None
+        return json.dumps(sorted((i["link"], i["title"], i["price"]) for i in items))
+
+    def _adapter_listing(self, name: str, cfg: dict, q: str):
+        # Items on the adapter's first JSON page, as the search would request it
+        scraper = self.scraper
+        if cfg["adapter"] == "shopify":
+            data = scraper._get_json(
+                shopify.suggest_url(cfg["base"], q, MAX_PRODUCTS_PER_RETAILER), retailer=name
+            )
+            return shopify.parse_suggest(data, cfg["base"]) if data is not None else None
+        if cfg["adapter"] == "lazada":
+            url, headers = lazada.search_url(cfg["base"], q, 1), lazada.request_headers(cfg["base"])
+            parse = lazada.parse_search
+        else:
+            url = shopee.search_url(cfg["base"], q, 1, MARKETPLACE_PAGE_SIZE)
+            headers, parse = shopee.request_headers(cfg["base"]), shopee.parse_search
+        data = scraper._get_json(url, retailer=name, headers=headers)
+        return parse(data, cfg["base"])[0] if data is not None else None
+
+    def _row(self, key: str, price, n: int):
+        if price is None:
+            return None
+        return [time.strftime("%Y-%m-%d %H:%M:%S"), key, f"{price:.2f}", n]
+
+    def _append_history(self, rows: list):
+        # price_history.csv columns: timestamp, keyword, median, n. Product
+        # watches use the link as the keyword and their price as the median.
+        if not rows:
+            return
+        init_history_file(self.history_path)
+        with self.history_path.open("a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
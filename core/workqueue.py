@@ -0,0 +1,413 @@
+# Crawl work queue: keyword and product-URL tasks split across worker processes
+#
+#   python main.py enqueue plywood cement "pvc pipe"    # keyword tasks
+#   python main.py enqueue --products links.txt         # product-URL tasks
+#   python main.py worker --processes 4                 # drain the queue
+#
+# Workers lease tasks for WORKQUEUE_LEASE_SEC and renew the leases of tasks
+# still running. A worker that dies leaves its leases to expire and the tasks
+# are handed out again. Every lease counts as an attempt: failed tasks (and
+# tasks whose worker died) are retried with backoff up to
+# WORKQUEUE_MAX_ATTEMPTS. Tasks are deduplicated on (kind, target, intent),
+# and the products a keyword task found are recorded as done product tasks:
+# a product URL that was already fetched is not fetched again unless it is
+# requeued explicitly. All workers draw on one
+# rate-limit budget per retailer host (core.ratelimit.SharedRateLimiter), so
+# adding workers raises throughput without loosening REQUEST_DELAY_SEC.
+# `worker --parse-workers N` runs keyword tasks in batches through
+# core.pipeline.BulkPipeline, parsing in N processes per worker.
+#
+# The SQLite backend covers processes on one machine. Other brokers can be
+# plugged in through QUEUE_BACKENDS (they need the WorkQueue methods and a
+# rate_limiter() for their own shared budget).
+
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import (
+    REQUEST_DELAY_SEC,
+    WORKQUEUE_LEASE_SEC,
+    WORKQUEUE_MAX_ATTEMPTS,
+    WORKQUEUE_RETRY_SEC,
+    WORKQUEUE_THREADS,
+)
+from core.catalogue import fetch_product
+from core.filters import infer_intent
+from core.ratelimit import SharedRateLimiter
+from core.scheduler import fetch_priority, submit
+from core.watchlist import retailer_for
+
+
+DEFAULT_DB_PATH = Path("data") / "workqueue.db"
+
+KINDS = ("keyword", "product")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY,
+    kind        TEXT NOT NULL,          -- 'keyword' or 'product'
+    target      TEXT NOT NULL,          -- keyword or product link
+    intent      TEXT NOT NULL DEFAULT '',
+    state       TEXT NOT NULL DEFAULT 'pending',  -- pending/leased/done/failed
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    owner       TEXT,
+    lease_until REAL,
+    not_before  REAL NOT NULL DEFAULT 0,
+    result      TEXT,                   -- JSON
+    error       TEXT,
+    created_ts  REAL NOT NULL,
+    done_ts     REAL,
+    UNIQUE (kind, target, intent)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (state, not_before);
+"""
+
+
+def task_key(kind: str, target: str, intent: str = "") -> tuple:
+    # Dedup key: keywords are compared case-insensitively, links as given
+    if kind not in KINDS:
+        raise ValueError(f"Unknown task kind {kind!r} (choose from {', '.join(KINDS)})")
+    target = target.strip()
+    return kind, target.lower() if kind == "keyword" else target, intent or ""
+
+
+class SqliteWorkQueue:
+    # Task queue in one SQLite file shared by every worker process
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the queue thread-safe
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        # Write transaction that takes the lock up front (no upgrade deadlocks)
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def rate_limiter(self, interval: float = REQUEST_DELAY_SEC) -> SharedRateLimiter:
+        # Per-host budget shared by all workers of this queue
+        return SharedRateLimiter(self.path, interval)
+
+    def enqueue(self, tasks: list) -> int:
+        # tasks: [(kind, target, intent)]; returns how many were new
+        now = time.time()
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO tasks (kind, target, intent, created_ts) VALUES (?, ?, ?, ?)",
+                [(*task_key(*t), now) for t in tasks],
+            )
+            return db.total_changes - before
+
+    def lease(self, owner: str, limit: int = 1, lease_sec: float = WORKQUEUE_LEASE_SEC,
+              max_attempts: int = WORKQUEUE_MAX_ATTEMPTS) -> list:
+        # Claim up to `limit` ready tasks (pending, or leased to a worker whose
+        # lease ran out). Each lease is an attempt, so a task that keeps killing
+        # its worker is failed after max_attempts instead of looping forever.
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE tasks SET state = 'failed', error = 'lease expired', owner = NULL, "
+                "lease_until = NULL WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, max_attempts),
+            )
+            rows = db.execute(
+                "SELECT * FROM tasks WHERE (state = 'pending' AND not_before <= ?) "
+                "OR (state = 'leased' AND lease_until < ?) ORDER BY id LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            db.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_until = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(owner, now + lease_sec, r["id"]) for r in rows],
+            )
+        return [{**dict(r), "attempts": r["attempts"] + 1} for r in rows]
+
+    def renew(self, task_id: int, owner: str, lease_sec: float = WORKQUEUE_LEASE_SEC) -> bool:
+        # Extend a lease that is still held; False if it was lost
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE tasks SET lease_until = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                (time.time() + lease_sec, task_id, owner),
+            ).rowcount > 0
+
+    def complete(self, task_id: int, owner: str, result, products: list = ()) -> bool:
+        # Store the result; ignored (False) if the lease was lost to another worker.
+        # products ({"link", "title", "price", "cur"} found along the way) are
+        # stored as done product tasks, so their links are not fetched again.
+        now = time.time()
+        with self._transaction() as db:
+            if not db.execute(
+                "UPDATE tasks SET state = 'done', result = ?, error = NULL, done_ts = ?, "
+                "lease_until = NULL WHERE id = ? AND owner = ? AND state = 'leased'",
+                (json.dumps(result, ensure_ascii=False), now, task_id, owner),
+            ).rowcount:
+                return False
+            db.executemany(
+                "INSERT INTO tasks (kind, target, intent, state, result, done_ts, created_ts) "
+                "VALUES (?, ?, ?, 'done', ?, ?, ?) "
+                "ON CONFLICT (kind, target, intent) DO UPDATE SET state = 'done', "
+                "result = excluded.result, error = NULL, done_ts = excluded.done_ts "
+                "WHERE tasks.state IN ('pending', 'failed')",
+                [(*task_key("product", p["link"]), json.dumps(p, ensure_ascii=False), now, now)
+                 for p in products],
+            )
+            return True
+
+    def fail(self, task_id: int, owner: str, error: str,
+             max_attempts: int = WORKQUEUE_MAX_ATTEMPTS) -> bool:
+        # Retry later with exponential backoff, or give up after max_attempts
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts FROM tasks WHERE id = ? AND owner = ? AND state = 'leased'",
+                (task_id, owner),
+            ).fetchone()
+            if row is None:
+                return False
+            attempts = row["attempts"]
+            state = "failed" if attempts >= max_attempts else "pending"
+            db.execute(
+                "UPDATE tasks SET state = ?, error = ?, owner = NULL, "
+                "lease_until = NULL, not_before = ? WHERE id = ?",
+                (state, error, time.time() + WORKQUEUE_RETRY_SEC * 2 ** (attempts - 1), task_id),
+            )
+            return True
+
+    def requeue(self, states=("failed",), kind: str = None) -> int:
+        # Put finished tasks back in the queue (e.g. tonight's sweep again)
+        sql = (f"UPDATE tasks SET state = 'pending', attempts = 0, not_before = 0, owner = NULL, "
+               f"lease_until = NULL, error = NULL WHERE state IN ({', '.join('?' for _ in states)})")
+        params = list(states)
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        with self._transaction() as db:
+            return db.execute(sql, params).rowcount
+
+    def counts(self) -> dict:
+        with self._connect() as db:
+            rows = db.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        return {"pending": 0, "leased": 0, "done": 0, "failed": 0, **dict(rows)}
+
+    def results(self, kind: str = None) -> list:
+        # Finished tasks with their decoded results
+        sql = "SELECT * FROM tasks WHERE state = 'done'"
+        params = []
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        with self._connect() as db:
+            rows = [dict(r) for r in db.execute(sql + " ORDER BY id", params)]
+        for r in rows:
+            r["result"] = json.loads(r["result"]) if r["result"] else None
+        return rows
+
+    def next_ready(self, leased: bool = True):
+        # Earliest time a not-yet-ready task becomes available (None if none);
+        # leased=False ignores tasks other workers are still running
+        states = ("pending", "leased") if leased else ("pending",)
+        with self._connect() as db:
+            return db.execute(
+                "SELECT MIN(CASE WHEN state = 'pending' THEN not_before ELSE lease_until END) "
+                f"FROM tasks WHERE state IN ({', '.join('?' for _ in states)})",
+                states,
+            ).fetchone()[0]
+
+
+QUEUE_BACKENDS = {
+    "sqlite": SqliteWorkQueue,
+}
+
+
+def open_queue(url=None):
+    # "sqlite:///path/to/queue.db", a plain path, or None for data/workqueue.db
+    if url is None:
+        return SqliteWorkQueue()
+    url = str(url)
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return SqliteWorkQueue(url)
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown queue backend {scheme!r} (choose from {', '.join(QUEUE_BACKENDS)})")
+    if scheme == "sqlite":
+        return SqliteWorkQueue(rest[1:] if rest.startswith("/") else rest)
+    return QUEUE_BACKENDS[scheme](url)
+
+
+class CrawlWorker:
+    # Leases tasks and runs them through one Scraper
+
+    def __init__(self, queue, scraper, threads: int = WORKQUEUE_THREADS, owner: str = None,
+                 pipeline=None, lease_sec: float = WORKQUEUE_LEASE_SEC):
+        self.queue = queue
+        self.scraper = scraper
+        self.threads = threads
+        self.lease_sec = lease_sec
+        # core.pipeline.BulkPipeline: keyword tasks are then leased `threads` at
+        # a time and searched together, with parsing in its worker processes
+        self.pipeline = pipeline
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"done": 0, "failed": 0}
+        self._held = {}   # task id -> owner, for leases still being worked on
+        self._lock = threading.Lock()
+
+    def log(self, message):
+        self.scraper.log(message)
+
+    def run(self, until_empty: bool = True) -> dict:
+        # Work until the queue is drained (or forever, polling for new tasks)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(stop,), daemon=True)
+        heartbeat.start()
+        try:
+            with fetch_priority("bulk"), ThreadPoolExecutor(max_workers=self.threads) as executor:
+                loops = 1 if self.pipeline else self.threads
+                for future in [submit(executor, self._loop, until_empty, n) for n in range(loops)]:
+                    future.result()
+        finally:
+            stop.set()
+            heartbeat.join()
+        return self.stats
+
+    def _heartbeat(self, stop: threading.Event):
+        # Renew the leases of running tasks, so a slow search (or a pipeline
+        # batch) is not handed to another worker while this one is on it
+        while not stop.wait(self.lease_sec / 3):
+            with self._lock:
+                held = list(self._held.items())
+            for task_id, owner in held:
+                if not self.queue.renew(task_id, owner, self.lease_sec):
+                    self.log(f"⚠️ task {task_id}: lease lost to another worker")
+
+    def _loop(self, until_empty: bool, n: int):
+        owner = f"{self.owner}/{n}"
+        limit = self.threads if self.pipeline else 1
+        while not self.scraper.stop_flag:
+            tasks = self.queue.lease(owner, limit=limit, lease_sec=self.lease_sec)
+            with self._lock:
+                self._held.update((t["id"], owner) for t in tasks)
+            if not tasks:
+                # When draining, tasks leased by other workers are theirs to
+                # finish (or to retry); only pending retries are waited for
+                next_ts = self.queue.next_ready(leased=not until_empty)
+                if next_ts is None and until_empty:
+                    return
+                # Nothing ready: wait for retries/expired leases (or new work)
+                time.sleep(min(5.0, max(0.1, (next_ts or time.time() + 5) - time.time())))
+                continue
+            if self.pipeline:
+                self._run_batch(tasks, owner)
+                continue
+            for task in tasks:
+                self._run_task(task, owner)
+
+    def _run_task(self, task: dict, owner: str):
+        try:
+            result = self.execute(task)
+        except Exception as e:
+            self._finish(task, owner, None, f"{type(e).__name__}: {e}")
+        else:
+            self._finish(task, owner, result)
+
+    def _run_batch(self, tasks: list, owner: str):
+        # Keyword tasks go through the pipeline together, product tasks one by one
+        keywords = [t for t in tasks if t["kind"] == "keyword"]
+        for task in tasks:
+            if task["kind"] != "keyword":
+                self._run_task(task, owner)
+        if not keywords:
+            return
+        try:
+            results = self.pipeline.run(
+                [(t["target"], t["intent"] or infer_intent(t["target"])) for t in keywords]
+            )
+        except Exception as e:
+            for task in keywords:
+                self._finish(task, owner, None, f"{type(e).__name__}: {e}")
+            return
+        for task, result in zip(keywords, results):
+            self._finish(task, owner, result)
+
+    def _finish(self, task: dict, owner: str, result, error: str = None):
+        with self._lock:
+            self._held.pop(task["id"], None)
+        if error is None and result is None:
+            error = "no response"
+        if error is None:
+            products = []
+            if task["kind"] == "keyword":
+                products = [
+                    {"link": r["link"], "title": r["title"], "price": r["price"],
+                     "cur": None if r["cur"] == "—" else r["cur"]}
+                    for r in result
+                ]
+            self.queue.complete(task["id"], owner, result, products)
+            outcome = "done"
+        else:
+            self.queue.fail(task["id"], owner, error)
+            self.log(f"↻ {task['kind']} {task['target']}: {error}")
+            outcome = "failed"
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def execute(self, task: dict):
+        # -> JSON-serializable result, or None if the task should be retried.
+        # An empty keyword search counts as done: it is usually a real "no
+        # matches", and failing retailers are already retried inside _fetch.
+        if task["kind"] == "keyword":
+            keyword = task["target"]
+            return self.scraper.search_parallel(keyword, task["intent"] or infer_intent(keyword))
+        name = retailer_for(task["target"], self.scraper.retailers)
+        if name is None:
+            raise ValueError(f"{task['target']} is not on a configured retailer")
+        return fetch_product(self.scraper, name, task["target"])
+
+
+def run_worker(queue_url, retailers: dict = None, threads: int = WORKQUEUE_THREADS,
+               until_empty: bool = True, interval: float = REQUEST_DELAY_SEC,
+               verbose: bool = False, parse_workers: int = 0) -> dict:
+    # Worker process entry point: own Scraper, shared queue and rate limit.
+    # With parse_workers, keyword tasks run through a BulkPipeline.
+    from core.scraper import Scraper
+
+    queue = open_queue(queue_url)
+    scraper = Scraper(logger=print if verbose else None, retailers=retailers)
+    # Spacing comes from the shared budget; the scheduler in front of it
+    # still orders this process's fetches by priority and caps concurrency
+    scraper.rate_limiter.interval = 0
+    scraper.rate_limiter.shared = queue.rate_limiter(interval)
+    if not parse_workers:
+        return CrawlWorker(queue, scraper, threads=threads).run(until_empty=until_empty)
+
+    from core.pipeline import BulkPipeline
+
+    with BulkPipeline(scraper, workers=parse_workers) as pipeline:
+        return CrawlWorker(queue, scraper, threads=threads, pipeline=pipeline).run(until_empty=until_empty)
@@ -1,10 +1,279 @@
 #!/usr/bin/env python3
 # PRICIO - Pricing Regional Intelligence Catalogue Insight Output
 # Main entry point
+#
+#   python main.py                 # desktop app
+#   python main.py sync [--full]   # refresh the local catalogue snapshot
+#   python main.py serve           # shared search service for several desktops
+#   python main.py quote bom.csv   # price a bill of materials
+#   python main.py watch ...       # watchlist: add/list/remove/check/run/alerts
+#   python main.py stats [KEYWORD] # price stats from data/catalogue.col
+#   python main.py enqueue ...     # add keyword/product tasks to the crawl queue
+#   python main.py worker          # crawl queued tasks (--processes N)
+#   python main.py --service URL   # desktop app using a running service
 
 
-if __name__ == "__main__":
+import argparse
+
+
+def run_sync(args):
+    from core import Scraper
+    from core.catalogue import CatalogueStore, CatalogueSync
+    
+    scraper = Scraper(logger=print)
+    store = CatalogueStore()
+    stats = CatalogueSync(scraper, store).sync_all(full=args.full)
+    failed = [name for name, s in stats.items() if s.get("failed")]
+    print(f"Catalogue: {store.count()} products ({', '.join(failed) or 'no'} failures)")
+    store.export_snapshot()
+    return 1 if failed else 0
+
+
+def run_stats(args):
+    from utils.columnar import ColumnarSnapshot
+    
+    try:
+        snapshot = ColumnarSnapshot(args.snapshot)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e} (run python main.py sync first)")
+        return 2
+    
+    with snapshot:
+        rows = range(len(snapshot))
+        if args.keyword:
+            words = args.keyword.lower().split()
+            titles = snapshot.column("title")
+            rows = [i for i in rows if all(w in titles[i].lower() for w in words)]
+        stores = snapshot.column("store")
+        by_store = {}
+        for i in rows:
+            by_store.setdefault(stores[i], []).append(i)
+        
+        print(f"{len(rows)} of {len(snapshot)} products in {args.snapshot}")
+        for store, indices in [("all", list(rows))] + sorted(by_store.items()):
+            s = snapshot.price_stats(indices)
+            if s["count"]:
+                print(f"{store:<24} {s['count']:>6} priced  min {s['min']:>12,.2f}  "
+                      f"median {s['median']:>12,.2f}  max {s['max']:>12,.2f}")
+    return 0
+
+
+def run_serve(args):
+    import asyncio
+    from core.service import SearchService
+    
+    service = SearchService(logger=print)
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+def run_quote(args):
+    from core.quote import QuoteEngine, load_bom, format_quote, write_quote_csv
+    
+    try:
+        lines = load_bom(args.bom)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+    
+    if args.catalogue:
+        from core.catalogue import CatalogueStore
+        searcher = CatalogueStore()
+    elif args.service:
+        from core.service import ServiceClient
+        searcher = ServiceClient(args.service)
+    else:
+        from core import Scraper
+        searcher = Scraper()
+    
+    def on_line(p, done, total):
+        m = p["match"]
+        found = f"{m['store']} {m['price_disp']} x{p['qty']:g} = {p['subtotal']:,.2f}" if m else "no priced match"
+        print(f"[{done}/{total}] {p['line']}. {p['keyword']}: {found}")
+    
+    quote = QuoteEngine(searcher, logger=print).run(lines, on_line=on_line)
+    print()
+    print(format_quote(quote))
+    if args.output:
+        write_quote_csv(quote, args.output)
+        print(f"Quote written to {args.output}")
+    return 0
+
+
+def run_watch(args):
+    import time
+    from datetime import datetime
+    from core.watchlist import WatchStore, WatchChecker, retailer_for
+    
+    store = WatchStore()
+    
+    if args.action == "add":
+        kind = "keyword" if args.keyword else "product"
+        if kind == "product" and not args.target.startswith(("http://", "https://")):
+            print("❌ Products are watched by link; use --keyword to watch a search")
+            return 2
+        if kind == "product" and retailer_for(args.target) is None:
+            print(f"❌ {args.target} is not on a configured retailer")
+            return 2
+        watch_id = store.add(kind, args.target, args.intent or "", args.every * 3600)
+        print(f"Watching {kind} #{watch_id}: {args.target} (every {args.every:g} h)")
+        return 0
+    
+    if args.action == "remove":
+        found = store.remove(args.id)
+        print(f"Removed watch #{args.id}" if found else f"No watch #{args.id}")
+        return 0 if found else 1
+    
+    if args.action == "list":
+        for w in store.watches():
+            price = f"{w['price']:,.2f}" if w["price"] is not None else "—"
+            checked = datetime.fromtimestamp(w["checked_ts"]).strftime("%Y-%m-%d %H:%M") if w["checked_ts"] else "never"
+            print(f"#{w['id']:<4} {w['kind']:<8} {price:>12}  {checked}  {w['title'] or w['target']}")
+        return 0
+    
+    if args.action == "alerts":
+        for a in store.alerts(unseen_only=not args.all, mark_seen=True):
+            when = datetime.fromtimestamp(a["ts"]).strftime("%Y-%m-%d %H:%M")
+            arrow = "⬇️" if a["new_price"] < a["old_price"] else "⬆️"
+            print(f"{when} {arrow} {a['old_price']:,.2f} → {a['new_price']:,.2f}  {a['title']}  {a['link']}")
+        return 0
+    
+    from core import Scraper
+    checker = WatchChecker(Scraper(logger=print if args.verbose else None), store)
+    while True:
+        stats = checker.check_due(force=args.action == "check" and args.all)
+        if stats["checked"]:
+            print(", ".join(f"{k}: {v}" for k, v in stats.items()))
+        if args.action == "check":
+            return 0
+        next_ts = store.next_due()
+        time.sleep(max(60.0, (next_ts or time.time() + 3600) - time.time()))
+
+
+def run_enqueue(args):
+    from core.workqueue import open_queue
+    
+    queue = open_queue(args.queue)
+    tasks = [("keyword", kw, args.intent or "") for kw in args.keywords]
+    if args.products:
+        try:
+            with open(args.products, encoding="utf-8") as f:
+                links = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        except OSError as e:
+            print(f"❌ {e}")
+            return 2
+        from core.watchlist import retailer_for
+        unknown = [link for link in links if retailer_for(link) is None]
+        for link in unknown:
+            print(f"⚠️ Skipped {link}: not on a configured retailer")
+        tasks += [("product", link, "") for link in links if link not in unknown]
+    if args.requeue:
+        print(f"Requeued {queue.requeue(('done', 'failed'))} finished tasks")
+    if tasks:
+        print(f"Queued {queue.enqueue(tasks)} new of {len(tasks)} tasks")
+    print(", ".join(f"{k}: {v}" for k, v in queue.counts().items()))
+    return 0
+
+
+def run_workers(args):
+    from concurrent.futures import ProcessPoolExecutor
+    from core.workqueue import open_queue, run_worker
+    
+    queue = open_queue(args.queue)
+    kwargs = dict(threads=args.threads, until_empty=not args.forever, verbose=args.verbose,
+                  parse_workers=args.parse_workers)
+    if args.processes <= 1:
+        stats = [run_worker(args.queue, **kwargs)]
+    else:
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            futures = [executor.submit(run_worker, args.queue, **kwargs) for _ in range(args.processes)]
+            stats = [f.result() for f in futures]
+    print(f"Worked {sum(s['done'] for s in stats)} tasks, "
+          f"{sum(s['failed'] for s in stats)} attempts failed")
+    print(", ".join(f"{k}: {v}" for k, v in queue.counts().items()))
+    return 1 if queue.counts()["failed"] else 0
+
+
+def run_app(args):
     from ui import PRICIOApp
     
-    app = PRICIOApp()
+    app = PRICIOApp(service_url=args.service)
     app.mainloop()
+    return 0
+
+
+def main(argv=None):
+    from config import SERVICE_HOST, SERVICE_PORT, WATCH_INTERVAL_SEC, WORKQUEUE_THREADS
+    
+    parser = argparse.ArgumentParser(prog="pricio")
+    parser.add_argument("--service", metavar="URL", help="search through a shared PRICIO service")
+    sub = parser.add_subparsers(dest="command")
+    
+    sync = sub.add_parser("sync", help="sync retailer catalogues into data/catalogue.db")
+    sync.add_argument("--full", action="store_true", help="re-download everything")
+    sync.set_defaults(func=run_sync)
+    
+    serve = sub.add_parser("serve", help="run the shared HTTP search service")
+    serve.add_argument("--host", default=SERVICE_HOST)
+    serve.add_argument("--port", type=int, default=SERVICE_PORT)
+    serve.set_defaults(func=run_serve)
+    
+    quote = sub.add_parser("quote", help="price a bill of materials (CSV or JSON)")
+    quote.add_argument("bom", help="CSV with keyword,qty[,intent] columns or a JSON list")
+    quote.add_argument("-o", "--output", help="write the quote as CSV")
+    quote.add_argument("--catalogue", action="store_true", help="price from data/catalogue.db")
+    quote.set_defaults(func=run_quote)
+    
+    watch = sub.add_parser("watch", help="watch products and searches for price changes")
+    watch.set_defaults(func=run_watch)
+    wsub = watch.add_subparsers(dest="action", required=True)
+    w_add = wsub.add_parser("add", help="watch a product link (or a search with --keyword)")
+    w_add.add_argument("target", help="product link, or keyword with --keyword")
+    w_add.add_argument("--keyword", action="store_true", help="watch a keyword search")
+    w_add.add_argument("--intent", choices=["materials", "electronics"])
+    w_add.add_argument("--every", type=float, default=WATCH_INTERVAL_SEC / 3600, help="hours between checks")
+    w_remove = wsub.add_parser("remove", help="stop watching")
+    w_remove.add_argument("id", type=int)
+    wsub.add_parser("list", help="show watches and last known prices")
+    w_alerts = wsub.add_parser("alerts", help="show price changes not yet seen")
+    w_alerts.add_argument("--all", action="store_true", help="include alerts already shown")
+    for name, text in (("check", "check due watches once (for cron)"), ("run", "keep checking on schedule")):
+        w = wsub.add_parser(name, help=text)
+        w.add_argument("-v", "--verbose", action="store_true")
+        if name == "check":
+            w.add_argument("--all", action="store_true", help="check every watch, not just due ones")
+    
+    stats = sub.add_parser("stats", help="price statistics from a columnar snapshot")
+    stats.add_argument("keyword", nargs="?", help="only products whose title has these words")
+    stats.add_argument("--snapshot", default="data/catalogue.col", help="snapshot file to read")
+    stats.set_defaults(func=run_stats)
+    
+    enqueue = sub.add_parser("enqueue", help="add keyword or product-URL tasks to the crawl queue")
+    enqueue.add_argument("keywords", nargs="*", help="keywords to search")
+    enqueue.add_argument("--products", metavar="FILE", help="file with one product link per line")
+    enqueue.add_argument("--intent", choices=["materials", "electronics"])
+    enqueue.add_argument("--requeue", action="store_true", help="run finished tasks again")
+    enqueue.add_argument("--queue", metavar="URL", help="queue database (default data/workqueue.db)")
+    enqueue.set_defaults(func=run_enqueue)
+    
+    worker = sub.add_parser("worker", help="crawl queued tasks")
+    worker.add_argument("--processes", type=int, default=1, help="worker processes on this machine")
+    worker.add_argument("--threads", type=int, default=WORKQUEUE_THREADS, help="tasks per process")
+    worker.add_argument("--parse-workers", type=int, default=0, metavar="N",
+                        help="search keyword tasks in batches, parsing in N processes")
+    worker.add_argument("--forever", action="store_true", help="keep polling for new tasks")
+    worker.add_argument("--queue", metavar="URL", help="queue database (default data/workqueue.db)")
+    worker.add_argument("-v", "--verbose", action="store_true")
+    worker.set_defaults(func=run_workers)
+    
+    args = parser.parse_args(argv)
+    return getattr(args, "func", run_app)(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1 @@
+# Unit and integration tests (python -m pytest)
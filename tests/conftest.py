@@ -0,0 +1,34 @@
+# Shared fixtures: local retailer servers from benchmarks/fixture_server.py
+
+
+import pytest
+
+from benchmarks.fixture_server import start_servers, local_retailers
+from benchmarks.run import make_scraper
+
+
+@pytest.fixture
+def serve():
+    # serve("Ace", "PCX", latency=...) -> {name: FixtureServer}; stopped after the test
+    started = []
+
+    def start(*names, **kwargs):
+        servers = start_servers(names, **kwargs)
+        started.extend(servers.values())
+        return servers
+
+    yield start
+    for srv in started:
+        srv.stop()
+
+
+@pytest.fixture
+def scraper_for():
+    # scraper_for(servers) -> Scraper searching only those servers, unthrottled
+    def build(servers: dict, **overrides):
+        retailers = local_retailers(servers)
+        for cfg in retailers.values():
+            cfg.update(overrides)
+        return make_scraper(retailers)
+
+    return build
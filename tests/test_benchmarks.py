@@ -0,0 +1,96 @@
+# Benchmark harness: fixture replay, recording and result checks
+
+
+import shutil
+from urllib.parse import urlparse
+
+import pytest
+
+import benchmarks.fixture_server as fixture_server
+import benchmarks.record as record
+from benchmarks.fixture_server import start_servers, local_retailers
+from benchmarks.run import KEYWORDS, compare, verify, make_scraper, make_scraper_html
+from config import RETAILERS
+from core import shopify
+
+
+@pytest.fixture
+def servers():
+    running = start_servers()
+    yield running
+    for srv in running.values():
+        srv.stop()
+
+
+@pytest.mark.parametrize("engine", [make_scraper, make_scraper_html])
+def test_searches_match_the_fixtures(servers, engine):
+    assert verify(engine(local_retailers(servers)), servers, KEYWORDS[:15]) == []
+
+
+def test_marketplace_searches_match_the_fixtures():
+    running = start_servers(("Lazada", "Shopee"))
+    try:
+        engine = make_scraper(local_retailers(running))
+        assert verify(engine, running, KEYWORDS[:15], marketplace=True) == []
+    finally:
+        for srv in running.values():
+            srv.stop()
+
+
+def test_broken_parser_is_reported(servers, monkeypatch):
+    monkeypatch.setattr(shopify, "_price", lambda value: 1.0)
+    problems = verify(make_scraper(local_retailers(servers)), servers, ["plywood"])
+    assert problems and all("expected" in p for p in problems)
+
+
+def test_recorded_pages_replay_with_their_expected_results(tmp_path, monkeypatch):
+    # Record from one set of servers, replay the copy from a fresh set
+    for name in ("ace", "pcx", "lazada"):
+        shutil.copytree(fixture_server.FIXTURES_DIR / name, tmp_path / name)
+    live = start_servers(("Ace", "PCX", "Lazada"))
+    try:
+        monkeypatch.setattr(record, "RETAILERS", local_retailers(live))
+        monkeypatch.setattr(record, "FIXTURES_DIR", tmp_path)
+        monkeypatch.setattr(record, "print", lambda *a, **k: None, raising=False)
+        record.record("plywood", ["Ace", "PCX"])
+        record.record("ssd", ["Lazada"])
+        # Lazada links are absolute; a live recording has the site's own host in them
+        catalog = tmp_path / "lazada" / "recorded" / "catalog_1.json"
+        live_host = urlparse(RETAILERS["Lazada"]["base"]).netloc
+        catalog.write_text(
+            catalog.read_text(encoding="utf-8").replace(urlparse(live["Lazada"].base_url).netloc, live_host),
+            encoding="utf-8",
+        )
+    finally:
+        for srv in live.values():
+            srv.stop()
+    assert (tmp_path / "ace" / "recorded" / "suggest.json").exists()
+    assert (tmp_path / "ace" / "recorded" / "search.html").exists()
+    assert (tmp_path / "lazada" / "recorded" / "catalog_1.json").exists()
+
+    monkeypatch.setattr(fixture_server, "FIXTURES_DIR", tmp_path)
+    replay = start_servers(("Ace", "PCX", "Lazada"))
+    try:
+        shops = {n: replay[n] for n in ("Ace", "PCX")}
+        for engine in (make_scraper, make_scraper_html):
+            assert verify(engine(local_retailers(shops)), shops, ["plywood"]) == []
+        market = {"Lazada": replay["Lazada"]}
+        assert verify(make_scraper(local_retailers(market)), market, ["ssd"], marketplace=True) == []
+        # Keywords that weren't recorded have no expectation
+        assert replay["Ace"].store.expected_results("lumber", "materials") is None
+    finally:
+        for srv in replay.values():
+            srv.stop()
+
+
+def test_only_machine_independent_metrics_fail_the_check():
+    base = {"w": {"throughput_ops": 100.0, "p99_ms": 5.0, "peak_mem_kb": 10.0,
+                  "kb_per_op": 20.0, "requests_per_op": 2.0}}
+    slow = {"w": {"throughput_ops": 10.0, "p99_ms": 50.0, "peak_mem_kb": 100.0,
+                  "kb_per_op": 20.0, "requests_per_op": 2.0}}
+    regressions, slower = compare(slow, base)
+    assert regressions == [] and len(slower) == 3
+
+    chatty = {"w": dict(base["w"], requests_per_op=3.0, kb_per_op=21.0)}
+    regressions, _ = compare(chatty, base)
+    assert regressions == ["w: requests_per_op 3.0 > baseline 2.0"]
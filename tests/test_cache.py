@@ -0,0 +1,67 @@
+# Search cache keys, subsumption and expiry
+
+
+import subprocess
+import sys
+import time
+
+from core.query import canonical_query, search_cache
+from utils.cache import SearchCache
+
+
+def _result(title, price=100.0, store="shop.example"):
+    return {"title": title, "price": price, "store": store, "rel": 1.0, "link": f"https://{store}/{title}"}
+
+
+def test_canonical_keys_share_entries():
+    cache = search_cache()
+    cache.set("2x4 Lumber", "materials", [_result("Coco Lumber 2x4")])
+    assert cache.get("lumber,  2x4", "materials") is not None
+    assert cache.get("2x4 lumber", "electronics") is None
+
+
+def test_lossy_synonyms_are_not_applied():
+    assert canonical_query("memory card") != canonical_query("ram card")
+    assert canonical_query("3 ply mask") != canonical_query("3 plywood mask")
+    assert canonical_query("graphics card") == canonical_query("gpu")
+
+
+def test_narrower_query_served_from_broader():
+    cache = search_cache()
+    cache.set("plywood", "materials", [_result("Marine Plywood 1/2"), _result("Ordinary Plywood 1/4")])
+    assert [r["title"] for r in cache.get("marine plywood", "materials")] == ["Marine Plywood 1/2"]
+    assert cache.stats["subsumed"] == 1
+
+
+def test_expired_broader_entry_is_a_miss():
+    cache = search_cache(ttl_sec=0.05)
+    cache.set("plywood", "materials", [_result("Marine Plywood 1/2")])
+    time.sleep(0.06)
+    assert cache.get("marine plywood", "materials") is None
+    assert cache.cache == {}
+
+
+def test_broader_entry_evicted_during_lookup():
+    # Another thread expires the broader entry between listing and reading it
+    cache = search_cache()
+    cache.set("plywood", "materials", [_result("Marine Plywood 1/2")])
+
+    class Evicting(dict):
+        def __iter__(self):
+            keys = list(super().__iter__())
+            self.clear()
+            return iter(keys)
+
+    cache.cache = Evicting(cache.cache)
+    assert cache.get("marine plywood", "materials") is None
+
+
+def test_typed_keys_without_core():
+    cache = SearchCache()
+    cache.set(" Plywood ", "materials", [_result("Marine Plywood")])
+    assert cache.get("plywood", "materials") is not None
+    assert cache.get("marine plywood", "materials") is None
+
+    # utils does not depend on core
+    code = "import sys, utils; sys.exit(any(m == 'core' or m.startswith('core.') for m in sys.modules))"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
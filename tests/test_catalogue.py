@@ -0,0 +1,80 @@
+# Catalogue sync: full products.json sync, sitemap deltas and partial listings
+
+
+import pytest
+
+import core.catalogue
+from core.catalogue import CatalogueStore, CatalogueSync
+
+
+@pytest.fixture
+def pcx(serve, scraper_for, tmp_path):
+    # (fixture server, CatalogueSync) for PCX with its Shopify adapter
+    servers = serve("PCX")
+    store = CatalogueStore(tmp_path / "catalogue.db")
+    return servers["PCX"], CatalogueSync(scraper_for(servers), store)
+
+
+def _fail(srv, failing_path: str, page: str = None):
+    # Make one path (one page of it, if given) of the server answer 404
+    route = srv.route
+
+    def patched(path, query):
+        if path == failing_path and (page is None or query.get("page") == [page]):
+            return 404, "text/plain", b"not found"
+        return route(path, query)
+    srv.route = patched
+
+
+def test_full_sync(pcx):
+    srv, sync = pcx
+    catalog = srv.store.catalog
+    stats = sync.sync("PCX")
+
+    assert stats == {"added": len(catalog), "changed": 0, "removed": 0, "unchanged": 0}
+    assert srv.requests == 1   # one products.json page
+    assert sync.store.count("PCX") == len(catalog)
+    assert sync.store.is_fresh("PCX")
+    titles = [r["title"] for r in sync.store.search("ssd", "electronics")]
+    assert "Samsung 980 1TB NVMe M.2 SSD" in titles
+
+
+def test_sitemap_delta(pcx):
+    srv, sync = pcx
+    sync.sync("PCX")
+    srv.requests = 0
+    catalog = srv.store.catalog
+    changed, gone = list(catalog)[:2]
+    catalog[changed].update(price=123.0, updated_at="2030-01-01T00:00:00+08:00")
+    del catalog[gone]
+
+    stats = sync.sync("PCX")
+    assert stats == {"added": 0, "changed": 1, "removed": 1, "unchanged": len(catalog) - 1}
+    assert srv.requests == 3   # sitemap index, products sub-sitemap, one product JSON
+    assert sync.store.count("PCX") == len(catalog)
+    assert sync.store.updated_map("PCX")[f"{srv.base_url}/products/{changed}"] is not None
+    prices = {r["title"]: r["price"] for r in sync.store.search(catalog[changed]["title"], "electronics")}
+    assert prices[catalog[changed]["title"]] == 123.0
+
+
+def test_failed_child_sitemap_keeps_the_snapshot(pcx):
+    srv, sync = pcx
+    sync.sync("PCX")
+    synced = sync.store.last_synced("PCX")
+    _fail(srv, "/sitemap_products_1.xml")
+
+    stats = sync.sync("PCX")
+    assert stats["failed"] and stats["removed"] == 0
+    assert sync.store.count("PCX") == len(srv.store.catalog)
+    assert sync.store.last_synced("PCX") == synced
+
+
+def test_partial_products_json_is_not_marked_synced(pcx, monkeypatch):
+    srv, sync = pcx
+    monkeypatch.setattr(core.catalogue, "CATALOGUE_PAGE_SIZE", 5)
+    _fail(srv, "/products.json", page="2")
+
+    stats = sync.sync("PCX")
+    assert stats["partial"] and stats["added"] == 5
+    assert sync.store.count("PCX") == 5
+    assert sync.store.last_synced("PCX") is None
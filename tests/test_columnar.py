@@ -0,0 +1,86 @@
+# Columnar snapshots: round trips, missing values and queries on the mapping
+
+
+import json
+import struct
+import sys
+
+import pytest
+
+from core.catalogue import SNAPSHOT_COLUMNS
+from utils.columnar import MAGIC, ColumnarSnapshot, write_snapshot
+from utils.helpers import build_result, calculate_price_stats
+
+
+def _results():
+    return [
+        build_result("Marine Plywood 1/2\"", 689.75, "PHP", "https://acehardware.ph/products/a", 1.0, True),
+        build_result("Plywood — Ordinary 1/4", None, None, "https://wilcon.com.ph/products/b", 0.75, False),
+        build_result("Pintura ñ Latex 4L 🎨", 455.5, "PHP", "https://acehardware.ph/products/c", 0.5, True),
+        build_result("合板 12mm", 1245.0, "PHP", "https://pcx.com.ph/products/d", 0.25, False),
+    ]
+
+
+def test_round_trip(tmp_path):
+    results = _results()
+    path = write_snapshot(tmp_path / "last.col", results, meta={"keyword": "plywood"})
+    with ColumnarSnapshot(path) as snap:
+        assert len(snap) == 4
+        assert snap.meta == {"keyword": "plywood"}
+        assert snap.rows() == [{k: r[k] for k in snap.types} for r in results]
+        assert snap.results() == [dict(r, cur=r["cur"] or "—") for r in results]
+        assert snap.row(2)["title"] == "Pintura ñ Latex 4L 🎨"
+        assert snap.column("title")[-1] == "合板 12mm"
+        assert list(snap.column("store")) == [r["store"] for r in results]
+    assert not path.with_name("last.col.tmp").exists()
+
+
+def test_empty_set(tmp_path):
+    with ColumnarSnapshot(write_snapshot(tmp_path / "empty.col", [])) as snap:
+        assert len(snap) == 0
+        assert snap.rows() == [] and snap.results() == []
+        assert snap.where("store", "acehardware.ph") == []
+        assert snap.price_stats() == calculate_price_stats([])
+
+
+def test_missing_prices(tmp_path):
+    rows = [{"retailer": "Ace", "title": "No price", "price": None, "link": "x"},
+            {"retailer": "Ace", "title": "Free", "price": 0.0, "link": "y"}]
+    with ColumnarSnapshot(write_snapshot(tmp_path / "cat.col", rows, SNAPSHOT_COLUMNS)) as snap:
+        assert [r["price"] for r in snap.rows()] == [None, 0.0]
+        assert snap.rows()[0]["updated_ts"] is None and snap.rows()[0]["cur"] == ""
+        assert snap.prices() == [0.0]
+        assert snap.results()[0]["price_disp"] == "—"
+
+
+def test_where_and_price_stats_match_the_rows(tmp_path):
+    results = _results() * 3
+    with ColumnarSnapshot(write_snapshot(tmp_path / "last.col", results)) as snap:
+        assert snap.price_stats() == calculate_price_stats(results)
+        for store in ("acehardware.ph", "wilcon.com.ph", "pcx.com.ph", "nowhere.ph"):
+            hits = snap.where("store", store)
+            expected = [r for r in results if r["store"] == store]
+            assert hits == [i for i, r in enumerate(results) if r["store"] == store]
+            assert snap.price_stats(hits) == calculate_price_stats(expected)
+        assert snap.where("title", "合板 12mm") == [3, 7, 11]
+
+
+def test_rejects_other_files(tmp_path):
+    bad = tmp_path / "bad.col"
+    for content in (b"", b"not a snapshot at all", MAGIC + b"truncated"):
+        bad.write_bytes(content)
+        with pytest.raises(ValueError, match="not a columnar snapshot"):
+            ColumnarSnapshot(bad)
+
+
+def test_rejects_other_byte_order(tmp_path):
+    path = write_snapshot(tmp_path / "last.col", _results())
+    data = path.read_bytes()
+    tail = len(MAGIC) + 8
+    (size,) = struct.unpack("<Q", data[-tail:-len(MAGIC)])
+    footer = json.loads(data[-tail - size:-tail])
+    footer["byteorder"] = "big" if sys.byteorder == "little" else "little"
+    encoded = json.dumps(footer).encode("utf-8")
+    path.write_bytes(data[:-tail - size] + encoded + struct.pack("<Q", len(encoded)) + MAGIC)
+    with pytest.raises(ValueError, match="-endian machine"):
+        ColumnarSnapshot(path)
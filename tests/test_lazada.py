@@ -0,0 +1,110 @@
+# Lazada catalog JSON adapter and what happens when the payload isn't one
+
+
+import json
+from pathlib import Path
+
+from core import infer_intent, lazada
+
+
+BASE = "https://www.lazada.com.ph"
+FIXTURE = Path(__file__).parent / "fixtures" / "lazada_catalog.json"
+
+
+def _catalog() -> dict:
+    return json.loads(FIXTURE.read_text(encoding="utf-8"))
+
+
+def _search(scraper, keyword):
+    return scraper.search_parallel(keyword, infer_intent(keyword))
+
+
+def _serve_html(srv, search_html: bytes, product_html: bytes):
+    # The storefront pages behind the JSON endpoint: one search page, one product template
+    route = srv.route
+
+    def html_route(path, query):
+        if path == "/catalog/" and query.get("ajax"):
+            return route(path, query)
+        return 200, "text/html; charset=utf-8", search_html if path == "/catalog/" else product_html
+
+    srv.route = html_route
+
+
+def test_parse_search_reads_items():
+    items, more = lazada.parse_search(_catalog(), BASE)
+    assert items == [
+        {"title": "Marine Plywood 1/2 inch 4x8 ft Waterproof", "price": 1245.0,
+         "link": f"{BASE}/products/marine-plywood-12-inch-4x8-ft-waterproof-i3456789012-s15678901234.html?search=1"},
+        # Empty "price": priceShow with its peso sign and thousands separator
+        {"title": "Phenolic Plywood 3/4 inch 4x8 ft", "price": 2310.5,
+         "link": f"{BASE}/products/phenolic-plywood-34-inch-4x8-ft-i3456789013-s15678901240.html?search=1"},
+        # Unparseable price, no priceShow
+        {"title": "Ordinary Plywood 1/4 inch 4x8 ft", "price": None,
+         "link": f"{BASE}/products/ordinary-plywood-14-inch-4x8-ft-i3456789014-s15678901251.html"},
+    ]
+    # Page 1 of 40 holds all 5 results
+    assert more is False
+
+
+def test_parse_search_paging_without_main_info():
+    data = _catalog()
+    del data["mainInfo"]
+    assert lazada.parse_search(data, BASE)[1] is True
+    assert lazada.parse_search({"mods": {"listItems": []}}, BASE) == ([], False)
+
+
+def test_parse_search_malformed_payload_is_none():
+    captcha = {"rgv587_flag": "sm", "url": "https://www.lazada.com.ph/_____tmd_____/punish"}
+    for data in (None, [], captcha, {"mods": None}, {"mods": {}}):
+        assert lazada.parse_search(data, BASE) == (None, False)
+
+
+def test_adapter_results(serve, scraper_for):
+    servers = serve("Lazada")
+    srv = servers["Lazada"]
+    srv.store.lazada_json = lambda base_url, query, page: FIXTURE.read_bytes()
+
+    results = _search(scraper_for(servers), "plywood")
+    # Links lose the ?search=1 tracking (profile drop_query) and take the scheme
+    # of the configured base (plain http here); currency is always PHP
+    live = "http://www.lazada.com.ph"
+    assert sorted((r["title"], r["price"], r["cur"], r["link"]) for r in results) == [
+        ("Marine Plywood 1/2 inch 4x8 ft Waterproof", 1245.0, "PHP",
+         f"{live}/products/marine-plywood-12-inch-4x8-ft-waterproof-i3456789012-s15678901234.html"),
+        ("Ordinary Plywood 1/4 inch 4x8 ft", None, "PHP",
+         f"{live}/products/ordinary-plywood-14-inch-4x8-ft-i3456789014-s15678901251.html"),
+        ("Phenolic Plywood 3/4 inch 4x8 ft", 2310.5, "PHP",
+         f"{live}/products/phenolic-plywood-34-inch-4x8-ft-i3456789013-s15678901240.html"),
+    ]
+    # All on one page: no second catalog request, no product pages
+    assert srv.requests == 1
+
+
+def test_malformed_payload_without_fallback_is_no_results(serve, scraper_for):
+    servers = serve("Lazada")
+    srv = servers["Lazada"]
+    srv.store.lazada_json = lambda base_url, query, page: b'{"rgv587_flag": "sm"}'
+
+    assert _search(scraper_for(servers), "plywood") == []
+    assert srv.requests == 1
+
+
+def test_malformed_payload_falls_back_to_html(serve, scraper_for):
+    servers = serve("Lazada")
+    srv = servers["Lazada"]
+    srv.store.lazada_json = lambda base_url, query, page: b"<html>captcha</html>"
+    _serve_html(
+        srv,
+        b'<a href="/products/marine-plywood-i3456789012-s15678901234.html">Marine Plywood</a>',
+        '<html><head><title>Marine Plywood 1/2 inch | Lazada PH</title></head>'
+        '<body><span class="pdp-price">₱1,245.00</span></body></html>'.encode(),
+    )
+
+    results = _search(scraper_for(servers, html_fallback=True), "plywood")
+    assert [(r["title"], r["price"], r["link"]) for r in results] == [
+        ("Marine Plywood 1/2 inch | Lazada PH", 1245.0,
+         f"{srv.base_url}/products/marine-plywood-i3456789012-s15678901234.html"),
+    ]
+    # Catalog JSON, search page, product page
+    assert srv.requests == 3
@@ -0,0 +1,67 @@
+# Metrics collection and export formats
+
+
+import json
+import re
+
+from utils.metrics import Metrics
+
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+
+
+def _collected() -> Metrics:
+    metrics = Metrics()
+    for seconds in (0.1, 0.2, 0.3):
+        metrics.observe("http_ttfb", seconds, "Ace")
+    metrics.observe("search", 0.5)
+    metrics.incr("requests", 3, retailer="Ace")
+    metrics.incr("requests", 2, retailer="PCX")
+    metrics.incr("http_404", retailer="PCX")
+    metrics.incr("cache_hits")
+    return metrics
+
+
+def test_snapshot_groups_by_retailer():
+    snap = _collected().snapshot()["retailers"]
+    assert snap["Ace"]["timings"]["http_ttfb"]["count"] == 3
+    assert snap["Ace"]["timings"]["http_ttfb"]["max_sec"] == 0.3
+    assert snap["PCX"]["counters"] == {"requests": 2, "http_404": 1}
+    assert snap["all"]["counters"] == {"cache_hits": 1}
+
+
+def test_prometheus_families_are_declared_and_named(tmp_path):
+    path = tmp_path / "metrics.prom"
+    _collected().export_prometheus(path)
+    types, helps, samples = {}, set(), []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ", 3)
+            assert name not in types, f"{name} declared twice"
+            types[name] = kind
+        elif line.startswith("# HELP "):
+            helps.add(line.split(" ", 3)[2])
+        else:
+            m = SAMPLE.match(line)
+            assert m, line
+            samples.append(m.group(1))
+            float(m.group(3))
+
+    assert set(types) == helps
+    for name in samples:
+        family = name if name in types else re.sub(r"_(sum|count)$", "", name)
+        assert family in types, f"{name} has no TYPE line"
+    for name, kind in types.items():
+        if kind == "counter":
+            assert name.endswith("_total"), name
+    assert types["pricio_stage_seconds"] == "summary"
+    assert types["pricio_requests_total"] == "counter"
+    assert types["pricio_http_404_total"] == "counter"
+    assert samples.count("pricio_requests_total") == 2
+
+
+def test_export_json_round_trips(tmp_path):
+    path = tmp_path / "out" / "metrics.json"
+    _collected().export_json(path)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["retailers"]["Ace"]["counters"]["requests"] == 3
@@ -0,0 +1,62 @@
+# BulkPipeline must return what Scraper.search_parallel returns
+
+
+from benchmarks.fixture_server import local_retailers
+from benchmarks.run import make_scraper
+from core import infer_intent
+from core.pipeline import BulkPipeline
+from core.workqueue import CrawlWorker, SqliteWorkQueue
+
+
+KEYWORDS = ["plywood", "cement", "ram ddr4", "paint brush", "no such thing"]
+
+
+def _rows(results):
+    return sorted((r["title"], r["price"], r["link"]) for r in results)
+
+
+def test_search_many_matches_scraper(serve):
+    # Shopify adapter (Ace), HTML scraping (PCX) and a paged marketplace (Lazada)
+    retailers = local_retailers(serve("Ace", "PCX", "Lazada"))
+    del retailers["PCX"]["adapter"]
+    scraper = make_scraper(retailers)
+    with BulkPipeline(scraper, workers=2, batch_size=4) as bulk:
+        many = bulk.search_many(KEYWORDS)
+
+    assert list(many) == KEYWORDS
+    for name in retailers:
+        assert any(r["link"].startswith(retailers[name]["base"]) for r in many["ram ddr4"] + many["plywood"]), name
+    for kw in KEYWORDS:
+        assert _rows(many[kw]) == _rows(scraper.search_parallel(kw, infer_intent(kw))), kw
+
+
+def test_search_many_reads_every_listing_page(serve):
+    # Extra search pages are followed exactly as the scraper follows them
+    servers = serve("PCX")
+    retailers = local_retailers(servers)
+    cfg = retailers["PCX"]
+    del cfg["adapter"]
+    cfg["profile"] = {**cfg.get("profile", {}), "pagination": {"param": "page", "pages": 3}}
+    scraper = make_scraper(retailers)
+
+    expected = _rows(scraper.search_parallel("ssd", infer_intent("ssd")))
+    inline = servers["PCX"].requests
+    assert inline == 3   # all three search pages; the cards are complete on the listing
+    servers["PCX"].requests = 0
+    with BulkPipeline(scraper, workers=1) as bulk:
+        assert _rows(bulk.search_many(["ssd"])["ssd"]) == expected
+    assert servers["PCX"].requests == inline
+
+
+def test_crawl_worker_runs_keyword_tasks_through_pipeline(serve, scraper_for, tmp_path):
+    scraper = scraper_for(serve("Ace", "PCX"))
+    queue = SqliteWorkQueue(tmp_path / "queue.db")
+    queue.enqueue([("keyword", kw, "") for kw in KEYWORDS])
+
+    with BulkPipeline(scraper, workers=1) as bulk:
+        stats = CrawlWorker(queue, scraper, threads=3, pipeline=bulk).run()
+
+    assert stats == {"done": len(KEYWORDS), "failed": 0}
+    results = {t["target"]: t["result"] for t in queue.results("keyword")}
+    for kw in KEYWORDS:
+        assert _rows(results[kw]) == _rows(scraper.search_parallel(kw, infer_intent(kw)))
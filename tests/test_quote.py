@@ -0,0 +1,118 @@
+# Bulk quotes: BOM parsing, match selection, totals and cancellation
+
+
+import json
+
+import pytest
+
+from core.quote import QuoteEngine, best_match, load_bom, price_line, summarize
+from utils.helpers import build_result
+
+
+def _result(title: str, price, store: str, handle: str = None):
+    link = f"https://{store}/products/{handle or title.lower().replace(' ', '-')}"
+    return build_result(title, price, "PHP", link, 1.0, True)
+
+
+def test_load_bom_csv(tmp_path):
+    path = tmp_path / "bom.csv"
+    path.write_text("﻿Keyword, Qty ,intent\nmarine plywood,4,\n\n,,\nram ddr4,,electronics\n",
+                    encoding="utf-8")
+    assert load_bom(path) == [
+        {"line": 2, "keyword": "marine plywood", "qty": 4.0, "intent": "materials"},
+        {"line": 5, "keyword": "ram ddr4", "qty": 1.0, "intent": "electronics"},
+    ]
+
+
+def test_load_bom_json(tmp_path):
+    path = tmp_path / "bom.json"
+    path.write_text(json.dumps({"items": [{"keyword": "cement", "qty": "2.5"}]}), encoding="utf-8")
+    assert load_bom(path) == [{"line": 1, "keyword": "cement", "qty": 2.5, "intent": "materials"}]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("item,qty\nplywood,1\n", "'keyword' column"),
+    ("keyword,qty\nplywood,two\n", "line 2: qty 'two' is not a number"),
+    ("keyword,qty\nplywood,0\n", "line 2: qty must be positive"),
+    ("keyword,qty\n,3\n", "line 2: keyword is missing"),
+    ("keyword,intent\nplywood,groceries\n", "line 2: intent must be one of"),
+])
+def test_load_bom_rejects_bad_lines(tmp_path, text, message):
+    path = tmp_path / "bom.csv"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError, match=message):
+        load_bom(path)
+
+
+def test_best_match_prefers_relevance_then_price():
+    results = [
+        _result("Marine Plywood 1/2 inch", 900.0, "acehardware.ph"),
+        _result("Marine Plywood 3/4 inch", 850.0, "wilcon.com.ph"),
+        _result("Plywood edge trim", 100.0, "handyman.com.ph"),
+        _result("Marine Plywood 1/4 inch", None, "citihardware.com"),
+    ]
+    assert best_match("marine plywood", results)["price"] == 850.0
+    # Below QUOTE_MIN_RELEVANCE, or no price
+    assert best_match("marine plywood", [_result("Wood edge trim", 100.0, "handyman.com.ph"),
+                                         results[3]]) is None
+
+
+def test_overall_match_applies_slack_across_stores():
+    plywood = _result("Marine Plywood 1/2 inch", 900.0, "acehardware.ph")
+    trim = _result("Plywood edge trim", 100.0, "handyman.com.ph")
+    line = {"line": 2, "keyword": "marine plywood", "qty": 3.0, "intent": "materials"}
+
+    priced = price_line(line, [plywood, trim])
+    assert priced["match"] == plywood == best_match("marine plywood", [plywood, trim])
+    assert priced["subtotal"] == 2700.0
+    assert priced["stores"] == {"acehardware.ph": plywood, "handyman.com.ph": trim}
+
+
+def test_summarize_totals():
+    line = lambda n, kw, qty: {"line": n, "keyword": kw, "qty": qty, "intent": "materials"}
+    priced = [
+        price_line(line(3, "portland cement", 1.0), []),
+        price_line(line(2, "marine plywood", 2.0), [
+            _result("Marine Plywood 1/2 inch", 900.0, "acehardware.ph"),
+            _result("Marine Plywood 1/2 inch", 950.0, "wilcon.com.ph"),
+        ]),
+        price_line(line(4, "pvc pipe", 10.0), [_result("PVC Pipe 1/2 inch", 80.0, "wilcon.com.ph")]),
+    ]
+    quote = summarize(priced)
+
+    assert [p["line"] for p in quote["lines"]] == [2, 3, 4]
+    assert quote["retailers"] == {
+        "acehardware.ph": {"total": 1800.0, "lines": 1, "missing": [3, 4]},
+        "wilcon.com.ph": {"total": 2700.0, "lines": 2, "missing": [3]},
+    }
+    assert quote["split"] == {"total": 2600.0,
+                              "by_store": {"acehardware.ph": 1800.0, "wilcon.com.ph": 800.0}}
+    assert quote["unpriced"] == [3] and quote["skipped"] == []
+
+
+class _Searcher:
+    # search_parallel stand-in; the first search cancels the quote
+    def __init__(self):
+        self.engine = None
+        self.searched = []
+
+    def search_parallel(self, keyword, intent):
+        self.searched.append(keyword)
+        self.engine.cancel()
+        return [_result(f"{keyword} deluxe", 100.0, "acehardware.ph")]
+
+
+def test_cancelled_lines_are_skipped_not_unpriced():
+    searcher = _Searcher()
+    engine = searcher.engine = QuoteEngine(searcher, workers=1)
+    lines = [{"line": n, "keyword": kw, "qty": 1.0, "intent": "materials"}
+             for n, kw in enumerate(["cement", "plywood", "Plywood", "gravel"], 2)]
+    seen = []
+    quote = engine.run(lines, on_line=lambda p, done, total: seen.append((p["line"], done, total)))
+
+    # One worker: the first line is searched, the other keywords never start
+    assert searcher.searched == ["cement"]
+    assert sorted(n for n, _, _ in seen) == [2, 3, 4, 5] and seen[-1][1:] == (4, 4)
+    assert [p["line"] for p in quote["lines"] if p["match"]] == [2]
+    assert quote["skipped"] == [3, 4, 5] and quote["unpriced"] == []
+    assert engine.cache.get("gravel", "materials") is None
@@ -0,0 +1,101 @@
+# Circuit breaker transitions and retry delays
+
+
+import threading
+import time
+
+from core.resilience import CircuitBreaker, parse_retry_after, retry_delay
+
+
+HOST = "shop.example"
+
+
+def _tripped(cooldown: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=3, cooldown_sec=cooldown)
+    for _ in range(3):
+        breaker.record_failure(HOST)
+    return breaker
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(threshold=3, cooldown_sec=60)
+    breaker.record_failure(HOST)
+    breaker.record_failure(HOST)
+    assert breaker.allow(HOST) and not breaker.is_open(HOST)
+    breaker.record_failure(HOST)
+    assert breaker.is_open(HOST)
+    assert not breaker.allow(HOST)
+    assert breaker.allow("other.example")
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(threshold=3, cooldown_sec=60)
+    breaker.record_failure(HOST)
+    breaker.record_failure(HOST)
+    breaker.record_success(HOST)
+    breaker.record_failure(HOST)
+    breaker.record_failure(HOST)
+    assert breaker.allow(HOST)
+
+
+def test_half_open_lets_exactly_one_probe_through():
+    breaker = _tripped()
+    time.sleep(0.06)
+    assert not breaker.is_open(HOST)
+
+    allowed = []
+    barrier = threading.Barrier(8)
+
+    def caller():
+        barrier.wait()
+        allowed.append(breaker.allow(HOST))
+
+    threads = [threading.Thread(target=caller) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert allowed.count(True) == 1
+    # Still skipped while the probe is out
+    assert breaker.is_open(HOST)
+
+
+def test_probe_success_closes():
+    breaker = _tripped()
+    time.sleep(0.06)
+    assert breaker.allow(HOST)
+    breaker.record_success(HOST)
+    assert not breaker.is_open(HOST)
+    assert all(breaker.allow(HOST) for _ in range(5))
+    # A fresh run of failures is needed to trip it again
+    breaker.record_failure(HOST)
+    assert breaker.allow(HOST)
+
+
+def test_probe_failure_reopens_for_another_cooldown():
+    breaker = _tripped()
+    time.sleep(0.06)
+    assert breaker.allow(HOST)
+    breaker.record_failure(HOST)
+    assert breaker.is_open(HOST)
+    assert not breaker.allow(HOST)
+    time.sleep(0.06)
+    assert breaker.allow(HOST)
+    assert not breaker.allow(HOST)
+
+
+def test_silent_probe_is_written_off_after_a_cooldown():
+    breaker = _tripped()
+    time.sleep(0.06)
+    assert breaker.allow(HOST)
+    assert not breaker.allow(HOST)
+    time.sleep(0.06)
+    assert breaker.allow(HOST)
+
+
+def test_retry_after_is_honoured_and_capped():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("soon") is None
+    assert retry_delay(0, "2") == 2.0
+    assert retry_delay(0, "3600") <= 10
+    assert 0.5 <= retry_delay(0) <= 1.0
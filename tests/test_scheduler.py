@@ -0,0 +1,123 @@
+# Per-host slots: priority order, concurrency cap, spacing, shared budget
+
+
+import threading
+import time
+
+from core.ratelimit import SharedRateLimiter
+from core.scheduler import RequestScheduler, fetch_priority
+
+
+def _wait_queued(scheduler, host, n):
+    deadline = time.monotonic() + 5
+    while sum(scheduler.queued().get(host, {}).values()) < n:
+        assert time.monotonic() < deadline, scheduler.queued()
+        time.sleep(0.005)
+
+
+def _served_order(scheduler, host="h"):
+    # A bulk fetch holds the only slot while three bulk fetches and then one
+    # interactive fetch queue up; returns the order the queued ones got in
+    order = []
+
+    def fetch(priority, name):
+        with fetch_priority(priority), scheduler.slot(host):
+            order.append(name)
+
+    holder = scheduler.acquire(host)
+    threads = []
+    for i, (priority, name) in enumerate([("bulk", "b1"), ("bulk", "b2"), ("watchlist", "w"),
+                                          ("interactive", "i")]):
+        t = threading.Thread(target=fetch, args=(priority, name))
+        t.start()
+        threads.append(t)
+        _wait_queued(scheduler, host, i + 1)
+    scheduler.release(host)
+    for t in threads:
+        t.join(5)
+    return order
+
+
+def test_priority_without_interval():
+    # The concurrency cap alone queues fetches, and they are served by class
+    assert _served_order(RequestScheduler(interval=0, concurrency=1)) == ["i", "w", "b1", "b2"]
+
+
+def test_priority_with_shared_budget(tmp_path):
+    # Crawl workers space requests through the shared budget; priority still applies
+    shared = SharedRateLimiter(tmp_path / "slots.db", interval=0.02)
+    scheduler = RequestScheduler(interval=0, concurrency=1, shared=shared)
+    assert _served_order(scheduler) == ["i", "w", "b1", "b2"]
+
+
+def test_concurrency_cap():
+    scheduler = RequestScheduler(interval=0, concurrency=2)
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def fetch():
+        with scheduler.slot("h"):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.03)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=fetch) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert peak[0] == 2
+    assert scheduler.queued() == {}
+
+
+def test_interval_spacing_per_host():
+    scheduler = RequestScheduler(interval=0.05, concurrency=0)
+    starts = []
+    for _ in range(4):
+        with scheduler.slot("h"):
+            starts.append(time.monotonic())
+    with scheduler.slot("other") as waited:
+        assert waited < 0.01
+    assert all(b - a >= 0.045 for a, b in zip(starts, starts[1:]))
+
+
+def test_interval_spacing_behind_a_concurrency_backlog():
+    # Fetches that queued for a free slot are still spaced from the last start
+    scheduler = RequestScheduler(interval=0.05, concurrency=2)
+    lock = threading.Lock()
+    starts = []
+
+    def fetch(hold):
+        with scheduler.slot("h"):
+            with lock:
+                starts.append(time.monotonic())
+            time.sleep(hold)
+
+    threads = [threading.Thread(target=fetch, args=(hold,))
+               for hold in (0.3, 0.01, 0.2, 0.01, 0.15, 0.01, 0.25, 0.01)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    starts.sort()
+    assert len(starts) == 8
+    assert all(b - a >= 0.045 for a, b in zip(starts, starts[1:]))
+
+
+def test_scraper_fetches_hold_a_slot(serve, scraper_for):
+    servers = serve("Ace", latency=0.05)
+    scraper = scraper_for(servers)
+    scraper.rate_limiter.concurrency = 1
+    threads = [threading.Thread(target=scraper.search_parallel, args=("plywood", "materials"))
+               for _ in range(4)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    # Four suggest.json requests, one at a time
+    assert servers["Ace"].requests == 4
+    assert time.monotonic() - start >= 4 * 0.05
@@ -0,0 +1,158 @@
+# SearchService over HTTP against the fixture servers
+
+
+import asyncio
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from core.service import MAX_HEADERS, SearchService, ServiceClient
+
+
+@pytest.fixture
+def service(serve, scraper_for):
+    # (SearchService, fixture servers, base URL, run) with the service on its own
+    # event loop thread; run(coro) runs a coroutine on that loop
+    servers = serve("Ace", "PCX", latency=0.2)
+    svc = SearchService(scraper_for(servers))
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def run(coro):
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(30)
+
+    host, port = run(svc.start("127.0.0.1", 0))
+    yield svc, servers, f"http://{host}:{port}", run
+
+    async def shutdown():
+        # Stop listening and let the connection handlers see their clients hang up
+        svc.close()
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        if tasks:
+            await asyncio.wait(tasks, timeout=5)
+
+    run(shutdown())
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def _requests(servers) -> int:
+    return sum(srv.requests for srv in servers.values())
+
+
+def _get(url: str, **params):
+    return requests.get(url, params=params, headers={"Connection": "close"}, timeout=30)
+
+
+def _search(base: str, **params):
+    return _get(f"{base}/search", **params)
+
+
+def test_crawl_then_cache(service):
+    svc, servers, base, _ = service
+    first = _search(base, keyword="plywood").json()
+    crawled = _requests(servers)
+    second = _search(base, keyword="plywood", sort="price_asc").json()
+
+    assert first["source"] == "crawl" and first["results"]
+    assert second["source"] == "cache"
+    assert sorted(r["link"] for r in second["results"]) == sorted(r["link"] for r in first["results"])
+    assert [r["price"] for r in second["results"]] == sorted(r["price"] for r in second["results"])
+    assert _requests(servers) == crawled
+    assert svc.counts["searches"] == 1 and svc.counts["cache_hits"] == 1
+
+
+def test_identical_searches_share_one_crawl(service):
+    svc, servers, base, _ = service
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        replies = list(pool.map(lambda _: _search(base, keyword="cement").json(), range(4)))
+
+    assert sorted(r["source"] for r in replies) == ["crawl", "shared", "shared", "shared"]
+    assert all(r["results"] == replies[0]["results"] for r in replies)
+    assert svc.counts["searches"] == 1 and svc.counts["coalesced"] == 3
+
+
+def test_crawl_survives_first_client_going_away(service):
+    svc, servers, _, run = service
+
+    async def scenario():
+        first = asyncio.ensure_future(svc.search("paint brush", "materials"))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(svc.search("paint brush", "materials"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        results, source = await second
+        await asyncio.sleep(0)  # let the crawl's done-callback run
+        return results, source
+
+    results, source = run(scenario())
+    assert source == "shared" and results
+    assert svc.inflight == {}
+    assert svc.cache.get("paint brush", "materials") == results
+
+
+def test_bad_requests(service):
+    _, _, base, _ = service
+    assert _search(base).status_code == 400
+    assert _search(base, keyword="plywood", intent="groceries").status_code == 400
+    assert _search(base, keyword="plywood", sort="cheapest").status_code == 400
+    r = _get(f"{base}/nowhere")
+    assert r.status_code == 404 and "error" in r.json()
+    assert requests.post(f"{base}/search", headers={"Connection": "close"}, timeout=5).status_code == 405
+
+
+class _BadGateway(BaseHTTPRequestHandler):
+    # A proxy in front of the service that fails with an HTML page
+    def do_GET(self):
+        self.send_error(502)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_client_raises_on_error_status(service):
+    _, _, base, _ = service
+    client = ServiceClient(base)
+    with pytest.raises(RuntimeError, match="intent must be one of"):
+        client.search_parallel("plywood", "groceries")
+    client.session.close()
+
+    proxy = ThreadingHTTPServer(("127.0.0.1", 0), _BadGateway)
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+    try:
+        with pytest.raises(RuntimeError, match="HTTP 502"):
+            ServiceClient(f"http://127.0.0.1:{proxy.server_port}").search_parallel("plywood", "materials")
+    finally:
+        proxy.shutdown()
+        proxy.server_close()
+
+
+def _raw(base: str, request: bytes) -> bytes:
+    host, port = base.removeprefix("http://").split(":")
+    with socket.create_connection((host, int(port)), timeout=5) as sock:
+        sock.sendall(request)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def test_header_limit(service):
+    _, _, base, _ = service
+    headers = lambda n: b"".join(b"X-H%d: v\r\n" % i for i in range(n))
+
+    ok = _raw(base, b"GET /stats HTTP/1.1\r\n" + headers(MAX_HEADERS - 1) + b"Connection: close\r\n\r\n")
+    assert ok.startswith(b"HTTP/1.1 200")
+
+    # Never parsed as a second request: one 400 and the connection is closed
+    reply = _raw(base, b"GET /stats HTTP/1.1\r\n" + headers(MAX_HEADERS + 5) + b"\r\n")
+    assert reply.startswith(b"HTTP/1.1 400")
+    assert reply.count(b"HTTP/1.1") == 1
+    assert json.loads(reply.split(b"\r\n\r\n", 1)[1]) == {"error": "too many headers"}
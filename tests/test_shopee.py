@@ -0,0 +1,102 @@
+# Shopee search API adapter and what happens when the payload isn't one
+
+
+import json
+from pathlib import Path
+
+from core import infer_intent, shopee
+
+
+BASE = "https://shopee.ph"
+FIXTURE = Path(__file__).parent / "fixtures" / "shopee_search_items.json"
+
+
+def _search_items() -> dict:
+    return json.loads(FIXTURE.read_text(encoding="utf-8"))
+
+
+def _search(scraper, keyword):
+    return scraper.search_parallel(keyword, infer_intent(keyword))
+
+
+def test_parse_search_scales_prices():
+    items, more = shopee.parse_search(_search_items(), BASE)
+    assert items == [
+        {"title": "Marine Plywood 1/2 inch 4x8 ft", "price": 1245.0,
+         "link": f"{BASE}/Marine-Plywood-1-2-inch-4x8-ft-i.310456789.22745519873"},
+        # price 0 (a variation range): price_min
+        {"title": "Phenolic Plywood 3/4 4x8 (Black)", "price": 2310.5,
+         "link": f"{BASE}/Phenolic-Plywood-3-4-4x8-Black-i.310456789.22745519874"},
+        {"title": "Ordinary Plywood 1/4 inch", "price": None,
+         "link": f"{BASE}/Ordinary-Plywood-1-4-inch-i.310456790.22745519875"},
+    ]
+    assert more is True
+
+
+def test_parse_search_last_page():
+    data = _search_items()
+    data["nomore"] = True
+    assert shopee.parse_search(data, BASE)[1] is False
+    assert shopee.parse_search({"items": []}, BASE) == ([], False)
+
+
+def test_parse_search_malformed_payload_is_none():
+    blocked = {"error": 90309999, "is_customized": False, "is_login": False}
+    for data in (None, [], blocked, {"items": None}, {"items": "nope"}):
+        assert shopee.parse_search(data, BASE) == (None, False)
+
+
+def test_adapter_results(serve, scraper_for):
+    servers = serve("Shopee")
+    srv = servers["Shopee"]
+    data = _search_items()
+    data["nomore"] = True
+    srv.store.shopee_json = lambda query, limit, newest: json.dumps(data).encode()
+
+    results = _search(scraper_for(servers), "plywood")
+    # Links are built on the configured base, not the server that answered
+    base = srv.base_url
+    assert sorted((r["title"], r["price"], r["cur"], r["link"]) for r in results) == [
+        ("Marine Plywood 1/2 inch 4x8 ft", 1245.0, "PHP",
+         f"{base}/Marine-Plywood-1-2-inch-4x8-ft-i.310456789.22745519873"),
+        ("Ordinary Plywood 1/4 inch", None, "PHP",
+         f"{base}/Ordinary-Plywood-1-4-inch-i.310456790.22745519875"),
+        ("Phenolic Plywood 3/4 4x8 (Black)", 2310.5, "PHP",
+         f"{base}/Phenolic-Plywood-3-4-4x8-Black-i.310456789.22745519874"),
+    ]
+    assert srv.requests == 1
+
+
+def test_malformed_payload_without_fallback_is_no_results(serve, scraper_for):
+    servers = serve("Shopee")
+    srv = servers["Shopee"]
+    srv.store.shopee_json = lambda query, limit, newest: b'{"error": 90309999}'
+
+    assert _search(scraper_for(servers), "plywood") == []
+    assert srv.requests == 1
+
+
+def test_malformed_payload_falls_back_to_html(serve, scraper_for):
+    servers = serve("Shopee")
+    srv = servers["Shopee"]
+    srv.store.shopee_json = lambda query, limit, newest: b'{"error": 90309999}'
+    route = srv.route
+
+    def html_route(path, query):
+        if path.startswith("/api/"):
+            return route(path, query)
+        if path == "/search":
+            return 200, "text/html; charset=utf-8", b'<a href="/Marine-Plywood-i.310456789.22745519873">Marine Plywood</a>'
+        return 200, "text/html; charset=utf-8", (
+            '<html><head><meta property="og:title" content="Marine Plywood 1/2 inch"></head>'
+            '<body><div class="price">₱1,245.00</div></body></html>'
+        ).encode()
+
+    srv.route = html_route
+
+    results = _search(scraper_for(servers, html_fallback=True), "plywood")
+    assert [(r["title"], r["price"], r["link"]) for r in results] == [
+        ("Marine Plywood 1/2 inch", 1245.0, f"{srv.base_url}/Marine-Plywood-i.310456789.22745519873"),
+    ]
+    # Search API, search page, product page
+    assert srv.requests == 3
@@ -0,0 +1,100 @@
+# Shopify JSON fast path (suggest.json, products/<handle>.js) and its HTML fallback
+
+
+import json
+
+from core import infer_intent, shopify
+
+
+BASE = "https://shop.example"
+
+
+def _search(scraper, keyword):
+    return scraper.search_parallel(keyword, infer_intent(keyword))
+
+
+def test_parse_suggest_reads_products():
+    data = {"resources": {"results": {"products": [
+        {"title": " Marine Plywood ", "url": "/products/marine?_pos=1&_sid=x", "price": "1,245.00"},
+        {"title": "No price", "url": "/products/no-price", "price_min": ""},
+        {"title": "No link"},
+    ]}}}
+    assert shopify.parse_suggest(data, BASE) == [
+        {"title": "Marine Plywood", "price": 1245.0, "link": f"{BASE}/products/marine?_pos=1&_sid=x"},
+        {"title": "No price", "price": None, "link": f"{BASE}/products/no-price"},
+    ]
+
+
+def test_parse_suggest_empty_result_is_not_malformed():
+    assert shopify.parse_suggest({"resources": {"results": {"products": []}}}, BASE) == []
+
+
+def test_parse_suggest_malformed_payload_is_none():
+    for data in (None, [], {"errors": "Not found"}, {"resources": {"results": {}}},
+                 {"resources": {"results": {"products": "nope"}}}):
+        assert shopify.parse_suggest(data, BASE) is None
+
+
+def test_parse_product_js_prices_are_centavos():
+    assert shopify.parse_product_js({"title": "Drill ", "price": 349950}) == ("Drill", 3499.5)
+    assert shopify.parse_product_js({"title": "Saw", "variants": [{"price": 12000}]}) == ("Saw", 120.0)
+    assert shopify.parse_product_js("oops") == ("", None)
+
+
+def test_adapter_returns_suggest_titles_prices_and_links(serve, scraper_for):
+    servers = serve("Ace")
+    ace = servers["Ace"].base_url
+    results = _search(scraper_for(servers), "plywood")
+
+    assert sorted((r["title"], r["price"], r["link"]) for r in results) == [
+        ('Marine Plywood 1/2" 4x8ft', 1245.0, f"{ace}/products/marine-plywood-1-2-4x8ft"),
+        ('Marine Plywood 1/4" 4x8ft', 689.75, f"{ace}/products/marine-plywood-1-4-4x8ft"),
+        ('Ordinary Plywood 1/4" 4x8ft', 455.5, f"{ace}/products/ordinary-plywood-1-4-4x8ft"),
+    ]
+    assert all(r["cur"] == "PHP" and r["store"] == ace.split("//")[1] for r in results)
+    # One suggest.json and nothing else
+    assert servers["Ace"].requests == 1
+
+
+def test_incomplete_suggestion_fetches_product_js(serve, scraper_for):
+    servers = serve("Ace")
+    srv = servers["Ace"]
+    srv.store.suggest_json = lambda query, limit: json.dumps({"resources": {"results": {"products": [
+        {"title": "", "url": "/products/marine-plywood-1-2-4x8ft?_pos=1", "price": ""},
+    ]}}}).encode()
+
+    results = _search(scraper_for(servers), "marine plywood")
+    assert [(r["title"], r["price"], r["link"]) for r in results] == [
+        ('Marine Plywood 1/2" 4x8ft', 1245.0, f"{srv.base_url}/products/marine-plywood-1-2-4x8ft"),
+    ]
+    assert srv.requests == 2
+
+
+def test_malformed_suggest_falls_back_to_html(serve, scraper_for):
+    servers = serve("Ace")
+    srv = servers["Ace"]
+    srv.store.suggest_json = lambda query, limit: b'{"errors": "predictive search is disabled"}'
+
+    results = _search(scraper_for(servers), "plywood")
+    assert sorted((r["title"], r["price"], r["link"]) for r in results) == [
+        ('Marine Plywood 1/2" 4x8ft', 1245.0, f"{srv.base_url}/products/marine-plywood-1-2-4x8ft"),
+        ('Marine Plywood 1/4" 4x8ft', 689.75, f"{srv.base_url}/products/marine-plywood-1-4-4x8ft"),
+        ('Ordinary Plywood 1/4" 4x8ft', 455.5, f"{srv.base_url}/products/ordinary-plywood-1-4-4x8ft"),
+    ]
+    # suggest.json, then the search page (its cards are complete)
+    assert srv.requests == 2
+
+
+def test_unavailable_suggest_falls_back_to_html(serve, scraper_for):
+    servers = serve("PCX")
+    srv = servers["PCX"]
+    srv.store.suggest_json = lambda query, limit: b"<html>Page not found</html>"
+
+    results = _search(scraper_for(servers), "ssd")
+    assert {r["title"] for r in results} == {"Samsung 980 1TB NVMe M.2 SSD", "Kingston NV2 500GB NVMe SSD"}
+
+
+def test_fallback_can_be_disabled(serve, scraper_for):
+    servers = serve("Ace")
+    servers["Ace"].store.suggest_json = lambda query, limit: b"{}"
+    assert _search(scraper_for(servers, html_fallback=False), "plywood") == []
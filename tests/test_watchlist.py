@@ -0,0 +1,104 @@
+# Watchlist keyword checks: the first listing page decides whether to search
+
+import argparse
+import json
+from pathlib import Path
+from string import Template
+
+from benchmarks.fixture_server import local_retailers
+from benchmarks.run import make_scraper
+from config import RETAILERS
+from core.watchlist import WatchChecker, WatchStore
+
+
+def _checker(retailers, tmp_path):
+    store = WatchStore(tmp_path / "watchlist.db")
+    checker = WatchChecker(make_scraper(retailers), store, history_path=tmp_path / "history.csv")
+    return store, checker
+
+
+def _requests(servers) -> int:
+    total = sum(srv.requests for srv in servers.values())
+    for srv in servers.values():
+        srv.requests = 0
+    return total
+
+
+def test_unchanged_listing_skips_the_search(serve, tmp_path):
+    # Shopify adapter (Ace), HTML scraping (PCX) and a marketplace (Lazada)
+    servers = serve("Ace", "PCX", "Lazada")
+    retailers = local_retailers(servers)
+    del retailers["PCX"]["adapter"]
+    store, checker = _checker(retailers, tmp_path)
+    store.add("keyword", "plywood")
+
+    assert checker.check_due(force=True)["updated"] == 1
+    first = _requests(servers)
+    assert checker.check_due(force=True)["unchanged"] == 1
+    assert _requests(servers) == len(servers)   # one listing page per retailer
+    assert first == 2 * len(servers)   # the same pages, then the search
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_price_change_on_the_listing_searches_and_alerts(serve, tmp_path):
+    # The search page carries og: meta tags and JSON-LD like a real Shopify
+    # theme; only the cards' prices change
+    servers = serve("PCX")
+    servers["PCX"].store.templates["search"] = Template(
+        (FIXTURES / "pcx_search_og.html").read_text(encoding="utf-8")
+    )
+    retailers = local_retailers(servers)
+    del retailers["PCX"]["adapter"]
+    store, checker = _checker(retailers, tmp_path)
+    store.add("keyword", "ssd")
+    checker.check_due(force=True)
+    (before,) = store.watches()
+
+    for item in servers["PCX"].store.catalog.values():
+        item["price"] *= 2
+    assert checker.check_due(force=True)["alerts"] == 1
+    (after,) = store.watches()
+    assert after["price"] == 2 * before["price"]
+    assert after["content_hash"] != before["content_hash"]
+    assert store.alerts()[0]["new_price"] == after["price"]
+
+
+def test_listing_without_prices_always_searches(serve, tmp_path):
+    # Suggestions without a price are completed from product JSON, which the
+    # listing hash doesn't cover, so the search runs every time
+    servers = serve("Ace")
+    store_ = servers["Ace"].store
+    suggest = store_.suggest_json
+
+    def without_prices(query, limit):
+        data = json.loads(suggest(query, limit))
+        for product in data["resources"]["results"]["products"]:
+            del product["price"], product["price_min"]
+        return json.dumps(data).encode("utf-8")
+
+    store_.suggest_json = without_prices
+    store, checker = _checker(local_retailers(servers), tmp_path)
+    store.add("keyword", "plywood")
+
+    checker.check_due(force=True)
+    first = _requests(servers)
+    assert checker.check_due(force=True)["unchanged"] == 1
+    assert _requests(servers) == first > 2   # probe, suggest.json and every product JSON
+
+
+def test_watch_add_needs_a_configured_retailer(tmp_path, monkeypatch, capsys):
+    # Offline Demo and other foreign links would fail every check
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    add = lambda target: main.run_watch(argparse.Namespace(
+        action="add", keyword=False, target=target, intent=None, every=6.0,
+    ))
+    assert add("https://example.com/a") == 2
+    assert "not on a configured retailer" in capsys.readouterr().out
+    assert add(RETAILERS["Ace"]["base"] + "/products/marine-plywood-1-2") == 0
+    assert [w["target"] for w in WatchStore().watches()] == [
+        RETAILERS["Ace"]["base"] + "/products/marine-plywood-1-2"
+    ]
@@ -0,0 +1,119 @@
+# Crawl work queue: leasing, attempts, dedup and several worker processes
+
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import WORKQUEUE_MAX_ATTEMPTS
+from benchmarks.fixture_server import local_retailers
+from benchmarks.run import KEYWORDS, make_scraper
+from benchmarks.workqueue_bench import WINDOW, peak_requests
+from core import infer_intent
+from core.workqueue import CrawlWorker, SqliteWorkQueue, run_worker
+
+
+def test_workers_share_tasks_and_rate_limit(serve, tmp_path):
+    # Three worker processes on one queue: every task is run exactly once and
+    # no host gets more than the shared budget allows
+    servers = serve("Ace", "PCX", latency=0.05)
+    retailers = local_retailers(servers)
+    keywords = KEYWORDS[:24]
+
+    scraper = make_scraper(retailers)
+    for kw in keywords:
+        scraper.search_parallel(kw, infer_intent(kw))
+    single = {name: srv.requests for name, srv in servers.items()}
+    for srv in servers.values():
+        srv.requests = 0
+        srv.arrivals.clear()
+
+    path = tmp_path / "queue.db"
+    queue = SqliteWorkQueue(path)
+    queue.enqueue([("keyword", kw, "") for kw in keywords])
+    interval = 0.05   # well above thread wake-up jitter, which the arrivals also carry
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(run_worker, str(path), retailers=retailers, threads=2,
+                               interval=interval) for _ in range(3)]
+        stats = [f.result() for f in futures]
+
+    tasks = queue.results("keyword")
+    assert sorted(t["target"] for t in tasks) == sorted(keywords)
+    assert all(t["attempts"] == 1 for t in tasks)
+    assert sum(s["done"] for s in stats) == len(keywords)
+    assert sum(s["failed"] for s in stats) == 0
+    assert {name: srv.requests for name, srv in servers.items()} == single
+    for srv in servers.values():
+        assert peak_requests(srv.arrivals, WINDOW * interval) <= WINDOW + 1
+
+
+def test_task_whose_worker_keeps_dying_fails(tmp_path):
+    queue = SqliteWorkQueue(tmp_path / "queue.db")
+    queue.enqueue([("keyword", "plywood", "")])
+
+    # Each worker dies holding the lease, which then expires
+    for attempt in range(1, WORKQUEUE_MAX_ATTEMPTS + 1):
+        (task,) = queue.lease(f"worker{attempt}", lease_sec=0)
+        assert task["attempts"] == attempt
+        time.sleep(0.01)
+
+    assert queue.lease("worker-next") == []
+    assert queue.counts()["failed"] == 1
+    assert queue.next_ready() is None
+
+
+def test_failures_count_each_lease_once(tmp_path):
+    queue = SqliteWorkQueue(tmp_path / "queue.db")
+    queue.enqueue([("keyword", "plywood", "")])
+    (task,) = queue.lease("w")
+    assert queue.fail(task["id"], "w", "boom")
+
+    with queue._connect() as db:
+        row = dict(db.execute("SELECT * FROM tasks").fetchone())
+    assert row["attempts"] == 1 and row["state"] == "pending"
+
+
+def test_requeue_clears_lease_and_error(tmp_path):
+    queue = SqliteWorkQueue(tmp_path / "queue.db")
+    queue.enqueue([("keyword", "plywood", "")])
+    (task,) = queue.lease("w")
+    queue.fail(task["id"], "w", "boom", max_attempts=1)
+    assert queue.requeue() == 1
+
+    with queue._connect() as db:
+        row = dict(db.execute("SELECT * FROM tasks").fetchone())
+    assert row["state"] == "pending"
+    assert row["attempts"] == 0
+    assert row["lease_until"] is None and row["error"] is None and row["owner"] is None
+
+
+def test_products_found_by_keyword_tasks_are_not_fetched_again(serve, scraper_for, tmp_path):
+    servers = serve("Ace")
+    scraper = scraper_for(servers)
+    queue = SqliteWorkQueue(tmp_path / "queue.db")
+    queue.enqueue([("keyword", "plywood", "")])
+    links = [r["link"] for r in scraper.search_parallel("plywood", "materials")]
+    queue.enqueue([("product", links[0], "")])   # queued before the sweep
+
+    CrawlWorker(queue, scraper, threads=1).run()
+
+    products = {t["target"]: t["result"] for t in queue.results("product")}
+    assert sorted(products) == sorted(links)
+    assert all(p["title"] and p["price"] for p in products.values())
+    assert queue.enqueue([("product", link, "") for link in links]) == 0
+    assert queue.counts()["pending"] == 0
+
+
+def test_leases_are_renewed_while_a_task_runs(tmp_path):
+    queue = SqliteWorkQueue(tmp_path / "queue.db")
+    queue.enqueue([("product", "https://example.com/products/slow", "")])
+    stolen = []
+
+    class SlowWorker(CrawlWorker):
+        def execute(self, task):
+            time.sleep(1.0)   # several lease lengths
+            stolen.extend(self.queue.lease("other-worker"))
+            return {"link": task["target"], "title": "Slow", "price": 1.0, "cur": "PHP"}
+
+    worker = SlowWorker(queue, make_scraper({}), threads=1, lease_sec=0.3)
+    assert worker.run() == {"done": 1, "failed": 0}
+    assert stolen == []
@@ -1,35 +1,43 @@
 # Main PRICIO Application UI
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import threading
+import time
 from pathlib import Path
+from types import SimpleNamespace
 
-from core import Scraper, infer_intent
-from utils import SearchCache, pick_best_price, calculate_price_stats, build_tip, init_history_file
+from core import infer_intent
+from core.query import search_cache
+from utils import SORT_MODES, sort_results, pick_best_price, calculate_price_stats, build_tip, init_history_file
+from utils.metrics import METRICS
 
 
 class PRICIOApp(tk.Tk):
     # Main application window
     
-    def __init__(self):
+    def __init__(self, service_url: str = None):
         super().__init__()
         self.title("PRICIO - Pricing Regional Intelligence Catalogue Insight Output")
         self.geometry("1320x780")
         self.minsize(1150, 680)
         
-        # Data directory
+        # Data directory (created on first write, not at startup)
         self.data_dir = Path("data")
-        self.data_dir.mkdir(parents=True, exist_ok=True)
         self.history_path = self.data_dir / "price_history.csv"
-        init_history_file(self.history_path)
+        self.last_results_path = self.data_dir / "last_results.col"
         
-        # Components
-        self.cache = SearchCache()
-        self.scraper = Scraper(logger=self.log)
+        # Components (the scraper and its HTTP session are built lazily).
+        # With a service URL, online searches go to a shared PRICIO service.
+        self.service_url = service_url
+        self.cache = search_cache()
+        self._scraper = None
+        self._catalogue = None
+        self._scraper_lock = threading.Lock()
         
         # State
         self._worker = None
+        self._quote_engine = None
         self.current_results = []
         self.current_keyword = ""
         self.current_intent = ""
@@ -39,6 +47,48 @@ class PRICIOApp(tk.Tk):
         # UI Setup
         self._setup_style()
         self._build_ui()
+        
+        # Load the network stack once the window is up
+        self.after_idle(self._start_warmup)
+        self.after_idle(self._restore_last_results)
+    
+    @property
+    def scraper(self):
+        # Scraper built on first use (importing requests costs more than the whole UI)
+        with self._scraper_lock:
+            if self._scraper is None:
+                if self.service_url:
+                    from core.service import ServiceClient
+                    self._scraper = ServiceClient(self.service_url, logger=self.log)
+                else:
+                    from core import Scraper
+                    self._scraper = Scraper(logger=self.log)
+            return self._scraper
+    
+    def _start_warmup(self):
+        # Build the scraper and resolve retailer hosts in the background
+        threading.Thread(target=self._warmup, daemon=True).start()
+    
+    def _warmup(self):
+        import socket
+        from urllib.parse import urlparse
+        from config import RETAILERS
+        
+        self.scraper  # Imports requests and builds the session
+        if self.service_url:
+            return
+        for cfg in RETAILERS.values():
+            if not cfg.get("enabled", True):
+                continue
+            try:
+                socket.getaddrinfo(urlparse(cfg["base"]).hostname, 443)
+            except OSError:
+                pass
+    
+    def _ensure_data_dir(self):
+        # Create data/ and the history file the first time something is written
+        if not self.history_path.exists():
+            init_history_file(self.history_path)
     
     def _setup_style(self):
         # Configure ttk styles
@@ -112,27 +162,24 @@ class PRICIOApp(tk.Tk):
         ).grid(row=0, column=3, sticky="w", padx=(8, 12))
         
         ttk.Label(search, text="Sort:", style="SubHeader.TLabel").grid(row=0, column=4, sticky="w")
-        self.sort_var = tk.StringVar(value="Relevance (best match)")
+        self.sort_var = tk.StringVar(value=SORT_MODES["relevance"])
         sort_combo = ttk.Combobox(
             search,
             textvariable=self.sort_var,
             state="readonly",
             width=22,
-            values=[
-                "Relevance (best match)",
-                "Price: Low → High",
-                "Price: High → Low",
-            ],
+            values=list(SORT_MODES.values()),
         )
         sort_combo.grid(row=0, column=5, sticky="w", padx=(8, 12))
         sort_combo.bind("<<ComboboxSelected>>", lambda e: self.resort_current_results())
         
         self.mode_var = tk.StringVar(value="Online")
         ttk.Radiobutton(search, text="Online", variable=self.mode_var, value="Online").grid(row=0, column=6, padx=(6, 0))
-        ttk.Radiobutton(search, text="Offline Demo", variable=self.mode_var, value="Offline Demo").grid(row=0, column=7, padx=(6, 0))
+        ttk.Radiobutton(search, text="Catalogue", variable=self.mode_var, value="Catalogue").grid(row=0, column=7, padx=(6, 0))
+        ttk.Radiobutton(search, text="Offline Demo", variable=self.mode_var, value="Offline Demo").grid(row=0, column=8, padx=(6, 0))
         
-        ttk.Button(search, text="Search", command=self.on_search).grid(row=0, column=8, padx=(10, 6))
-        ttk.Button(search, text="Stop", command=self.on_stop).grid(row=0, column=9)
+        ttk.Button(search, text="Search", command=self.on_search).grid(row=0, column=9, padx=(10, 6))
+        ttk.Button(search, text="Stop", command=self.on_stop).grid(row=0, column=10)
         
         # Row 2: Debug toggle and tip
         ttk.Checkbutton(
@@ -252,6 +299,8 @@ class PRICIOApp(tk.Tk):
         btn_row.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(8, 0))
         ttk.Button(btn_row, text="Add Selected", command=self.add_selected_to_quote).pack(side="left")
         ttk.Button(btn_row, text="Clear Quote", command=self.clear_quote).pack(side="left", padx=8)
+        ttk.Button(btn_row, text="Load BOM…", command=self.on_load_bom).pack(side="left")
+        ttk.Button(btn_row, text="Watch Selected", command=self.watch_selected).pack(side="left", padx=8)
     
     def _build_status_bar(self):
         # Build status bar
@@ -288,7 +337,8 @@ class PRICIOApp(tk.Tk):
         
         sort_mode = self.sort_var.get()
         
-        self.scraper.set_stop_flag(False)
+        if self._scraper is not None:
+            self._scraper.set_stop_flag(False)
         self.clear_results(keep_status=True)
         self.debug_log.delete("1.0", "end")
         
@@ -307,7 +357,10 @@ class PRICIOApp(tk.Tk):
     
     def on_stop(self):
         # Handle stop button click
-        self.scraper.set_stop_flag(True)
+        if self._scraper is not None:
+            self._scraper.set_stop_flag(True)
+        if self._quote_engine is not None:
+            self._quote_engine.cancel()
         self.status_var.set("Stopping…")
     
     def toggle_debug_log(self):
@@ -336,11 +389,64 @@ class PRICIOApp(tk.Tk):
         
         self.status_var.set(f"Added {len(selected)} item(s) to quote.")
     
+    def watch_selected(self):
+        # Pin selected products to the watchlist (checked by: python main.py watch run)
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showwarning("No Selection", "Please select an item from the results table.")
+            return
+        
+        from core.watchlist import WatchStore, retailer_for
+        store = WatchStore(self.data_dir / "watchlist.db")
+        watched = 0
+        for iid in selected:
+            link = self.tree.item(iid, "values")[6]
+            # Only links a check can fetch (not demo results or unknown sites)
+            if link.startswith(("http://", "https://")) and retailer_for(link) is not None:
+                store.add("product", link)
+                watched += 1
+        
+        skipped = len(selected) - watched
+        note = f", skipped {skipped} not on a configured retailer" if skipped else ""
+        self.status_var.set(f"Watching {watched} item(s){note}. Run: python main.py watch run")
+    
     def clear_quote(self):
         # Clear quote/cart
         self.quote_box.delete("1.0", "end")
         self.status_var.set("Quote cleared.")
     
+    def on_load_bom(self):
+        # Price a whole bill of materials (CSV/JSON) into the quote panel
+        if self._worker and self._worker.is_alive():
+            messagebox.showinfo("Busy", "A search is already running. Click Stop to cancel it.")
+            return
+        
+        path = filedialog.askopenfilename(
+            title="Load bill of materials",
+            filetypes=[("BOM files", "*.csv *.json"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        
+        from core.quote import load_bom
+        try:
+            lines = load_bom(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("BOM Error", str(e))
+            return
+        if not lines:
+            messagebox.showinfo("Empty BOM", "The file has no line items.")
+            return
+        
+        if self._scraper is not None:
+            self._scraper.set_stop_flag(False)
+        self.quote_box.delete("1.0", "end")
+        self.status_var.set(f"Quoting {len(lines)} line(s)…")
+        self._worker = threading.Thread(
+            target=self._quote_worker, args=(lines, self.mode_var.get()), daemon=True
+        )
+        self._worker.start()
+    
     def resort_current_results(self):
         # Re-sort current results when sort dropdown changes
         if not self.current_results:
@@ -388,25 +494,33 @@ class PRICIOApp(tk.Tk):
     
     def _search_worker(self, keyword: str, mode: str, intent: str, sort_mode: str):
         # Background worker thread for searching
+        crawled = False
         try:
             if mode == "Offline Demo":
                 results = self._fetch_demo(keyword, intent)
+            elif mode == "Catalogue":
+                results = self._fetch_catalogue(keyword, intent)
             else:
                 # Check cache first
                 cached = self.cache.get(keyword, intent)
                 if cached:
+                    METRICS.incr("cache_hits")
                     self.log(f"📦 Using cached results ({len(cached)} items)")
                     results = cached
                 else:
+                    METRICS.incr("cache_misses")
                     results = self.scraper.search_parallel(keyword, intent)
                     if results:
                         self.cache.set(keyword, intent, results)
+                    crawled = True
             
-            if self.scraper.stop_flag:
+            if self._scraper is not None and self._scraper.stop_flag:
                 self._ui(lambda: self.status_var.set("Stopped."))
                 return
             
             if not results:
+                if crawled:
+                    self._export_metrics()
                 self._ui(lambda: messagebox.showinfo("No Results", "No results found. Try a different keyword."))
                 self._ui(lambda: self.status_var.set("No results."))
                 self.log("❌ No results found from any retailer")
@@ -417,20 +531,26 @@ class PRICIOApp(tk.Tk):
             self.current_keyword = keyword
             self.current_intent = intent
             self.current_unit = "per unit"
+            if mode != "Offline Demo":
+                self._save_last_results(results, keyword, intent)
             
             # Sort
             self._sort_results(results, keyword, sort_mode)
             
             # Update UI
             def apply():
-                self._display_results(results)
-                stats = calculate_price_stats(results)
-                self._update_summary(stats)
-                
-                best = pick_best_price(results)
-                self._set_tip(build_tip(keyword, intent, sort_mode, best))
+                with METRICS.span("ui_render"):
+                    self._display_results(results)
+                    stats = calculate_price_stats(results)
+                    self._update_summary(stats)
+                    
+                    best = pick_best_price(results)
+                    self._set_tip(build_tip(keyword, intent, sort_mode, best))
                 
                 self.status_var.set(f"Found {len(results)} results for '{keyword}' ({intent}).")
+                # Exported after the render so the files describe this whole search
+                if crawled:
+                    self._export_metrics()
             
             self._ui(apply)
             self.log(f"\n✅ Total results: {len(results)}")
@@ -440,8 +560,110 @@ class PRICIOApp(tk.Tk):
             self._ui(lambda: self.status_var.set("Search failed."))
             self.log(f"❌ ERROR: {e}")
     
+    def _quote_worker(self, lines: list, mode: str):
+        # Background worker: search every BOM line, streaming rows into the quote panel
+        from core.quote import QuoteEngine, format_quote
+        
+        # Only live Online results go into the search cache; the other modes
+        # quote through a cache of their own for this run
+        if mode == "Catalogue":
+            from core.catalogue import CatalogueStore
+            if self._catalogue is None:
+                self._catalogue = CatalogueStore(self.data_dir / "catalogue.db")
+            searcher, cache = self._catalogue, None
+        elif mode == "Offline Demo":
+            searcher, cache = SimpleNamespace(search_parallel=self._fetch_demo), None
+        else:
+            searcher, cache = self.scraper, self.cache
+        
+        def on_line(p, done, total):
+            m = p["match"]
+            if m:
+                text = (f"{p['line']}. {p['keyword']} x{p['qty']:g}: {m['title']} | {m['store']}\n"
+                        f"   {m['cur']} {m['price_disp']} each = {p['subtotal']:,.2f}\n")
+            elif p.get("skipped"):
+                text = f"{p['line']}. {p['keyword']} x{p['qty']:g}: skipped (cancelled)\n"
+            else:
+                text = f"{p['line']}. {p['keyword']} x{p['qty']:g}: no priced match\n"
+            
+            def apply():
+                self.quote_box.insert("end", text)
+                self.quote_box.see("end")
+                self.status_var.set(f"Quoting… {done}/{total} line(s)")
+            self._ui(apply)
+        
+        self._quote_engine = QuoteEngine(searcher, cache=cache, logger=self.log)
+        try:
+            with METRICS.span("quote"):
+                quote = self._quote_engine.run(lines, on_line=on_line)
+            summary = format_quote(quote)
+            
+            def finish():
+                self.quote_box.insert("end", f"\n=== TOTALS ===\n{summary}\n")
+                self.quote_box.see("end")
+                priced = len(quote["lines"]) - len(quote["unpriced"]) - len(quote["skipped"])
+                skipped = f", {len(quote['skipped'])} skipped" if quote["skipped"] else ""
+                self.status_var.set(f"Quoted {priced}/{len(quote['lines'])} line(s){skipped}.")
+            self._ui(finish)
+            self.log(f"\n✅ Quote finished\n{summary}")
+        except Exception as e:
+            msg = str(e)
+            self._ui(lambda: messagebox.showwarning("Quote Failed", msg))
+            self._ui(lambda: self.status_var.set("Quote failed."))
+            self.log(f"❌ ERROR: {msg}")
+        finally:
+            self._quote_engine = None
+    
     # HELPER METHODS
     
+    def _export_metrics(self):
+        # Write per-stage timings/counters under data/ for offline analysis
+        try:
+            self._ensure_data_dir()
+            METRICS.export_json(self.data_dir / "metrics.json")
+            METRICS.export_prometheus(self.data_dir / "metrics.prom")
+        except OSError as e:
+            self.log(f"⚠️ Could not export metrics: {e}")
+    
+    def _save_last_results(self, results: list, keyword: str, intent: str):
+        # Columnar copy of the latest results, shown again on the next start
+        from utils.columnar import write_snapshot
+        
+        try:
+            write_snapshot(self.last_results_path, results,
+                           meta={"keyword": keyword, "intent": intent, "saved_ts": time.time()})
+        except OSError as e:
+            self.log(f"⚠️ Could not save results: {e}")
+    
+    def _restore_last_results(self):
+        # Show the previous session's results (read from the mmap'd snapshot)
+        if not self.last_results_path.exists():
+            return
+        from utils.columnar import ColumnarSnapshot
+        
+        try:
+            with ColumnarSnapshot(self.last_results_path) as snapshot:
+                results = snapshot.results()
+                stats = snapshot.price_stats()
+                meta = snapshot.meta
+        except (OSError, ValueError, KeyError) as e:
+            self.log(f"⚠️ Could not restore last results: {e}")
+            return
+        if not results or self.current_results:
+            return
+        
+        self.current_results = results
+        self.current_keyword = meta.get("keyword", "")
+        self.current_intent = meta.get("intent", "")
+        sort_mode = self.sort_var.get()
+        self._sort_results(results, self.current_keyword, sort_mode)
+        self._display_results(results)
+        self._update_summary(stats)
+        self._set_tip(build_tip(self.current_keyword, self.current_intent, sort_mode,
+                                pick_best_price(results)))
+        self.status_var.set(f"Showing {len(results)} results for '{self.current_keyword}' "
+                            f"from the last session.")
+    
     def _ui(self, fn):
         # Execute function on UI thread
         self.after(0, fn)
@@ -467,28 +689,7 @@ class PRICIOApp(tk.Tk):
     
     def _sort_results(self, results: list, keyword: str, sort_mode: str):
         # Sort results based on sort mode
-        if sort_mode == "Relevance (best match)":
-            results.sort(key=lambda r: (
-                0 if r["rec"] else 1,
-                -r.get("rel", 0.0),
-                r["price"] if isinstance(r["price"], (int, float)) else 10**12
-            ))
-        elif sort_mode == "Price: Low → High":
-            results.sort(key=lambda r: (
-                0 if r["rec"] else 1,
-                0 if isinstance(r["price"], (int, float)) else 1,
-                r["price"] if isinstance(r["price"], (int, float)) else 10**12,
-                -r.get("rel", 0.0),
-            ))
-        elif sort_mode == "Price: High → Low":
-            results.sort(key=lambda r: (
-                0 if r["rec"] else 1,
-                0 if isinstance(r["price"], (int, float)) else 1,
-                -(r["price"] if isinstance(r["price"], (int, float)) else -10**12),
-                -r.get("rel", 0.0),
-            ))
-        else:
-            results.sort(key=lambda r: (0 if r["rec"] else 1))
+        sort_results(results, sort_mode)
     
     def _update_summary(self, stats: dict):
         # Update price summary display
@@ -512,6 +713,27 @@ class PRICIOApp(tk.Tk):
         self.tip_text.insert("1.0", text)
         self.tip_text.configure(state="disabled")
     
+    def _fetch_catalogue(self, keyword: str, intent: str) -> list:
+        # Answer from the local catalogue snapshot (python main.py sync)
+        from core.catalogue import CatalogueStore
+        from config import RETAILERS
+        
+        if self._catalogue is None:
+            self._catalogue = CatalogueStore(self.data_dir / "catalogue.db")
+        store = self._catalogue
+        
+        if store.count() == 0:
+            self.log("❌ Catalogue is empty. Run: python main.py sync")
+            return []
+        for name, cfg in RETAILERS.items():
+            if cfg.get("enabled", True) and not store.is_fresh(name):
+                self.log(f"⚠️ {name}: catalogue snapshot is stale (run python main.py sync)")
+        
+        with METRICS.span("catalogue_search"):
+            results = store.search(keyword, intent)
+        self.log(f"📚 {len(results)} matches from local catalogue ({store.count()} products)")
+        return results
+    
     def _fetch_demo(self, keyword: str, intent: str) -> list:
         # Generate demo data for offline mode
         if intent == "materials":
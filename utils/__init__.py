@@ -2,6 +2,6 @@
 Utilities module
 """
 from .cache import SearchCache
-from .helpers import pick_best_price, calculate_price_stats, build_tip, init_history_file
+from .helpers import SORT_MODES, build_result, sort_results, pick_best_price, calculate_price_stats, price_stats, build_tip, init_history_file
 
-__all__ = ['SearchCache', 'pick_best_price', 'calculate_price_stats', 'build_tip', 'init_history_file']
+__all__ = ['SearchCache', 'SORT_MODES', 'build_result', 'sort_results', 'pick_best_price', 'calculate_price_stats', 'price_stats', 'build_tip', 'init_history_file']
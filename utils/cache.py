@@ -5,36 +5,95 @@ import time
 from config import CACHE_TTL_SEC
 
 
+def typed_key(keyword: str) -> str:
+    """Cache key of a query as typed: lowercased and trimmed"""
+    return keyword.lower().strip()
+
+
+def subsumes(broad: str, narrow: str) -> bool:
+    """True if cache key `broad` is strictly less specific (fewer tokens) than `narrow`"""
+    broad_tokens, narrow_tokens = set(broad.split()), set(narrow.split())
+    return bool(broad_tokens) and broad_tokens < narrow_tokens
+
+
 class SearchCache:
     """
     Simple in-memory cache for search results
+
+    How queries are keyed is up to the caller: `canonical` maps a keyword
+    to its cache key, and `narrow(keyword, intent, results)` picks the
+    results of a broader query that answer a narrower one (None if they
+    don't). core.query.search_cache() passes its canonical forms, so
+    reordered, re-spaced or differently spelled searches share an entry
+    and a miss can be served from a fresh entry of a broader query with the
+    same intent. Without them, keys are the typed keyword.
     """
-    
-    def __init__(self, ttl_sec: int = CACHE_TTL_SEC):
+
+    def __init__(self, ttl_sec: int = CACHE_TTL_SEC, subsume: bool = True,
+                 canonical=typed_key, narrow=None):
         self.cache = {}
         self.ttl_sec = ttl_sec
-    
+        self.subsume = subsume and narrow is not None
+        self.canonical = canonical
+        self.narrow = narrow
+        self.stats = {"hits": 0, "subsumed": 0, "misses": 0}
+
     def get(self, keyword: str, intent: str):
         """Get cached results if not expired"""
-        cache_key = (keyword.lower().strip(), intent)
-        
-        if cache_key not in self.cache:
+        cache_key = (self.canonical(keyword), intent)
+
+        entry = self._fresh(cache_key)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry[1]
+
+        if self.subsume:
+            results = self._from_broader(keyword, cache_key)
+            if results is not None:
+                self.stats["subsumed"] += 1
+                return results
+
+        self.stats["misses"] += 1
+        return None
+
+    def _fresh(self, cache_key):
+        """(timestamp, results) if cached and not expired. Read once: another
+        thread may expire or replace the entry at any time."""
+        entry = self.cache.get(cache_key)
+        if entry is None:
             return None
-        
-        ts, results = self.cache[cache_key]
-        
-        if time.time() - ts >= self.ttl_sec:
-            # Cache expired
-            del self.cache[cache_key]
+
+        if time.time() - entry[0] >= self.ttl_sec:
+            # Cache expired (kept if another thread has just replaced it)
+            if self.cache.get(cache_key) is entry:
+                self.cache.pop(cache_key, None)
             return None
-        
-        return results
-    
+
+        return entry
+
+    def _from_broader(self, keyword: str, cache_key):
+        """Filtered results of the most specific cached query broader than this one"""
+        query, intent = cache_key
+        broader = [
+            key for key in list(self.cache)
+            if key[1] == intent and subsumes(key[0], query)
+        ]
+        for key in sorted(broader, key=lambda k: len(k[0].split()), reverse=True):
+            entry = self._fresh(key)
+            if entry and entry[1]:
+                ts, results = entry
+                narrowed = self.narrow(keyword, intent, results)
+                if narrowed is not None:
+                    # Kept under its own key, expiring with the broader entry
+                    self.cache[cache_key] = (ts, narrowed)
+                    return narrowed
+        return None
+
     def set(self, keyword: str, intent: str, results: list):
         """Store results in cache"""
-        cache_key = (keyword.lower().strip(), intent)
+        cache_key = (self.canonical(keyword), intent)
         self.cache[cache_key] = (time.time(), results)
-    
+
     def clear(self):
         """Clear all cached results"""
         self.cache.clear()
@@ -0,0 +1,244 @@
+"""
+Columnar snapshots of result sets and catalogues
+
+A snapshot stores rows column by column in one file that is opened with mmap:
+numeric columns are read straight out of the mapping (memoryview casts, no
+parsing or copying) and strings are decoded only when a row is accessed.
+Several processes can map the same file read-only and share its pages.
+
+Layout (native byte order, recorded in the footer):
+
+    MAGIC | column buffers (8-byte aligned) | footer JSON | footer length (u64) | MAGIC
+
+    f8   float64 per row (NaN = missing)
+    bool one byte per row
+    str  int64 offsets (rows + 1) followed by the UTF-8 data
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from .helpers import price_stats
+
+
+MAGIC = b"PRICOL01"
+ALIGN = 8
+
+# Columns of a standard result set (see helpers.build_result)
+RESULT_COLUMNS = {
+    "title": "str",
+    "store": "str",
+    "rec": "bool",
+    "price": "f8",
+    "cur": "str",
+    "rel": "f8",
+    "link": "str",
+}
+
+_FOOTER_LEN = struct.Struct("<Q")
+
+
+def _float(value) -> float:
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+
+def _encode_column(kind: str, values: list) -> list:
+    # -> [bytes, ...] buffers for one column
+    if kind == "f8":
+        return [array("d", [_float(v) for v in values]).tobytes()]
+    if kind == "bool":
+        return [bytes(1 if v else 0 for v in values)]
+    if kind == "str":
+        data = [(v or "").encode("utf-8") for v in values]
+        offsets = array("q", [0])
+        total = 0
+        for d in data:
+            total += len(d)
+            offsets.append(total)
+        return [offsets.tobytes(), b"".join(data)]
+    raise ValueError(f"Unknown column type {kind!r}")
+
+
+def write_snapshot(path, rows: list, columns: dict = None, meta: dict = None) -> Path:
+    """Write rows (dicts) as a columnar snapshot; replaces the file atomically"""
+    columns = columns or RESULT_COLUMNS
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+
+    footer = {"rows": len(rows), "byteorder": sys.byteorder, "meta": meta or {}, "columns": []}
+    with tmp.open("wb") as f:
+        f.write(MAGIC)
+        for name, kind in columns.items():
+            buffers = []
+            for buf in _encode_column(kind, [r.get(name) for r in rows]):
+                f.write(b"\0" * (-f.tell() % ALIGN))
+                buffers.append([f.tell(), len(buf)])
+                f.write(buf)
+            footer["columns"].append({"name": name, "type": kind, "buffers": buffers})
+        encoded = json.dumps(footer).encode("utf-8")
+        f.write(encoded)
+        f.write(_FOOTER_LEN.pack(len(encoded)))
+        f.write(MAGIC)
+    os.replace(tmp, path)
+    return path
+
+
+class StringColumn:
+    """Lazily decoded string column"""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def raw(self, i: int) -> memoryview:
+        """Undecoded UTF-8 bytes of one value"""
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+
+class ColumnarSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file
+
+    Columns stay valid until close(); rows() / results() copy out what
+    should outlive the snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{self.path} is not a columnar snapshot")
+        self._views = []
+        try:
+            self._read_footer()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_footer(self):
+        mm = self._mm
+        tail = len(MAGIC) + _FOOTER_LEN.size
+        if len(mm) < len(MAGIC) + tail or mm[:len(MAGIC)] != MAGIC or mm[-len(MAGIC):] != MAGIC:
+            raise ValueError(f"{self.path} is not a columnar snapshot")
+        (size,) = _FOOTER_LEN.unpack(mm[-tail:-len(MAGIC)])
+        footer = json.loads(mm[-tail - size:-tail])
+        if footer["byteorder"] != sys.byteorder:
+            raise ValueError(f"{self.path} was written on a {footer['byteorder']}-endian machine")
+
+        self.rows_count = footer["rows"]
+        self.meta = footer["meta"]
+        self.types = {}
+        self._columns = {}
+        buf = self._view(memoryview(mm))
+        for col in footer["columns"]:
+            parts = [self._view(buf[start:start + length]) for start, length in col["buffers"]]
+            if col["type"] == "f8":
+                column = self._view(parts[0].cast("d"))
+            elif col["type"] == "bool":
+                column = parts[0]
+            elif col["type"] == "str":
+                column = StringColumn(self._view(parts[0].cast("q")), parts[1])
+            else:
+                raise ValueError(f"Unknown column type {col['type']!r} in {self.path}")
+            self.types[col["name"]] = col["type"]
+            self._columns[col["name"]] = column
+
+    def _view(self, view: memoryview) -> memoryview:
+        # Every view into the mapping has to be released before it can close
+        self._views.append(view)
+        return view
+
+    def __len__(self):
+        return self.rows_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._mm.close()
+        self._file.close()
+
+    def column(self, name: str):
+        """Zero-copy column: memoryview of floats/bytes, or a StringColumn"""
+        return self._columns[name]
+
+    def row(self, i: int) -> dict:
+        row = {}
+        for name, kind in self.types.items():
+            value = self._columns[name][i]
+            if kind == "f8":
+                value = None if math.isnan(value) else value
+            elif kind == "bool":
+                value = bool(value)
+            row[name] = value
+        return row
+
+    def rows(self, indices=None) -> list:
+        """Materialize rows (all, or the given indices) as dicts"""
+        indices = range(len(self)) if indices is None else indices
+        names = list(self.types)
+        values = [self._values(name, indices) for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def _values(self, name: str, indices) -> list:
+        # One column decoded for the given rows
+        column, kind = self._columns[name], self.types[name]
+        if kind == "str":
+            offsets, data = column.offsets, column.data
+            return [str(data[offsets[i]:offsets[i + 1]], "utf-8") for i in indices]
+        if kind == "bool":
+            return [bool(column[i]) for i in indices]
+        return [None if column[i] != column[i] else column[i] for i in indices]
+
+    def results(self, indices=None) -> list:
+        """Rows in the standard result format (with price_disp)"""
+        out = self.rows(indices)
+        for r in out:
+            price = r.get("price")
+            r["price_disp"] = f"{price:,.2f}" if price is not None else "—"
+            r["cur"] = r.get("cur") or "—"
+        return out
+
+    def prices(self, indices=None) -> list:
+        """Known prices, read from the price column"""
+        column = self._columns["price"]
+        if indices is None:
+            return [p for p in column if p == p]
+        return [p for p in (column[i] for i in indices) if p == p]
+
+    def price_stats(self, indices=None) -> dict:
+        """Same statistics as helpers.calculate_price_stats, without building rows"""
+        return price_stats(self.prices(indices))
+
+    def where(self, name: str, value: str) -> list:
+        """Row indices whose string column equals value (compared as raw bytes)"""
+        column = self._columns[name]
+        target = value.encode("utf-8")
+        return [i for i in range(len(column)) if column.raw(i) == target]
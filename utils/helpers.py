@@ -2,8 +2,64 @@
 Helper utilities
 """
 import csv
-import statistics
 from pathlib import Path
+from urllib.parse import urlparse
+
+
+def store_name(link: str) -> str:
+    """Store column value for a product link (its host without www.)"""
+    return urlparse(link).netloc.lower().replace("www.", "") or "unknown"
+
+
+def build_result(title: str, price, cur, link: str, rel: float, rec: bool) -> dict:
+    """Build the standard result dict shown in the results table"""
+    return {
+        "title": title[:140],
+        "store": store_name(link),
+        "rec": rec,
+        "price": price,
+        "price_disp": f"{price:,.2f}" if isinstance(price, (int, float)) else "—",
+        "cur": cur or "—",
+        "rel": rel,
+        "link": link
+    }
+
+
+SORT_MODES = {
+    "relevance": "Relevance (best match)",
+    "price_asc": "Price: Low → High",
+    "price_desc": "Price: High → Low",
+}
+
+
+def _numeric(price) -> bool:
+    return isinstance(price, (int, float))
+
+
+def sort_results(results: list, sort_mode: str):
+    """Sort results in place by a UI sort label (see SORT_MODES)"""
+    if sort_mode == SORT_MODES["relevance"]:
+        results.sort(key=lambda r: (
+            0 if r["rec"] else 1,
+            -r.get("rel", 0.0),
+            r["price"] if _numeric(r["price"]) else 10**12
+        ))
+    elif sort_mode == SORT_MODES["price_asc"]:
+        results.sort(key=lambda r: (
+            0 if r["rec"] else 1,
+            0 if _numeric(r["price"]) else 1,
+            r["price"] if _numeric(r["price"]) else 10**12,
+            -r.get("rel", 0.0),
+        ))
+    elif sort_mode == SORT_MODES["price_desc"]:
+        results.sort(key=lambda r: (
+            0 if r["rec"] else 1,
+            0 if _numeric(r["price"]) else 1,
+            -(r["price"] if _numeric(r["price"]) else -10**12),
+            -r.get("rel", 0.0),
+        ))
+    else:
+        results.sort(key=lambda r: (0 if r["rec"] else 1))
 
 
 def pick_best_price(results: list):
@@ -16,8 +72,11 @@ def pick_best_price(results: list):
 
 def calculate_price_stats(results: list) -> dict:
     """Calculate price statistics from results"""
-    prices = [r["price"] for r in results if isinstance(r["price"], (int, float))]
-    
+    return price_stats([r["price"] for r in results if isinstance(r["price"], (int, float))])
+
+
+def price_stats(prices: list) -> dict:
+    """Calculate price statistics from a list of known prices"""
     if not prices:
         return {
             "min": None,
@@ -27,13 +86,15 @@ def calculate_price_stats(results: list) -> dict:
             "confidence": "—"
         }
     
+    import statistics  # Deferred: only needed once results exist
+
     prices_sorted = sorted(prices)
     n = len(prices_sorted)
     
     return {
-        "min": min(prices_sorted),
+        "min": prices_sorted[0],
         "median": statistics.median(prices_sorted),
-        "max": max(prices_sorted),
+        "max": prices_sorted[-1],
         "count": n,
         "confidence": "High" if n >= 10 else "Medium" if n >= 5 else "Low"
     }
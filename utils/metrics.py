@@ -0,0 +1,166 @@
+"""
+Timing spans and counters for the search pipeline
+"""
+import json
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+
+SAMPLE_WINDOW = 500
+
+# HELP text for the counters the pipeline records (others get their name)
+COUNTER_HELP = {
+    "requests": "HTTP requests sent",
+    "errors": "Requests that failed with a timeout or connection error",
+    "bytes": "Response bytes after decompression",
+    "wire_bytes": "Response bytes as transferred",
+    "connections": "New connections opened",
+    "tls_handshakes": "TLS handshakes performed",
+    "http2_requests": "Requests served over HTTP/2",
+    "circuit_skips": "Requests skipped because the retailer's circuit was open",
+    "products": "Products returned",
+    "listing_complete": "Products read off listing pages without a product fetch",
+    "filtered_out": "Products dropped by the category filters",
+    "cache_hits": "Searches answered from the cache",
+    "cache_misses": "Searches that had to be crawled",
+}
+
+
+class _Timing:
+    """Aggregated durations for one (stage, retailer) pair"""
+
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def percentile(self, q: float):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Metrics:
+    """
+    Thread-safe collector of stage timings and counters, labelled by retailer
+    """
+
+    def __init__(self):
+        self._timings = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, retailer: str = "all"):
+        """Time the enclosed block as `stage` for `retailer`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, retailer)
+
+    def observe(self, stage: str, seconds: float, retailer: str = "all"):
+        """Record an already-measured duration"""
+        with self._lock:
+            timing = self._timings.get((stage, retailer))
+            if timing is None:
+                timing = self._timings[(stage, retailer)] = _Timing()
+            timing.add(seconds)
+
+    def incr(self, counter: str, n: int = 1, retailer: str = "all"):
+        """Increment a counter"""
+        with self._lock:
+            key = (counter, retailer)
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def reset(self):
+        """Drop everything collected so far"""
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """Return all metrics grouped by retailer"""
+        out = {}
+        with self._lock:
+            for (stage, retailer), t in self._timings.items():
+                out.setdefault(retailer, {"timings": {}, "counters": {}})["timings"][stage] = {
+                    "count": t.count,
+                    "total_sec": round(t.total, 6),
+                    "mean_sec": round(t.total / t.count, 6),
+                    "p50_sec": round(t.percentile(0.50), 6),
+                    "p95_sec": round(t.percentile(0.95), 6),
+                    "max_sec": round(t.max, 6),
+                }
+            for (counter, retailer), n in self._counters.items():
+                out.setdefault(retailer, {"timings": {}, "counters": {}})["counters"][counter] = n
+        return {"generated_at": time.time(), "retailers": out}
+
+    def export_json(self, filepath: Path):
+        """Write a JSON snapshot"""
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_text(json.dumps(self.snapshot(), indent=2), encoding="utf-8")
+
+    def export_prometheus(self, filepath: Path):
+        """Write a Prometheus text-format file (for node_exporter's textfile collector)"""
+        snap = self.snapshot()["retailers"]
+        lines = []
+        stages = [
+            (retailer, stage, t)
+            for retailer, data in sorted(snap.items())
+            for stage, t in sorted(data["timings"].items())
+        ]
+        if stages:
+            lines += [
+                "# HELP pricio_stage_seconds Time spent in each search pipeline stage",
+                "# TYPE pricio_stage_seconds summary",
+            ]
+            for retailer, stage, t in stages:
+                labels = f'retailer="{_label(retailer)}",stage="{_label(stage)}"'
+                lines.append(f'pricio_stage_seconds{{{labels},quantile="0.5"}} {t["p50_sec"]}')
+                lines.append(f'pricio_stage_seconds{{{labels},quantile="0.95"}} {t["p95_sec"]}')
+                lines.append(f"pricio_stage_seconds_sum{{{labels}}} {t['total_sec']}")
+                lines.append(f"pricio_stage_seconds_count{{{labels}}} {t['count']}")
+        counters = {}
+        for retailer, data in sorted(snap.items()):
+            for counter, n in data["counters"].items():
+                counters.setdefault(counter, []).append((retailer, n))
+        # One family per counter, each with its own HELP/TYPE block
+        for counter, values in sorted(counters.items()):
+            name = f"pricio_{_metric_name(counter)}_total"
+            lines += [
+                f"# HELP {name} {COUNTER_HELP.get(counter, counter.replace('_', ' ').capitalize())}",
+                f"# TYPE {name} counter",
+            ]
+            for retailer, n in values:
+                lines.append(f'{name}{{retailer="{_label(retailer)}"}} {n}')
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _metric_name(name: str) -> str:
+    """Metric-name-safe version of a counter name"""
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label(value: str) -> str:
+    """Escape a label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide collector shared by the scraper, cache and UI
+METRICS = Metrics()